@@ -0,0 +1,224 @@
+'''
+=============================
+Title: ADC Calibration - EDS Field Control
+Started: October 2026
+=============================
+'''
+
+import os
+import sys
+import csv
+import json
+import hashlib
+
+# calibration file statics (kept next to config.json, one per unit)
+CALIBRATION_FILE_NAME = "calibration.json"
+
+# adc constants (MCP3008 is 10 bit)
+VREF = 3.3
+STEPS = 1023
+TABLE_SIZE = STEPS + 1
+
+# version used when no calibration file exists
+NOMINAL_VERSION = "nominal"
+
+'''
+Nominal conversion factors for each channel (raw code -> value)
+These match the fixed factors used before calibration existed
+'''
+
+NOMINAL_FACTORS = {
+    # Voc is divided by 11 before the ADC
+    'PV_OCV': 11 * VREF / STEPS,
+    # Isc is read across a 1 ohm shunt
+    'PV_SCC': 1 * VREF / STEPS,
+    # battery voltage divider
+    'BAT': 10 * VREF / STEPS,
+    }
+
+# reference temperature for temperature compensation (C)
+DEFAULT_TREF = 25.0
+
+
+def fit_polynomial(points, degree):
+    # least squares fit of value = sum(c[i] * x^i) with x = code / STEPS
+    # returns coefficient list, lowest order first
+    degree = min(degree, len(points) - 1)
+    size = degree + 1
+    # build normal equations
+    ata = [[0.0] * size for i in range(size)]
+    atb = [0.0] * size
+    for code, value in points:
+        x = float(code) / STEPS
+        powers = [x ** i for i in range(2 * size)]
+        for i in range(size):
+            atb[i] += powers[i] * value
+            for j in range(size):
+                ata[i][j] += powers[i + j]
+
+    # gaussian elimination with partial pivoting
+    for col in range(size):
+        pivot = max(range(col, size), key=lambda row: abs(ata[row][col]))
+        if ata[pivot][col] == 0:
+            raise ValueError("Calibration points do not determine a degree " + str(degree) + " fit")
+        ata[col], ata[pivot] = ata[pivot], ata[col]
+        atb[col], atb[pivot] = atb[pivot], atb[col]
+        for row in range(col + 1, size):
+            factor = ata[row][col] / ata[col][col]
+            atb[row] -= factor * atb[col]
+            for j in range(col, size):
+                ata[row][j] -= factor * ata[col][j]
+
+    coeffs = [0.0] * size
+    for row in reversed(range(size)):
+        total = atb[row] - sum(ata[row][j] * coeffs[j] for j in range(row + 1, size))
+        coeffs[row] = total / ata[row][row]
+    return coeffs
+
+
+def compile_table(coeffs):
+    # evaluate the model once for every possible raw code
+    table = []
+    for code in range(TABLE_SIZE):
+        x = float(code) / STEPS
+        value = 0.0
+        for power in reversed(coeffs):
+            value = value * x + power
+        table.append(value)
+    return table
+
+'''
+Calibration Master Class:
+Functionality:
+1) Loads the per-unit calibration file with reference measurements for each channel
+2) Fits a polynomial model for each channel and compiles it into a lookup table
+3) Converts raw ADC codes with an array index (plus optional temperature compensation)
+4) Provides the calibration version to store with every record
+'''
+
+class CalibrationMaster:
+
+    def __init__(self, path):
+        self.calibration_file = os.path.join(path, CALIBRATION_FILE_NAME)
+        self.version = NOMINAL_VERSION
+        # {channel: lookup table}
+        self.tables = {}
+        # {channel: (tempco, tref)}
+        self.temp_comp = {}
+        self.calibration = {'channels': {}}
+
+        self.load_calibration()
+        self.compile_tables()
+
+    def load_calibration(self):
+        if not os.path.isfile(self.calibration_file):
+            print("No calibration file found. Using nominal ADC conversion factors.")
+            return
+        try:
+            with open(self.calibration_file, 'rb') as cf:
+                content = cf.read()
+            self.calibration = json.loads(content.decode())
+            self.calibration.setdefault('channels', {})
+            if not isinstance(self.calibration['channels'], dict):
+                raise ValueError("channels must be a dictionary")
+            # version is the user label plus a hash of the file so any edit shows in the data
+            digest = hashlib.sha1(content).hexdigest()[:8]
+            self.version = str(self.calibration.get('version', 'cal')) + "-" + digest
+        except:
+            print("Error loading calibration file. Using nominal ADC conversion factors!")
+            self.calibration = {'channels': {}}
+            self.version = NOMINAL_VERSION
+
+    def compile_tables(self):
+        # nominal table for every known channel, replaced by fitted model where available
+        for channel, factor in NOMINAL_FACTORS.items():
+            self.tables[channel] = compile_table([0.0, factor * STEPS])
+            self.temp_comp[channel] = (0.0, DEFAULT_TREF)
+
+        # a bad channel keeps its nominal table (per ADC channel models fall back to the shared one)
+        # and is named in the version, so the data never claims a calibration that wasn't applied
+        failed = []
+        for channel, model in self.calibration['channels'].items():
+            try:
+                if 'coeffs' in model:
+                    coeffs = [float(coeff) for coeff in model['coeffs']]
+                else:
+                    coeffs = fit_polynomial(model['points'], int(model.get('degree', 1)))
+                if not coeffs:
+                    raise ValueError("no coefficients")
+                table = compile_table(coeffs)
+                temp_comp = (float(model.get('tempco', 0.0)), float(model.get('tref', DEFAULT_TREF)))
+            except:
+                print("Error in calibration of channel " + str(channel) + ". Using nominal ADC conversion factors for it!")
+                failed.append(str(channel))
+                continue
+            self.tables[channel] = table
+            self.temp_comp[channel] = temp_comp
+        if failed:
+            self.version += "-nominal:" + ",".join(sorted(failed))
+
+    def get_version(self):
+        return self.version
+
+    def resolve(self, channel, adc_channel):
+        # per ADC channel model (e.g. PV_OCV_CH3) if calibrated, otherwise the shared one
+        name = channel + "_CH" + str(adc_channel)
+        if name in self.tables:
+            return name
+        return channel
+
+    def convert(self, channel, code, temp=None):
+        # raw code to calibrated value
+        value = self.tables[channel][code]
+        tempco, tref = self.temp_comp[channel]
+        if temp is not None and tempco:
+            value *= 1 + tempco * (temp - tref)
+        return value
+
+    def fit_channel(self, channel, points, degree, tempco=0.0, tref=DEFAULT_TREF):
+        # fit a channel from [[raw code, reference value], ...] and save it to the calibration file
+        coeffs = fit_polynomial(points, degree)
+        self.calibration['channels'][channel] = {
+            'points': points,
+            'degree': degree,
+            'coeffs': coeffs,
+            'tempco': tempco,
+            'tref': tref,
+            }
+        self.save_calibration()
+        self.load_calibration()
+        self.compile_tables()
+        return coeffs
+
+    def save_calibration(self):
+        tmp_file = self.calibration_file + ".tmp"
+        with open(tmp_file, 'w') as cf:
+            json.dump(self.calibration, cf, indent=1)
+        os.replace(tmp_file, self.calibration_file)
+
+
+'''
+Calibration fitting from the command line:
+    python3 CalibrationManager.py <calibration dir> <channel> <reference .csv> [degree] [tempco] [tref]
+The reference .csv holds one "raw code, reference value" pair per line
+'''
+
+if __name__ == '__main__':
+    if len(sys.argv) < 4:
+        print("Usage: CalibrationManager.py <calibration dir> <channel> <reference .csv> [degree] [tempco] [tref]")
+        sys.exit(1)
+
+    cal_master = CalibrationMaster(sys.argv[1])
+    channel = sys.argv[2]
+    with open(sys.argv[3], 'r') as rf:
+        points = [[int(row[0]), float(row[1])] for row in csv.reader(rf) if row and row[0].strip().isdigit()]
+    degree = int(sys.argv[4]) if len(sys.argv) > 4 else 1
+    tempco = float(sys.argv[5]) if len(sys.argv) > 5 else 0.0
+    tref = float(sys.argv[6]) if len(sys.argv) > 6 else DEFAULT_TREF
+
+    coeffs = cal_master.fit_channel(channel, points, degree, tempco, tref)
+    print("Fitted " + channel + " coefficients: " + str(coeffs))
+    # report residuals at the reference points
+    for code, value in points:
+        print(str(code) + ": reference " + str(value) + ", calibrated " + str(round(cal_master.convert(channel, code), 4)))
+    print("Calibration version: " + cal_master.get_version())
@@ -0,0 +1,353 @@
+'''
+=============================
+Title: Downsampled Data Export - EDS Field Control
+Started: October 2026
+=============================
+'''
+
+'''
+Exports stored measurements (noon, testing and manual data of one or more units) and
+ADC captures (adc.py) as shape preserving downsampled series for plotting, at a point
+budget per series. Every series is streamed from disk in a few passes, so memory only
+depends on the point budget, and series are downsampled in parallel worker processes.
+
+python3 ExportManager.py noon.csv --unit /media/usb --file noon_data.csv --metric scc --points 2000
+python3 ExportManager.py wave.csv --capture capture.adc --points 5000 --method minmax
+'''
+
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import multiprocessing
+
+import StaticManager as SM
+import IndexManager as IM
+import RollupManager as RUM
+import adc
+
+# downsampling methods
+LTTB = 'lttb'
+MINMAX = 'minmax'
+
+DEFAULT_POINTS = 2000
+
+# metrics of each data file
+FILE_METRICS = {
+    RUM.NOON_FILE_NAME: ['ocv', 'scc'],
+    RUM.TESTING_FILE_NAME: ['temperature', 'humidity', 'irradiance', 'ocv_before', 'ocv_after', 'scc_before', 'scc_after',
+                            'power_before', 'power_after', 'pr_before', 'pr_after', 'gain',
+                            # control panels in the testing data
+                            'ocv', 'scc', 'power', 'pr'],
+    RUM.MANUAL_FILE_NAME: ['ocv_before', 'ocv_after', 'scc_before', 'scc_after', 'gain'],
+    }
+
+
+def get_panel_key(panel_name):
+    # 'EDS3' -> 3, 'CTRL1' -> -1 (same as the noon data and the index)
+    if panel_name.startswith('CTRL'):
+        return -int(panel_name[4:])
+    return int(panel_name[3:])
+
+
+def get_row_metrics(name, values, ctrl_ids):
+    # {panel name: {metric: value}} of one data row, ctrl_ids are the control panels of the testing data in column order
+    if name == RUM.NOON_FILE_NAME and len(values) == 5:
+        return {RUM.get_panel_name(int(values[2])): {'ocv': values[3], 'scc': values[4]}}
+    if name == RUM.MANUAL_FILE_NAME and len(values) == 7:
+        metrics = dict(zip(['ocv_before', 'ocv_after', 'scc_before', 'scc_after'], values[3:]))
+        if metrics['scc_before'] > 0:
+            metrics['gain'] = metrics['scc_after'] / metrics['scc_before']
+        return {RUM.get_panel_name(int(values[2])): metrics}
+    if name != RUM.TESTING_FILE_NAME:
+        return {}
+    test = RUM.split_testing_values(values)
+    if test is None:
+        return {}
+    temp, humid, g_poa, eds, data_ocv_scc, power_data, pr_data = test
+    metrics = dict(zip(['ocv_before', 'ocv_after', 'scc_before', 'scc_after'], data_ocv_scc))
+    metrics.update({'temperature': temp, 'humidity': humid, 'irradiance': g_poa,
+                    'power_before': power_data[0], 'power_after': power_data[1]})
+    # PR is -1 when there was no irradiance reading
+    if pr_data[0] != -1:
+        metrics['pr_before'] = pr_data[0]
+    if pr_data[1] != -1:
+        metrics['pr_after'] = pr_data[1]
+    if metrics['scc_before'] > 0:
+        metrics['gain'] = metrics['scc_after'] / metrics['scc_before']
+    rows = {RUM.get_panel_name(eds): metrics}
+    for i, ctrl_id in enumerate(ctrl_ids[:(len(data_ocv_scc) - 4) // 2]):
+        ctrl = {'ocv': data_ocv_scc[4 + 2 * i], 'scc': data_ocv_scc[5 + 2 * i]}
+        if 2 + i < len(power_data):
+            ctrl['power'] = power_data[2 + i]
+        if 2 + i < len(pr_data) and pr_data[2 + i] != -1:
+            ctrl['pr'] = pr_data[2 + i]
+        rows['CTRL' + str(ctrl_id)] = ctrl
+    return rows
+
+
+def iter_panel_lines(directory, name, panel_name):
+    # data lines that may hold a panel, the index is used to seek to the panel's lines
+    # (files without a usable index, e.g. of an older version, are read whole)
+    key = get_panel_key(panel_name)
+    for data_path, idx_path in IM.find_files(directory, name):
+        if data_path is None:
+            continue
+        try:
+            records = IM.read_index(idx_path)
+        except (ValueError, OSError):
+            records = None
+        with IM.open_data(data_path) as fin:
+            if records is None:
+                for line in fin:
+                    yield line
+                continue
+            for record in records:
+                if record[0] == IM.KIND_PANEL and record[1] == key:
+                    fin.seek(record[3])
+                    yield fin.readline()
+
+
+def iter_points(job):
+    # (epoch, value) of one series in stored order
+    start = job['start']
+    end = job['end']
+    if job['kind'] == 'capture':
+        header = adc.read_header(job['path'])
+        index = header['channels'].index(job['channel'])
+        lsb = header['vref'] / header['steps']
+        for chunk in adc.iter_chunks(job['path']):
+            for t, codes in chunk:
+                epoch = header['start_epoch'] + t
+                if (start is None or epoch >= start) and (end is None or epoch <= end):
+                    yield epoch, codes[index] * lsb
+        return
+
+    # last control reading exported (epoch, [ocv, scc], None)
+    last_ctrl = None
+    ctrl_row = job['file'] == RUM.TESTING_FILE_NAME and job['panel'].startswith('CTRL')
+    for line in iter_panel_lines(job['path'], job['file'], job['panel']):
+        epoch = IM.parse_line_time(line)
+        if epoch is None or (start is not None and epoch < start) or (end is not None and epoch > end):
+            continue
+        values = RUM.parse_values(line)
+        if values is None:
+            continue
+        metrics = get_row_metrics(job['file'], values, job['ctrl_ids']).get(job['panel'], {})
+        if job['metric'] not in metrics:
+            continue
+        # control values repeat in every record of a test group and are reused from the control cache,
+        # each reading is exported once (same rule as the rollups)
+        if ctrl_row:
+            ctrl_values = [metrics['ocv'], metrics['scc']]
+            if RUM.is_counted_ctrl(last_ctrl, epoch, ctrl_values, None, job['ctrl_max_age']):
+                continue
+            last_ctrl = (epoch, ctrl_values, None)
+        yield epoch, metrics[job['metric']]
+
+
+def scan_series(job):
+    # pass 1: number of points and time span
+    count = 0
+    first = None
+    last = None
+    for epoch, value in iter_points(job):
+        if count == 0:
+            first = epoch
+            last = epoch
+        first = min(first, epoch)
+        last = max(last, epoch)
+        count += 1
+    return count, first, last
+
+
+def limit_points(job, count):
+    # later passes see the same points as pass 1 (live files keep growing)
+    for i, point in enumerate(iter_points(job)):
+        if i >= count:
+            return
+        yield i, point
+
+
+def downsample_minmax(job, points, count, first, last):
+    # lowest and highest point of every time bucket, in time order
+    if count <= points:
+        return [point for i, point in limit_points(job, count)]
+    buckets = max(1, points // 2)
+    width = (last - first) / buckets if last > first else 1
+    lows = [None] * buckets
+    highs = [None] * buckets
+    for i, (epoch, value) in limit_points(job, count):
+        bucket = min(buckets - 1, int((epoch - first) / width))
+        if lows[bucket] is None or value < lows[bucket][1]:
+            lows[bucket] = (epoch, value)
+        if highs[bucket] is None or value > highs[bucket][1]:
+            highs[bucket] = (epoch, value)
+    result = []
+    for low, high in zip(lows, highs):
+        if low is None:
+            continue
+        if low == high:
+            result.append(low)
+        else:
+            result.extend(sorted([low, high]))
+    return result
+
+
+def get_bucket(i, size, buckets):
+    # LTTB bucket b holds points int(b * size) + 1 up to int((b + 1) * size) (first and last point excluded)
+    bucket = min(buckets - 1, int((i - 1) / size))
+    if int(bucket * size) + 1 > i:
+        bucket -= 1
+    elif bucket + 1 < buckets and int((bucket + 1) * size) + 1 <= i:
+        bucket += 1
+    return bucket
+
+
+def downsample_lttb(job, points, count):
+    # largest triangle three buckets: first and last point kept, one point per equal count bucket
+    # pass 2 averages every bucket, pass 3 picks the point with the largest triangle
+    # (previous pick, point, average of the next bucket)
+    points = max(3, points)
+    if count <= points:
+        return [point for i, point in limit_points(job, count)]
+    buckets = points - 2
+    size = (count - 2) / buckets
+
+    sums = [[0.0, 0.0, 0] for i in range(buckets)]
+    first = None
+    last = None
+    for i, (epoch, value) in limit_points(job, count):
+        if i == 0:
+            first = (epoch, value)
+        elif i == count - 1:
+            last = (epoch, value)
+        else:
+            bucket_sum = sums[get_bucket(i, size, buckets)]
+            bucket_sum[0] += epoch
+            bucket_sum[1] += value
+            bucket_sum[2] += 1
+    averages = [(total_t / n, total_v / n) for total_t, total_v, n in sums]
+    averages.append(last)
+
+    result = [first]
+    previous = first
+    current = 0
+    best = None
+    best_area = -1.0
+    for i, (epoch, value) in limit_points(job, count):
+        if i == 0 or i == count - 1:
+            continue
+        bucket = get_bucket(i, size, buckets)
+        if bucket != current:
+            result.append(best)
+            previous = best
+            current = bucket
+            best = None
+            best_area = -1.0
+        after = averages[bucket + 1]
+        area = abs((previous[0] - after[0]) * (value - previous[1]) - (previous[0] - epoch) * (after[1] - previous[1]))
+        if area > best_area:
+            best = (epoch, value)
+            best_area = area
+    result.append(best)
+    result.append(last)
+    return result
+
+
+def export_series(task):
+    # worker: downsample one series, returns (job, points, raw point count)
+    job, points, method = task
+    count, first, last = scan_series(job)
+    if count == 0:
+        return job, [], 0
+    if method == MINMAX:
+        return job, downsample_minmax(job, points, count, first, last), count
+    return job, downsample_lttb(job, points, count), count
+
+
+def get_jobs(args, config):
+    jobs = []
+    for unit in args.unit or []:
+        panels = args.panel
+        if not panels:
+            panels = ['EDS' + str(eds) for eds in config['EDSIDS']] + ['CTRL' + str(ctrl) for ctrl in config['CTRLIDS']]
+        for name in args.file:
+            for panel in panels:
+                metrics = args.metric if args.metric else FILE_METRICS.get(name, [])
+                for metric in metrics:
+                    jobs.append({'kind': 'data', 'path': unit, 'file': name, 'panel': panel, 'metric': metric,
+                                 'start': args.start, 'end': args.end, 'ctrl_ids': config['CTRLIDS'],
+                                 'ctrl_max_age': float(config['ctrlCacheMaxSeconds'])})
+    for path in args.capture or []:
+        channels = args.channel if args.channel else adc.read_header(path)['channels']
+        for channel in channels:
+            jobs.append({'kind': 'capture', 'path': path, 'channel': channel, 'start': args.start, 'end': args.end})
+    return jobs
+
+
+def get_series_name(job):
+    if job['kind'] == 'capture':
+        return os.path.basename(job['path']), 'CH' + str(job['channel']), 'volts'
+    return os.path.abspath(job['path']), job['panel'], job['file'].split('.')[0] + ':' + job['metric']
+
+
+def format_time(epoch):
+    text = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(epoch))
+    fraction = epoch % 1
+    if fraction:
+        text += ('%.6f' % fraction)[1:]
+    return text
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export downsampled EDS measurements and ADC captures for plotting.")
+    parser.add_argument('output', help="output .csv (source, panel, series, time, value)")
+    parser.add_argument('--unit', nargs='+', help="unit spool or USB directories")
+    parser.add_argument('--file', nargs='+', default=[RUM.NOON_FILE_NAME], help="data files to export from each unit")
+    parser.add_argument('--panel', nargs='+', help="e.g. EDS3 CTRL1 (default: every panel in the config)")
+    parser.add_argument('--metric', nargs='+', help="default: every metric of the file, see FILE_METRICS")
+    parser.add_argument('--capture', nargs='+', help="adc.py capture files")
+    parser.add_argument('--channel', type=int, nargs='+', help="capture channels (default: all)")
+    parser.add_argument('--start', help="YYYY-MM-DD [HH:MM[:SS]]")
+    parser.add_argument('--end', help="YYYY-MM-DD [HH:MM[:SS]]")
+    parser.add_argument('--points', type=int, default=DEFAULT_POINTS, help="point budget per series")
+    parser.add_argument('--method', choices=[LTTB, MINMAX], default=LTTB)
+    parser.add_argument('--processes', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--config', help="unit config.json (defaults are used for missing parameters)")
+    args = parser.parse_args()
+
+    config = dict(SM.DEFAULT_CONFIG_PARAM)
+    if args.config:
+        with open(args.config, 'r') as cf:
+            config.update(json.load(cf))
+    args.start = IM.parse_time(args.start)[0] if args.start else None
+    args.end = IM.parse_time(args.end)[0] if args.end else None
+
+    jobs = get_jobs(args, config)
+    if not jobs:
+        print("Nothing to export, give --unit and/or --capture")
+        sys.exit(1)
+    tasks = [(job, args.points, args.method) for job in jobs]
+
+    with open(args.output, 'w', newline='') as of:
+        writer = csv.writer(of)
+        writer.writerow(['source', 'panel', 'series', 'time', 'value'])
+
+        def write_series(job, points, count):
+            source, panel, series = get_series_name(job)
+            for epoch, value in points:
+                writer.writerow([source, panel, series, format_time(epoch), value])
+            if count:
+                print(panel + " " + series + ": " + str(count) + " -> " + str(len(points)) + " points")
+
+        if len(tasks) == 1 or args.processes == 1:
+            for task in tasks:
+                write_series(*export_series(task))
+        else:
+            # series are written as they finish, each one in a block
+            with multiprocessing.Pool(args.processes) as pool:
+                for result in pool.imap_unordered(export_series, tasks):
+                    write_series(*result)
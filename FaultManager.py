@@ -0,0 +1,414 @@
+'''
+=============================
+Title: Fault Injection Harness - EDS Field Control
+Started: October 2026
+=============================
+'''
+
+'''
+Runs the real MasterManager loop on simulated hardware (SimHardware) and makes the RTC,
+AM2315, SP420, MCP3008 or GPIO raise, hang or return garbage on a schedule. For every
+fault the virtual time is measured from the first faulty device call until the loop
+detects it (ERROR FOUND) and carries on in a degraded state (next completed loop), and
+from the end of the fault until its errors are cleared and the device is used again
+(plus the next data record). An error escaping the loop ends MasterManager, it is then
+restarted after a delay like a service manager would. The JSON report can be compared
+between releases.
+
+Usage:
+    python3 FaultManager.py run [--schedule faults.json] [--hours 31] [--config config.json] [--output fault_report.json]
+    python3 FaultManager.py compare <old report .json> <new report .json>
+
+Schedule .json, a list of faults ("at" is a time or seconds after the start):
+    [{"device": "AM2315", "mode": "raise", "at": "2026-06-01 08:55:00", "seconds": 300}, ...]
+'''
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import traceback
+import contextlib
+
+import SimHardware as SH
+import ReplayManager as RPM
+import SoakManager as SKM
+
+DEVICES = ['RTC', 'AM2315', 'SP420', 'MCP3008', 'GPIO']
+MODES = ['raise', 'hang', 'garbage']
+
+# default simulated start (virtual local wall time) and run length (into the second day, so
+# every device is used again after its fault)
+DEFAULT_START = "2026-06-01 06:00:00"
+DEFAULT_HOURS = 31
+
+# virtual seconds a hung device blocks before the call fails (I2C/SPI timeout)
+DEFAULT_HANG_SECONDS = 10
+
+# virtual seconds before a unit that stopped on an error is started again
+DEFAULT_RESTART_SECONDS = 10
+
+# default schedule, one fault per device and mode placed where the loop uses the device
+# (RTC resync an hour after the last good read, AM2315, SP420 and MCP3008 at the hourly tests and solar noon, GPIO every loop)
+DEFAULT_SCHEDULE = [
+    {'device': 'RTC', 'mode': 'raise', 'at': "2026-06-01 06:50:00", 'seconds': 1200},
+    {'device': 'GPIO', 'mode': 'raise', 'at': "2026-06-01 07:30:00", 'seconds': 120},
+    {'device': 'AM2315', 'mode': 'hang', 'at': "2026-06-01 08:55:00", 'seconds': 300},
+    {'device': 'SP420', 'mode': 'garbage', 'at': "2026-06-01 09:55:00", 'seconds': 300},
+    {'device': 'MCP3008', 'mode': 'raise', 'at': "2026-06-01 10:55:00", 'seconds': 300},
+    {'device': 'RTC', 'mode': 'garbage', 'at': "2026-06-01 11:55:00", 'seconds': 1200},
+    {'device': 'AM2315', 'mode': 'raise', 'at': "2026-06-01 12:35:00", 'seconds': 600},
+    ]
+
+# virtual seconds allowed for each stage (detect and degrade after the first faulty call,
+# clear and resume after the end of the fault) and unit restarts allowed per fault
+# (a device is only used again at its next scheduled use, up to a day later)
+DEFAULT_LIMITS = {
+    'detect_s': 3660,
+    'degrade_s': 300,
+    'clear_s': 180,
+    'resume_s': 86400,
+    'crashes': 0,
+    }
+STAGES = ['detect_s', 'degrade_s', 'clear_s', 'resume_s', 'record_s']
+
+# RTC contents after a reset (invalid year)
+GARBAGE_RTC = time.struct_time((2000, 1, 1, 0, 0, 0, 5, 1, -1))
+
+
+def get_garbage(device, rng):
+    # nonsense value of a device that still answers
+    if device == 'RTC':
+        return GARBAGE_RTC
+    if device == 'AM2315':
+        return (float('nan'), float('nan'))
+    if device == 'SP420':
+        return -rng.uniform(0, 2000)
+    if device == 'MCP3008':
+        return rng.randint(0, SH.STEPS)
+    # GPIO writes are lost
+    return None
+
+
+def get_crash_location(error):
+    # last MasterManager line the error passed through
+    location = None
+    for frame in traceback.extract_tb(error.__traceback__):
+        if os.path.basename(frame.filename) == 'MasterManager.py':
+            location = 'MasterManager.py:' + str(frame.lineno)
+    return location
+
+
+def format_epoch(epoch):
+    return time.strftime('%Y-%m-%d %H:%M:%S', SH.to_struct(epoch))
+
+
+def load_schedule(schedule, start):
+    # checked schedule entries with virtual start/end times
+    faults = []
+    for entry in schedule:
+        if entry['device'] not in DEVICES:
+            raise ValueError("Unknown device " + str(entry['device']) + " (one of " + ', '.join(DEVICES) + ")")
+        if entry['mode'] not in MODES:
+            raise ValueError("Unknown mode " + str(entry['mode']) + " (one of " + ', '.join(MODES) + ")")
+        at = entry['at']
+        fault_start = RPM.parse_time(at) if isinstance(at, str) else start + float(at)
+        faults.append({
+            'device': entry['device'],
+            'mode': entry['mode'],
+            'start': fault_start,
+            'end': fault_start + float(entry['seconds']),
+            'hang_seconds': float(entry.get('hang_seconds', DEFAULT_HANG_SECONDS)),
+            'limits': entry.get('limits', {}),
+            })
+    return faults
+
+'''
+Fault Master Class:
+Functionality:
+1) Runs MasterManager on simulated hardware and intercepts every device call
+2) Makes a device raise, hang or return garbage while one of its scheduled faults is active
+3) Follows the log, status snapshots and data records to time detection, degradation, clearing and resuming
+4) Restarts the unit when an error stops it and writes the report
+'''
+
+class FaultMaster:
+
+    def __init__(self, workdir, config_overrides=None, limits=None, restart_seconds=DEFAULT_RESTART_SECONDS, seed=0):
+        self.workdir = workdir
+        self.config_overrides = dict(config_overrides) if config_overrides else {}
+        self.limits = dict(DEFAULT_LIMITS)
+        if limits:
+            self.limits.update(limits)
+        self.restart_seconds = float(restart_seconds)
+        self.rng = random.Random(seed)
+
+        self.hw = None
+        self.faults = []
+        self.restarts = []
+        self.last_status = None
+
+    def run(self, start, seconds, schedule):
+        unit_dir = os.path.join(self.workdir, 'unit')
+        os.makedirs(unit_dir, exist_ok=True)
+        self.faults = load_schedule(schedule, start)
+        for fault in self.faults:
+            fault.update({'first_hit': None, 'hits': 0, 'errors': [], 'detect': None, 'degrade': None,
+                          'clear': None, 'resume': None, 'record': None, 'crashes': 0, 'max_loop_gap_s': None})
+
+        self.hw = SH.SimHardware(unit_dir, start, config_overrides=self.config_overrides)
+        # every device access of the simulated peripherals goes through the injector
+        self.hw.call = self.call
+        self.hw.log_listeners.append(self.on_log)
+        self.hw.status_listeners.append(self.on_status)
+        self.hw.record_listeners.append(self.on_record)
+
+        end = start + seconds
+        real_start = time.perf_counter()
+        # console output of the unit goes to a file
+        with open(os.path.join(self.workdir, 'console.txt'), 'w') as console:
+            self.hw.install()
+            try:
+                while self.hw.clock.now < end:
+                    try:
+                        with contextlib.redirect_stdout(console):
+                            self.hw.run_master(end - self.hw.clock.now)
+                        break
+                    except Exception as e:
+                        # the loop re-raises what it can't handle, the unit is started again after a delay
+                        self.on_crash(e)
+                        try:
+                            self.hw.clock.advance(self.restart_seconds)
+                        except SH.SimulationEnd:
+                            break
+            finally:
+                self.hw.uninstall()
+        real_seconds = time.perf_counter() - real_start
+        return self.build_report(start, seconds, real_seconds)
+
+    # ~~~ injection ~~~
+
+    def get_active(self, device, now):
+        for fault in self.faults:
+            if fault['device'] == device and fault['start'] <= now < fault['end']:
+                return fault
+        return None
+
+    def call(self, device, function, *args):
+        now = self.hw.clock.now
+        fault = self.get_active(device, now)
+        if fault is None:
+            # first good call after a fault is over
+            for done in self.faults:
+                if done['device'] == device and done['first_hit'] is not None and done['resume'] is None and now >= done['end']:
+                    done['resume'] = now
+            return function(*args)
+
+        fault['hits'] += 1
+        if fault['first_hit'] is None:
+            fault['first_hit'] = now
+        if fault['mode'] == 'hang':
+            # the bus blocks the loop, then the driver gives up
+            time.sleep(fault['hang_seconds'])
+            raise OSError("Injected " + device + " timeout")
+        if fault['mode'] == 'raise':
+            raise OSError("Injected " + device + " fault")
+        return get_garbage(device, self.rng)
+
+    # ~~~ observation ~~~
+
+    def on_log(self, dt, phrase):
+        # unit log time comes from its (possibly faulty) RTC, the harness uses the virtual clock
+        if not phrase.startswith("ERROR FOUND: "):
+            return
+        now = self.hw.clock.now
+        error = phrase[len("ERROR FOUND: "):]
+        for fault in self.faults:
+            if fault['first_hit'] is None or now > fault['end']:
+                continue
+            if fault['detect'] is None:
+                fault['detect'] = now
+            if error not in fault['errors']:
+                fault['errors'].append(error)
+
+    def on_status(self, snapshot):
+        now = self.hw.clock.now
+        for fault in self.faults:
+            if fault['first_hit'] is None:
+                continue
+            if fault['degrade'] is None:
+                fault['degrade'] = now
+            # longest time without a completed loop while the fault was in effect
+            if self.last_status is not None and (fault['clear'] is None or now <= fault['clear']) and now <= fault['end'] + self.limits['clear_s']:
+                gap = now - max(self.last_status, fault['first_hit'])
+                if fault['max_loop_gap_s'] is None or gap > fault['max_loop_gap_s']:
+                    fault['max_loop_gap_s'] = gap
+            if fault['clear'] is None and fault['errors'] and now >= fault['end']:
+                if not set(fault['errors']) & set(snapshot['errors']):
+                    fault['clear'] = now
+        self.last_status = now
+
+    def on_record(self, name, row):
+        now = self.hw.clock.now
+        for fault in self.faults:
+            if fault['first_hit'] is not None and fault['record'] is None and now >= fault['end']:
+                fault['record'] = now
+
+    def on_crash(self, error):
+        now = self.hw.clock.now
+        self.restarts.append({'time': format_epoch(now), 'error': repr(error), 'location': get_crash_location(error)})
+        for fault in self.faults:
+            if fault['first_hit'] is not None and (now < fault['end'] or fault['resume'] is None):
+                fault['crashes'] += 1
+        # a restarted unit starts with an empty error list
+        self.last_status = None
+
+    # ~~~ report ~~~
+
+    def check_fault(self, fault):
+        limits = dict(self.limits)
+        limits.update(fault['limits'])
+        result = {
+            'device': fault['device'],
+            'mode': fault['mode'],
+            'start': format_epoch(fault['start']),
+            'end': format_epoch(fault['end']),
+            'hits': fault['hits'],
+            'errors': fault['errors'],
+            'detected': fault['detect'] is not None,
+            'crashes': fault['crashes'],
+            'max_loop_gap_s': fault['max_loop_gap_s'],
+            'failures': [],
+            }
+        hit = fault['first_hit']
+        # detect/degrade from the first faulty call, the rest from the end of the fault
+        result['detect_s'] = None if fault['detect'] is None else fault['detect'] - hit
+        result['degrade_s'] = None if fault['degrade'] is None else fault['degrade'] - hit
+        for stage in ['clear', 'resume', 'record']:
+            result[stage + '_s'] = None if fault[stage] is None else fault[stage] - fault['end']
+
+        if hit is None:
+            result['failures'].append("never hit (device not used while the fault was active)")
+        else:
+            for stage in ['detect_s', 'degrade_s', 'clear_s', 'resume_s']:
+                if result[stage] is not None and result[stage] > limits[stage]:
+                    result['failures'].append(stage + " " + str(round(result[stage], 1)) + " > " + str(limits[stage]))
+            if result['degrade_s'] is None:
+                result['failures'].append("loop never completed after the fault")
+            if fault['errors'] and result['clear_s'] is None:
+                result['failures'].append("errors not cleared: " + ', '.join(fault['errors']))
+            if result['resume_s'] is None:
+                result['failures'].append("device not used again")
+            if fault['crashes'] > limits['crashes']:
+                result['failures'].append(str(fault['crashes']) + " unit restarts")
+        result['passed'] = not result['failures']
+        return result
+
+    def build_report(self, start, seconds, real_seconds):
+        faults = [self.check_fault(fault) for fault in self.faults]
+        return {
+            'revision': SKM.get_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'start': start,
+            'seconds': seconds,
+            'real_seconds': real_seconds,
+            'restart_seconds': self.restart_seconds,
+            'records': self.hw.record_count,
+            'log_lines': self.hw.log_count,
+            'limits': self.limits,
+            'restarts': self.restarts,
+            'faults': faults,
+            'passed': all(fault['passed'] for fault in faults),
+            }
+
+
+def format_seconds(value):
+    if value is None:
+        return '-'
+    return str(round(value, 1))
+
+
+def print_report(report):
+    print("Fault run of " + str(round(report['seconds'] / 3600, 1)) + " simulated hours in " + str(round(report['real_seconds'], 1))
+          + " s (revision " + str(report['revision']) + ")")
+    print("Records: " + str(report['records']) + ", log lines: " + str(report['log_lines']) + ", unit restarts: " + str(len(report['restarts'])))
+    print("start                device   mode     hits   detect   degrade  clear    resume   record   restarts  errors")
+    for fault in report['faults']:
+        print(fault['start'].ljust(21) + fault['device'].ljust(9) + fault['mode'].ljust(9) + str(fault['hits']).ljust(7)
+              + ''.join(format_seconds(fault[stage]).ljust(9) for stage in STAGES) + str(fault['crashes']).ljust(10)
+              + ', '.join(fault['errors']))
+        for failure in fault['failures']:
+            print("    FAILED: " + failure)
+    for restart in report['restarts']:
+        print("Restart at " + restart['time'] + " after " + restart['error'] + " (" + str(restart['location']) + ")")
+    print("PASSED" if report['passed'] else "FAILED")
+
+
+def compare_reports(old, new):
+    # recovery times of the same schedule on two releases
+    print("old: " + str(old['revision']) + ", new: " + str(new['revision']))
+    print("device   mode     stage      old      new")
+    for old_fault, new_fault in zip(old['faults'], new['faults']):
+        if (old_fault['device'], old_fault['mode'], old_fault['start']) != (new_fault['device'], new_fault['mode'], new_fault['start']):
+            print("Schedules differ, " + old_fault['device'] + " " + old_fault['mode'] + " vs " + new_fault['device'] + " " + new_fault['mode'])
+            continue
+        for stage in STAGES + ['crashes']:
+            old_value = old_fault[stage]
+            new_value = new_fault[stage]
+            slower = new_value is None and old_value is not None or (None not in [old_value, new_value] and new_value > old_value)
+            print(new_fault['device'].ljust(9) + new_fault['mode'].ljust(9) + stage.ljust(11) + format_seconds(old_value).ljust(9)
+                  + format_seconds(new_value).ljust(9) + ("slower" if slower else ""))
+    print("old " + ("PASSED" if old['passed'] else "FAILED") + ", new " + ("PASSED" if new['passed'] else "FAILED"))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Inject device faults into MasterManager on simulated hardware and time the recovery.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help="run a fault schedule and write a report")
+    run_parser.add_argument('--schedule', help="fault schedule .json (default: one fault per device on the first day)")
+    run_parser.add_argument('--start', default=DEFAULT_START, help="simulated start time")
+    run_parser.add_argument('--hours', type=float, default=DEFAULT_HOURS, help="simulated hours to run")
+    run_parser.add_argument('--restart-seconds', type=float, default=DEFAULT_RESTART_SECONDS, help="delay before a stopped unit is started again")
+    run_parser.add_argument('--seed', type=int, default=0, help="seed of the garbage values")
+    run_parser.add_argument('--config', help="unit config.json (defaults are used for missing parameters)")
+    run_parser.add_argument('--limits', help=".json limit overrides (see DEFAULT_LIMITS)")
+    run_parser.add_argument('--workdir', help="keep the unit files here (default: temporary)")
+    run_parser.add_argument('--output', default='fault_report.json')
+    compare_parser = commands.add_parser('compare', help="compare two fault reports")
+    compare_parser.add_argument('old')
+    compare_parser.add_argument('new')
+    args = parser.parse_args()
+
+    if args.command == 'compare':
+        with open(args.old, 'r') as rf:
+            old_report = json.load(rf)
+        with open(args.new, 'r') as rf:
+            new_report = json.load(rf)
+        compare_reports(old_report, new_report)
+        sys.exit(0 if new_report['passed'] else 1)
+
+    schedule = DEFAULT_SCHEDULE
+    if args.schedule:
+        with open(args.schedule, 'r') as sf:
+            schedule = json.load(sf)
+    limits = None
+    if args.limits:
+        with open(args.limits, 'r') as lf:
+            limits = json.load(lf)
+    config = RPM.load_config(args.config)
+
+    with tempfile.TemporaryDirectory(prefix='eds_fault_') as tmp_dir:
+        workdir = args.workdir if args.workdir else tmp_dir
+        os.makedirs(workdir, exist_ok=True)
+        fault_master = FaultMaster(workdir, config, limits, args.restart_seconds, args.seed)
+        report = fault_master.run(RPM.parse_time(args.start), args.hours * 3600, schedule)
+
+    with open(args.output, 'w') as of:
+        json.dump(report, of, indent=1)
+    print_report(report)
+    sys.exit(0 if report['passed'] else 1)
@@ -0,0 +1,186 @@
+'''
+=============================
+Title: GPIO State Manager - EDS Field Control
+Started: October 2026
+=============================
+'''
+
+import os
+import json
+import time
+import threading
+
+# pin state when the pin is released (GPIO.cleanup, relay open)
+RELEASED = None
+
+# transition counts file kept next to config.json
+COUNTS_FILE_NAME = "gpio_counts.json"
+
+'''
+GPIO Master Class:
+Functionality:
+1) Owns the direction and level of every pin the unit drives (released, LOW or HIGH)
+2) Only calls RPi.GPIO when a pin actually changes, repeated setup/cleanup/output calls are free
+3) Applies multi-pin transitions as one step: opening/releasing first, then closing, rolled back on failure
+4) Drives every pin to a safe state (EDS off, relays released, LEDs off) on shutdown or error
+5) Counts transitions per pin for relay wear statistics, kept on disk between restarts (not kept without a path)
+'''
+
+class GpioMaster:
+
+    def __init__(self, gpio, config_dictionary, path):
+        self.gpio = gpio
+        self.config = config_dictionary
+        self.save_seconds = float(config_dictionary['gpioCountSaveSeconds'])
+        self.gpio.setmode(self.gpio.BCM)
+        self.gpio.setwarnings(False)
+
+        # {pin: RELEASED/0/1}, pins not in here are in an unknown state
+        self.levels = {}
+        self.inputs = set()
+        self.lock = threading.RLock()
+
+        # {pin: transitions}, saved every save interval
+        self.counts_file = None if path is None else os.path.join(path, COUNTS_FILE_NAME)
+        self.counts = {}
+        self.counts_dirty = False
+        self.last_save = time.monotonic()
+        self.load_counts()
+
+    # ~~~ single pins ~~~
+
+    def set(self, pin, level):
+        # drive a pin as an output, returns True if anything was switched
+        return self.apply({pin: level})
+
+    def release(self, pin):
+        # cleanup a pin (input, relays open), returns True if anything was switched
+        return self.apply({pin: RELEASED})
+
+    def get(self, pin):
+        return self.levels.get(int(pin), RELEASED)
+
+    def setup_input(self, pin, edge=None):
+        # input pins are set up once, optionally with edge detection
+        pin = int(pin)
+        with self.lock:
+            if pin in self.inputs:
+                return
+            self.gpio.setup(pin, self.gpio.IN)
+            if edge is not None:
+                self.gpio.add_event_detect(pin, edge)
+            self.inputs.add(pin)
+            self.levels.pop(pin, None)
+
+    def input(self, pin):
+        return self.gpio.input(int(pin))
+
+    def event_detected(self, pin):
+        return self.gpio.event_detected(int(pin))
+
+    # ~~~ transitions ~~~
+
+    def apply(self, changes):
+        # {pin: RELEASED/0/1} applied together, only real changes reach the hardware
+        with self.lock:
+            diff = []
+            for pin, level in changes.items():
+                pin = int(pin)
+                if level is not RELEASED:
+                    level = 1 if level else 0
+                if pin in self.levels and self.levels[pin] == level:
+                    continue
+                diff.append((pin, level))
+            if not diff:
+                return False
+
+            # break before make: releases (relays open) first, then LOW, then HIGH outputs
+            diff.sort(key=lambda change: (change[1] is not RELEASED, change[1] == 1))
+            done = []
+            try:
+                for pin, level in diff:
+                    previous = self.levels.get(pin, RELEASED)
+                    self.write_pin(pin, level)
+                    done.append((pin, previous))
+            except:
+                # put back what was already switched, if that fails too go to the safe state
+                try:
+                    for pin, previous in reversed(done):
+                        self.write_pin(pin, previous)
+                except:
+                    self.safe_state()
+                raise
+            return True
+
+    def write_pin(self, pin, level):
+        # the only place pins are switched
+        current = self.levels.get(pin, 'unknown')
+        if level is RELEASED:
+            self.gpio.cleanup(pin)
+        elif current in [0, 1]:
+            self.gpio.output(pin, level)
+        else:
+            self.gpio.setup(pin, self.gpio.OUT, initial=level)
+        if current != 'unknown':
+            self.counts[str(pin)] = self.counts.get(str(pin), 0) + 1
+            self.counts_dirty = True
+        self.levels[pin] = level
+
+    def safe_state(self):
+        # EDS activation off first, then every relay and LED released
+        with self.lock:
+            eds_pins = set()
+            for key, value in self.config.items():
+                if key.startswith('EDS') and key[3:].isdigit():
+                    eds_pins.add(int(value))
+            for pin in list(self.levels):
+                if pin in eds_pins and self.levels[pin] == 1:
+                    try:
+                        self.write_pin(pin, 0)
+                    except:
+                        pass
+            for pin in list(self.levels):
+                if self.levels[pin] is RELEASED:
+                    continue
+                try:
+                    self.write_pin(pin, RELEASED)
+                except:
+                    # unknown state, make sure it is tried again
+                    self.levels.pop(pin, None)
+            try:
+                self.save_counts()
+            except OSError:
+                print("Error saving GPIO transition counts.")
+
+    # ~~~ relay wear statistics ~~~
+
+    def get_counts(self):
+        with self.lock:
+            return dict(self.counts)
+
+    def check_save(self):
+        # save the counts at most every save interval (SD card wear)
+        if self.counts_dirty and time.monotonic() - self.last_save >= self.save_seconds:
+            self.save_counts()
+
+    def load_counts(self):
+        if self.counts_file is None or not os.path.isfile(self.counts_file):
+            return
+        try:
+            with open(self.counts_file, 'r') as cf:
+                self.counts = json.load(cf)
+        except:
+            print("Error loading GPIO transition counts. Starting from zero!")
+            self.counts = {}
+
+    def save_counts(self):
+        with self.lock:
+            counts = dict(self.counts)
+            self.counts_dirty = False
+        self.last_save = time.monotonic()
+        if self.counts_file is None:
+            return
+        tmp_file = self.counts_file + '.tmp'
+        with open(tmp_file, 'w') as cf:
+            json.dump(counts, cf)
+        os.replace(tmp_file, self.counts_file)
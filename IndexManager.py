@@ -0,0 +1,446 @@
+'''
+=============================
+Title: Log and Data Time Index - EDS Field Control
+Started: October 2026
+=============================
+'''
+
+'''
+Sidecar index (<file>.idx) for every data and log file, rotated segments included.
+Holds the byte offset of the first line of every day and hour and of every line that
+belongs to an EDS or control panel (the controls of every testing row included), so a
+query seeks straight to the lines it needs.
+Offsets are into the uncompressed file, compressed segments are decompressed up to the
+offset but never parsed.
+
+python3 IndexManager.py query /media/usb --start "2026-06-12 11:00" --end "2026-06-12 13:00" --eds 3
+python3 IndexManager.py rebuild /media/usb
+'''
+
+import os
+import re
+import sys
+import json
+import gzip
+import time
+import struct
+import fnmatch
+import argparse
+import calendar
+
+import StaticManager as SM
+import RotationManager as RM
+
+# zstd is optional (same as RotationManager)
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# index file: magic, then fixed size records (kind, panel, epoch seconds, byte offset)
+# (version 2 indexes the controls of the testing rows, older indexes are rebuilt)
+INDEX_MAGIC = b'EDSIDX\x00\x02'
+RECORD_STRUCT = struct.Struct('<BhIQ')
+
+# record kinds
+KIND_DAY = 1
+KIND_HOUR = 2
+KIND_PANEL = 3
+
+# read size when indexing
+CHUNK_BYTES = 1024 * 1024
+
+# record time at the start of every line, M/D/YYYY H:M:S (CSVMaster/LogMaster) or YYYY-MM-DD HH:MM:SS
+LINE_TIME_PATTERNS = [
+    (re.compile(rb'^\s*(\d{1,2})/(\d{1,2})/(\d{4})[ T](\d{1,2}):(\d{1,2}):(\d{1,2})'), (2, 0, 1, 3, 4, 5)),
+    (re.compile(rb'^\s*(\d{4})-(\d{1,2})-(\d{1,2})[ T](\d{1,2}):(\d{1,2}):(\d{1,2})'), (0, 1, 2, 3, 4, 5)),
+    ]
+
+# panels named in a log line (control panels are stored negative, same as the noon data)
+LOG_PANEL_PATTERN = re.compile(rb'\b(EDS|CTRL)(\d+)')
+
+# query time formats
+TIME_FORMATS = ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d']
+
+
+def get_index_path(path):
+    return path + RM.INDEX_EXT
+
+
+def parse_line_time(line):
+    # wall time epoch of a record line (UTC functions, same as TimeManager), None for headers
+    for pattern, order in LINE_TIME_PATTERNS:
+        match = pattern.match(line)
+        if match is not None:
+            fields = match.groups()
+            try:
+                return calendar.timegm(tuple(int(fields[i]) for i in order) + (0, 0, 0))
+            except (ValueError, OverflowError):
+                return None
+    return None
+
+
+def get_panels(line, column, ctrl_ids=()):
+    # EDS number from the panel column of a .csv line, or every EDS/CTRL named in a log line
+    # ctrl_ids are the controls held by every row of the file (testing data), in column order
+    if column is None:
+        panels = []
+        for kind, number in LOG_PANEL_PATTERN.findall(line):
+            panel = int(number) if kind == b'EDS' else -int(number)
+            if panel not in panels:
+                panels.append(panel)
+        return panels
+    fields = line.split(b',')
+    try:
+        panels = [int(float(fields[column]))]
+    except (IndexError, ValueError):
+        return []
+    # time, 4 values, EDS before/after (4 + 2 per control), power and PR (2 + 1 per control each)
+    controls = max(0, (len(fields) - 13) // 4)
+    return panels + [-int(ctrl) for ctrl in ctrl_ids[:controls]]
+
+
+def index_lines(data, base_offset, column, state, ctrl_ids=()):
+    # index records of every complete line in data, returns (records, bytes consumed)
+    # state {'hour': hour of the last line} carries over between calls
+    records = []
+    pos = 0
+    while True:
+        end = data.find(b'\n', pos)
+        if end < 0:
+            break
+        line = data[pos:end]
+        epoch = parse_line_time(line)
+        if epoch is not None:
+            offset = base_offset + pos
+            hour = epoch // 3600
+            if hour != state['hour']:
+                if state['hour'] is None or hour // 24 != state['hour'] // 24:
+                    records.append(RECORD_STRUCT.pack(KIND_DAY, 0, hour // 24 * 86400, offset))
+                records.append(RECORD_STRUCT.pack(KIND_HOUR, 0, hour * 3600, offset))
+                state['hour'] = hour
+            for panel in get_panels(line, column, ctrl_ids):
+                records.append(RECORD_STRUCT.pack(KIND_PANEL, panel, epoch, offset))
+        pos = end + 1
+    return b''.join(records), pos
+
+
+def read_index(idx_path):
+    # [(kind, panel, epoch, offset)] in file order
+    with open(idx_path, 'rb') as f:
+        if f.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+            raise ValueError(idx_path + " is not an index file")
+        data = f.read()
+    usable = len(data) - len(data) % RECORD_STRUCT.size
+    return list(RECORD_STRUCT.iter_unpack(data[:usable]))
+
+
+def open_data(path):
+    # data file or rotated segment, compressed segments are read through the decompressor
+    if path.endswith(RM.COMPRESSED_EXT['gzip']):
+        return gzip.open(path, 'rb')
+    if path.endswith(RM.COMPRESSED_EXT['zstd']):
+        if zstandard is None:
+            raise OSError("zstandard not installed, can't read " + path)
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    return open(path, 'rb')
+
+
+def get_data_path(idx_path):
+    # data file of an index, a rotated segment may have been compressed since
+    path = idx_path[:-len(RM.INDEX_EXT)]
+    for ext in [''] + list(RM.COMPRESSED_EXT.values()):
+        if os.path.isfile(path + ext):
+            return path + ext
+    return None
+
+
+def build_index(data_path, idx_path, column, ctrl_ids=(), partial=True):
+    # index a whole file from scratch, written to a temp file then renamed
+    # returns {'offset' indexed up to, 'hour' of the last indexed line}, a live file is indexed
+    # without its partial last line (partial=False) so it is indexed once complete
+    state = {'hour': None}
+    offset = 0
+    tmp_path = idx_path + '.tmp'
+    with open_data(data_path) as fin:
+        with open(tmp_path, 'wb') as fout:
+            fout.write(INDEX_MAGIC)
+            rest = b''
+            while True:
+                chunk = fin.read(CHUNK_BYTES)
+                if not chunk:
+                    break
+                data = rest + chunk
+                records, used = index_lines(data, offset, column, state, ctrl_ids)
+                fout.write(records)
+                offset += used
+                rest = data[used:]
+            # last line without a newline
+            if rest and partial:
+                records, used = index_lines(rest + b'\n', offset, column, state, ctrl_ids)
+                fout.write(records)
+                offset += len(rest)
+    os.replace(tmp_path, idx_path)
+    return {'offset': offset, 'hour': state['hour']}
+
+
+def get_column(files, name):
+    # (True, panel column) of a file name in INDEXFILES (names or patterns), (False, None) if not indexed
+    if name in files:
+        return True, files[name]
+    for pattern, column in files.items():
+        if fnmatch.fnmatchcase(name, pattern):
+            return True, column
+    return False, None
+
+
+def get_ctrl_ids(config_dictionary, name):
+    # controls held by every row of a data file, in column order
+    if name in config_dictionary['INDEXCTRLFILES']:
+        return [int(ctrl) for ctrl in config_dictionary['CTRLIDS']]
+    return []
+
+
+def get_names(directory, pattern):
+    # live file names matching a file name or pattern, including those only left as rotated segments
+    names = set()
+    for entry in os.listdir(directory):
+        match = RM.SEGMENT_PATTERN.match(entry)
+        name = match.group(1) + match.group(3) if match is not None else entry
+        if fnmatch.fnmatchcase(name, pattern) and (match is not None or os.path.isfile(os.path.join(directory, entry))):
+            names.add(name)
+    return sorted(names)
+
+
+def find_names(directory, patterns):
+    # file names matching any of the names or patterns, in pattern order
+    names = []
+    for pattern in patterns:
+        names += [name for name in get_names(directory, pattern) if name not in names]
+    return names
+
+'''
+Index Master Class:
+Functionality:
+1) Follows the live data and log files in the spool and indexes only the lines appended since the last check
+2) Resumes from the last index record after a restart, rebuilds an index that doesn't match its file
+3) Indexes the tail of a live file right before it is rotated (the index is renamed with the segment)
+'''
+
+class IndexMaster:
+
+    def __init__(self, config_dictionary, directory):
+        self.directory = directory
+        self.config = config_dictionary
+        # {file name or pattern: panel column, None for log files}
+        self.files = config_dictionary['INDEXFILES']
+        self.check_seconds = float(config_dictionary['indexCheckSeconds'])
+        self.last_check = None
+        # {file name: {'ino', 'offset' indexed up to, 'hour' of the last indexed line}}
+        self.tails = {}
+
+    def check_index(self):
+        # called every loop, only reads the files every indexCheckSeconds
+        now = time.monotonic()
+        if self.last_check is not None and now - self.last_check < self.check_seconds:
+            return
+        self.last_check = now
+        live = [name for name in find_names(self.directory, self.files) if os.path.isfile(os.path.join(self.directory, name))]
+        for name in live:
+            self.index_file(name)
+        # forget the tails of files that are gone (e.g. the log of a previous day)
+        for name in [name for name in self.tails if name not in live]:
+            del self.tails[name]
+
+    def index_file(self, name):
+        # index the lines appended to a live file since the last call
+        indexed, column = get_column(self.files, name)
+        if not indexed:
+            return
+        path = os.path.join(self.directory, name)
+        if not os.path.isfile(path):
+            return
+        ctrl_ids = get_ctrl_ids(self.config, name)
+        stat = os.stat(path)
+        tail = self.tails.get(name)
+        if tail is None or tail['ino'] != stat.st_ino or stat.st_size < tail['offset']:
+            # first look, or the file was rotated/replaced
+            tail = self.open_tail(path, stat, column, ctrl_ids)
+            self.tails[name] = tail
+        if stat.st_size <= tail['offset']:
+            return
+
+        idx_path = get_index_path(path)
+        with open(path, 'rb') as fin:
+            fin.seek(tail['offset'])
+            data = fin.read(stat.st_size - tail['offset'])
+        records, used = index_lines(data, tail['offset'], column, tail, ctrl_ids)
+        tail['offset'] += used
+        if records:
+            new = not os.path.isfile(idx_path)
+            with open(idx_path, 'ab') as fout:
+                if new:
+                    fout.write(INDEX_MAGIC)
+                fout.write(records)
+
+    def open_tail(self, path, stat, column, ctrl_ids):
+        # resume after the line of the last index record, everything before it is indexed
+        idx_path = get_index_path(path)
+        tail = {'ino': stat.st_ino, 'offset': 0, 'hour': None}
+        if not os.path.isfile(idx_path):
+            return tail
+        try:
+            records = read_index(idx_path)
+        except (ValueError, OSError):
+            records = None
+        if records is not None and records and records[-1][3] < stat.st_size:
+            kind, panel, epoch, offset = records[-1]
+            with open(path, 'rb') as fin:
+                fin.seek(offset)
+                line = fin.readline()
+            tail['offset'] = offset + len(line)
+            tail['hour'] = epoch // 3600
+            if line.endswith(b'\n'):
+                return tail
+        elif records == []:
+            return tail
+        # index doesn't match the file (replaced, truncated or corrupt)
+        print("Index of " + os.path.basename(path) + " doesn't match the file. Rebuilding!")
+        state = build_index(path, idx_path, column, ctrl_ids, partial=False)
+        # the next line only starts a new day/hour record if its hour differs from the last indexed one
+        return {'ino': stat.st_ino, 'offset': state['offset'], 'hour': state['hour']}
+
+
+def find_files(directory, name):
+    # (data path, index path) of a live file and its rotated segments, oldest first
+    base, ext = os.path.splitext(name)
+    segments = []
+    for entry in os.listdir(directory):
+        match = RM.SEGMENT_PATTERN.match(entry)
+        if match is not None and match.group(1) == base and match.group(3) == ext:
+            segments.append((match.group(2), os.path.join(directory, entry[:len(entry) - len(match.group(4) or '')])))
+    segments.sort()
+    paths = []
+    for stamp, path in segments:
+        if path not in paths:
+            paths.append(path)
+    live = os.path.join(directory, name)
+    if os.path.isfile(live):
+        paths.append(live)
+    return [(get_data_path(get_index_path(path)), get_index_path(path)) for path in paths]
+
+
+def get_ranges(records, start, end):
+    # byte ranges [(from, to or None)] covering every hour in [start, end]
+    hours = [record for record in records if record[0] == KIND_HOUR]
+    ranges = []
+    for i, record in enumerate(hours):
+        if start // 3600 * 3600 <= record[2] <= end:
+            stop = hours[i + 1][3] if i + 1 < len(hours) else None
+            if ranges and ranges[-1][1] == record[3]:
+                ranges[-1] = (ranges[-1][0], stop)
+            else:
+                ranges.append((record[3], stop))
+    return ranges
+
+
+def query_file(data_path, idx_path, start, end, panel=None):
+    # lines of one file in [start, end], only the indexed offsets are read
+    records = read_index(idx_path)
+    if panel is not None:
+        offsets = [record[3] for record in records if record[0] == KIND_PANEL and record[1] == panel and start <= record[2] <= end]
+        if not offsets:
+            return
+        with open_data(data_path) as fin:
+            for offset in offsets:
+                fin.seek(offset)
+                yield fin.readline().rstrip(b'\n')
+        return
+
+    ranges = get_ranges(records, start, end)
+    if not ranges:
+        return
+    with open_data(data_path) as fin:
+        for begin, stop in ranges:
+            fin.seek(begin)
+            position = begin
+            while stop is None or position < stop:
+                line = fin.readline()
+                if not line:
+                    break
+                position += len(line)
+                epoch = parse_line_time(line)
+                if epoch is not None and start <= epoch <= end:
+                    yield line.rstrip(b'\n')
+
+
+def query(directory, patterns, start, end, panel=None):
+    # (file name, line) of every matching line in the live files and segments
+    for name in find_names(directory, patterns):
+        for data_path, idx_path in find_files(directory, name):
+            if data_path is None:
+                continue
+            try:
+                lines = list(query_file(data_path, idx_path, start, end, panel))
+            except (ValueError, OSError):
+                print("No usable index for " + os.path.basename(data_path) + ", run rebuild first", file=sys.stderr)
+                continue
+            for line in lines:
+                yield os.path.basename(data_path), line
+
+
+def rebuild(directory, config_dictionary):
+    # rebuild every index of the live files and segments from the raw files
+    count = 0
+    for name in find_names(directory, config_dictionary['INDEXFILES']):
+        column = get_column(config_dictionary['INDEXFILES'], name)[1]
+        for data_path, idx_path in find_files(directory, name):
+            if data_path is None:
+                continue
+            build_index(data_path, idx_path, column, get_ctrl_ids(config_dictionary, name))
+            count += 1
+    return count
+
+
+def parse_time(text):
+    # query time to epoch seconds (local wall time, same as the index), True if only a date was given
+    for time_format in TIME_FORMATS:
+        try:
+            return calendar.timegm(time.strptime(text.strip(), time_format)), time_format == '%Y-%m-%d'
+        except ValueError:
+            continue
+    raise ValueError("Unknown time format: " + text)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Query or rebuild the time index of EDS data and log files.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    query_parser = commands.add_parser('query', help="print the lines of a time range (and panel)")
+    query_parser.add_argument('directory', help="spool or USB directory")
+    query_parser.add_argument('--start', required=True, help="YYYY-MM-DD [HH:MM[:SS]]")
+    query_parser.add_argument('--end', help="default: one hour after --start, or the whole day for a date")
+    panel_group = query_parser.add_mutually_exclusive_group()
+    panel_group.add_argument('--eds', type=int)
+    panel_group.add_argument('--ctrl', type=int)
+    query_parser.add_argument('--file', nargs='+', help="data/log file names or patterns (default: every indexed file)")
+    query_parser.add_argument('--config', help="unit config.json (defaults are used for missing parameters)")
+    rebuild_parser = commands.add_parser('rebuild', help="rebuild every index from the raw files")
+    rebuild_parser.add_argument('directory', help="spool or USB directory")
+    rebuild_parser.add_argument('--config', help="unit config.json (defaults are used for missing parameters)")
+    args = parser.parse_args()
+
+    config = dict(SM.DEFAULT_CONFIG_PARAM)
+    if args.config:
+        with open(args.config, 'r') as cf:
+            config.update(json.load(cf))
+
+    if args.command == 'rebuild':
+        print("Rebuilt " + str(rebuild(args.directory, config)) + " index files")
+        sys.exit(0)
+
+    start, whole_day = parse_time(args.start)
+    end = parse_time(args.end)[0] if args.end else start + (86400 if whole_day else 3600) - 1
+    panel = args.eds if args.eds is not None else (-args.ctrl if args.ctrl is not None else None)
+    names = args.file if args.file else list(config['INDEXFILES'])
+    for name, line in query(args.directory, names, start, end, panel):
+        print(name + ': ' + line.decode('utf-8', 'replace'))
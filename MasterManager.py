@@ -16,6 +16,9 @@ This file contains the main looping structure for extended-period field testing.
 
 import RPi.GPIO as GPIO
 import subprocess
+import os
+import atexit
+import signal
 import time
 import busio
 from board import *
@@ -26,13 +29,26 @@ import SP420
 import StaticManager as SM
 import DataManager as DM
 import TestingManager as TM
+import StatsManager as STM
+import RotationManager as RM
+import SpoolManager as SPM
+import StatusManager as STSM
+import QueueManager as QM
+import TimeManager as TIM
+import GpioManager as GM
+import IndexManager as IM
+import RollupManager as RUM
+import RecordManager as RCM
 
 from math import floor, ceil
+from collections import deque
 
 # process delay (delay loop by X seconds to slow necessary computing)
 PROCESS_DELAY = 1
 # manual time test limit
 MANUAL_TIME_LIMIT = 300
+# seconds between sensor re-checks while a weather or test error is listed
+SENSOR_RECHECK_SECONDS = 60
 WINDOW_CHECK_INTERVAL = 5
 
 # peripheral i2c bus addresses
@@ -44,11 +60,16 @@ static_master = SM.StaticMaster()
 usb_master = DM.USBMaster()
 test_master = TM.TestingMaster(static_master.get_config())
 print(usb_master.get_USB_path())
-csv_master = DM.CSVMaster(usb_master.get_USB_path())
-adc_master = TM.ADCMaster()
+# data and logs go to the local spool first, the spool is synced to the USB in the background
+spool_master = SPM.SpoolMaster(static_master.get_config(), usb_master)
+csv_master = DM.CSVMaster(spool_master.get_spool_path())
 pow_master = TM.PowerMaster()
 irr_master = SP420.Irradiance()
 pr_master = TM.PerformanceRatio()
+ctrl_cache = TM.ControlCacheMaster(static_master.get_config())
+stats_master = STM.StatsMaster(static_master.get_config(), SM.CONFIG_FILE_PATH)
+# testing queue, an EDS is not queued again while its schedule window (2 x MIN_CHECK_THRESHOLD) is open
+queue_master = QM.QueueMaster(static_master.get_config(), 2 * TM.MIN_CHECK_THRESHOLD * 60)
 
 # channel setup
 
@@ -56,6 +77,8 @@ pr_master = TM.PerformanceRatio()
 # RTC setup
 i2c_bus = busio.I2C(SCL, SDA)
 rtc = adafruit_pcf8523.PCF8523(i2c_bus)
+# wall time from the monotonic clock, the RTC is only read on resync
+time_master = TIM.TimeMaster(static_master.get_config(), rtc)
 
 
 # set time to current if needed
@@ -67,7 +90,38 @@ rtc = adafruit_pcf8523.PCF8523(i2c_bus)
 weather = AM2315.AM2315()
 
 # set up log file
-log_master = DM.LogMaster(usb_master.get_USB_path(), rtc.datetime)
+log_master = DM.LogMaster(spool_master.get_spool_path(), time_master.now())
+# calibration version is stored with every record
+cal_version = test_master.adc_m.get_cal_version()
+
+# rotate and compress log/data files so the spool and USB never fill up
+rotation_master = RM.RotationMaster(static_master.get_config(), spool_master.get_spool_path())
+# never drop a segment from the spool before it is on the USB
+rotation_master.can_remove = spool_master.is_synced
+# time index of the data and log files, the tail of a file is indexed before it is rotated
+index_master = IM.IndexMaster(static_master.get_config(), spool_master.get_spool_path())
+rotation_master.before_rotate = index_master.index_file
+
+def reopen_file(name):
+    # DataManager opens the files in append mode on every write, so a rotated file needs nothing.
+    # A writer that keeps its file open provides reopen(name) and starts the new live file here
+    for master in (csv_master, log_master):
+        if hasattr(master, 'reopen'):
+            master.reopen(name)
+
+rotation_master.after_rotate = reopen_file
+# binary store of the full test records (raw codes, flags, read times), rotated with the data
+record_master = RCM.RecordMaster(spool_master.get_spool_path())
+# daily per panel rollups, kept next to the data
+rollup_master = RUM.RollupMaster(spool_master.get_spool_path(), static_master.get_config())
+spool_master.start()
+
+# local status API, served from the snapshot published at the end of every loop
+status_master = STSM.StatusMaster(static_master.get_config())
+try:
+    status_master.start()
+except Exception as e:
+    print("Status API not started: " + str(e))
 
 
 # time display functions
@@ -86,51 +140,117 @@ eds_ids = test_master.get_config()['EDSIDS']
 ctrl_ids = test_master.get_config()['CTRLIDS']
 
 
-# channel setups
-GPIO.setmode(GPIO.BCM)
+# channel setups (the GPIO manager sets the BCM mode and only switches pins that change)
+gpio_m = test_master.gpio_m
 
-GPIO.setup(test_master.get_pin('outPinLEDGreen'), GPIO.OUT)
-GPIO.setup(test_master.get_pin('outPinLEDRed'), GPIO.OUT)
-GPIO.setup(test_master.get_pin('inPinManualActivate'), GPIO.IN)
-#GPIO.setup(test_master.get_pin('POWER'), GPIO.OUT)
-#GPIO.setup(25, GPIO.OUT)
+gpio_m.set(test_master.get_pin('outPinLEDGreen'), 0)
+gpio_m.set(test_master.get_pin('outPinLEDRed'), 0)
+#gpio_m.set(test_master.get_pin('POWER'), 0)
 
 # for each EDS, CTRL id, set up GPIO channel
+relay_pins = []
 for eds in eds_ids:
-    GPIO.setup(test_master.get_pin('EDS'+str(eds)), GPIO.OUT)
-    GPIO.setup(test_master.get_pin('EDS'+str(eds)+'PV'), GPIO.OUT)
-    
+    relay_pins.append(test_master.get_pin('EDS'+str(eds)))
+    relay_pins.append(test_master.get_pin('EDS'+str(eds)+'PV'))
 for ctrl in ctrl_ids:
-    GPIO.setup(test_master.get_pin('CTRL'+str(ctrl)+'PV'), GPIO.OUT)
+    relay_pins.append(test_master.get_pin('CTRL'+str(ctrl)+'PV'))
+gpio_m.apply(dict((pin, 0) for pin in relay_pins))
+
+def stop_unit(signum, frame):
+    # SIGTERM lands wherever the loop is, a SystemExit would be swallowed by its bare excepts
+    # (e.g. mid manual test), so go to the safe state and leave from here
+    gpio_m.safe_state()
+    try:
+        print_l(time_master.now(), "Stopped by SIGTERM, relays released")
+    except:
+        pass
+    os._exit(0)
+
+# EDS off, relays open and LEDs off whenever the program stops
+# (only for the unit process, the simulation harnesses run this file many times in one process)
+if __name__ == '__main__':
+    atexit.register(gpio_m.safe_state)
+    signal.signal(signal.SIGTERM, stop_unit)
 
 # var setup
 error_cycle_count = 0
 flip_on = True
-temp_pass = False
-humid_pass = False
-schedule_pass = False
 
 # error handling
 error_list = []
 error_flag = False
 
+# status data (latest panel readings, recent sensor reads, loop timing)
+last_measurements = {}
+sensor_history = deque(maxlen=int(test_master.get_param('statusSensorHistory')))
+loop_timing = {'iterations': 0, 'last_seconds': 0, 'max_seconds': 0, 'mean_seconds': 0}
+
+def record_measurement(dt, panel, ocv, scc, cached=False):
+    last_measurements[panel] = {'time': time.strftime('%Y-%m-%d %H:%M:%S', dt), 'ocv': ocv, 'scc': scc, 'cached': cached}
+
+def record_sensors(dt, w_read, g_poa):
+    # w_read is (humidity, temperature) from the AM2315, g_poa from the SP420 (None if not read)
+    humid = w_read[0] if w_read is not None else None
+    temp = w_read[1] if w_read is not None else None
+    sensor_history.append((time.strftime('%Y-%m-%d %H:%M:%S', dt), temp, humid, g_poa))
+
+def publish_status(dt, yday):
+    # build a new snapshot each time, the published one is never modified
+    triggers = {}
+    for eds in eds_ids:
+        minutes = test_master.get_next_trigger(dt, yday, 0, eds)
+        triggers['EDS' + str(eds)] = None if minutes is None else round(minutes, 2)
+    status_master.publish({
+        'time': time.strftime('%Y-%m-%d %H:%M:%S', dt),
+        'errors': list(error_list),
+        'measurements': dict(last_measurements),
+        'triggers': triggers,
+        'sensors': list(sensor_history),
+        'loop': dict(loop_timing),
+        'stats': {'EDS' + str(eds): stats_master.get_summary(eds) for eds in eds_ids},
+        'spool': spool_master.get_status(),
+        'calibration': cal_version,
+        'queue': queue_master.get_history(),
+        'clock': time_master.get_status(),
+        'gpio': gpio_m.get_counts(),
+        'rollup': rollup_master.get_day(dt),
+        })
+
 def add_error(error):
     error_flag = True
     if error not in error_list:
         error_list.append(error)
+    print_l(time_master.now(), "ERROR FOUND: " + error)
+
+def update_rollup(update, *args, **kwargs):
+    # rollups can be rebuilt from the data files, a failing update never stops a test
     try:
-        print_l(rtc.datetime, "ERROR FOUND: " + error)
+        update(*args, **kwargs)
+        
+        # remove error if corrected
+        if "Data-Rollup" in error_list:
+            error_list.remove("Data-Rollup")
     except:
-        rtc.datetime = time.struct_time((1,1,1,1,1,1,1,1,1))
-        print_l(rtc.datetime, "ERROR FOUND: " + error)
+        add_error("Data-Rollup")
+
+def set_pin(name, value, error="GPIO-LED"):
+    # LED and idle pin writes never stop the loop, a failing write is reported
+    try:
+        gpio_m.set(test_master.get_pin(name), value)
+        return True
+    except:
+        add_error(error)
+        return False
 
 # location data for easy use in solar time calculation
 gmt_offset = test_master.get_param('offsetGMT')
 longitude = test_master.get_param('degLongitude')
 latitude = 1 # latitude currently unused
 
+print_l(time_master.now(), "ADC calibration version: " + cal_version)
+
 # detect switch event to manually operate EDS
-GPIO.add_event_detect(test_master.get_pin('inPinManualActivate'), GPIO.RISING)
+gpio_m.setup_input(test_master.get_pin('inPinManualActivate'), GPIO.RISING)
 
 
 '''
@@ -149,12 +269,11 @@ flag = False
 stopped = False
 
 time.sleep(2)
+sensor_recheck = None
 
 while not stopped:
+    loop_start = time.monotonic()
     # set all flags to False
-    temp_pass = False
-    humid_pass = False
-    schedule_pass = False
     weather_pass = False
     
     # MASTER TRY-EXCEPT -> will still allow RED LED to blink if fatal error occurs in loop
@@ -166,14 +285,14 @@ while not stopped:
         # switch power supply and EDS relays OFF (make sure this is always off unless testing)
         '''
         try:
-            #GPIO.setup(test_master.get_pin('POWER'),GPIO.OUT)
-            #GPIO.output(test_master.get_pin('POWER'), 1)
-            #GPIO.cleanup(test_master.get_pin('POWER'))
-            for eds in eds_ids:
-                GPIO.cleanup(test_master.get_pin('EDS'+str(eds)))
-                GPIO.cleanup(test_master.get_pin('EDS'+str(eds)+'PV'))
-            for ctrl in ctrl_ids:
-                GPIO.cleanup(test_master.get_pin('CTRL'+str(ctrl)+'PV'))
+            #gpio_m.release(test_master.get_pin('POWER'))
+            # only pins left switched by the last iteration reach the hardware
+            gpio_m.apply(dict((pin, GM.RELEASED) for pin in relay_pins))
+            gpio_m.check_save()
+            
+            # remove error if corrected
+            if "GPIO-Cleanup" in error_list:
+                error_list.remove("GPIO-Cleanup")
         except:
             add_error("GPIO-Cleanup")
         
@@ -195,41 +314,103 @@ while not stopped:
         Checking if RTC is working (initial check)
         '''
         try:
-            current_time = rtc.datetime
+            current_time = time_master.now()
             solar_offset = ceil(DM.get_solar_time(gmt_offset, current_time, longitude, latitude) * 100)/100
             
-            # remove error if corrected
-            if "Sensor-RTC-1" in error_list:
-                error_list.remove("Sensor-RTC-1")
+            # RTC faults are kept by the time service, time carries on from the monotonic clock
+            rtc_fault = time_master.get_fault()
+            if rtc_fault is None:
+                # remove error if corrected
+                if "Sensor-RTC-1" in error_list:
+                    error_list.remove("Sensor-RTC-1")
+            elif "Sensor-RTC-1" not in error_list:
+                add_error("Sensor-RTC-1")
+                print_l(current_time, "RTC " + rtc_fault + ", drift " + str(round(time_master.get_status()['drift_seconds'], 1)) + " s")
         except:
             add_error("Sensor-RTC-1")
         
+        '''
+        --------------------------------------------------------------------------
+        Index new lines of the log and data files
+        '''
+        try:
+            index_master.check_index()
+            
+            # remove error if corrected
+            if "Data-Index" in error_list:
+                error_list.remove("Data-Index")
+        except:
+            add_error("Data-Index")
+        
+        '''
+        --------------------------------------------------------------------------
+        Rotate log and data files by size and by day
+        '''
+        try:
+            rotation_master.check_rotation(current_time)
+            
+            # remove error if corrected
+            if "Data-Rotation" in error_list:
+                error_list.remove("Data-Rotation")
+        except:
+            add_error("Data-Rotation")
+        
+        # report a missing or failing USB (data is still kept in the spool)
+        if spool_master.get_status()['connected']:
+            if "Data-USB" in error_list:
+                error_list.remove("Data-USB")
+        elif "Data-USB" not in error_list:
+            add_error("Data-USB")
+        
+        # weather and test errors are otherwise only cleared by the next test or solar noon,
+        # re-check their sensors meanwhile (AM2315, then MCP3008 and SP420)
+        weather_errors = [error for error in ["Sensor-Weather-1", "Sensor-Weather-2"] if error in error_list]
+        test_errors = [error for error in ["Test-Auto", "Test-Noon"] if error in error_list]
+        if (weather_errors or test_errors) and (sensor_recheck is None or time.monotonic() - sensor_recheck >= SENSOR_RECHECK_SECONDS):
+            sensor_recheck = time.monotonic()
+            try:
+                if weather_errors:
+                    weather.read_humidity_temperature()
+                    for error in weather_errors:
+                        error_list.remove(error)
+                if test_errors:
+                    test_master.adc_m.scan([0])
+                    irr_master.get_irradiance()
+                    for error in test_errors:
+                        error_list.remove(error)
+            except:
+                pass
+        
         '''
         --------------------------------------------------------------------------
         Green LED Blinks if loop working
         '''
         # flip indicator GREEN LED to show proper working
         if flip_on:
-            GPIO.output(test_master.get_pin('outPinLEDGreen'), 1)
+            led_pass = set_pin('outPinLEDGreen', 1)
             flip_on = False
         else:
-            GPIO.output(test_master.get_pin('outPinLEDGreen'), 0)
+            led_pass = set_pin('outPinLEDGreen', 0)
             flip_on = True
         
         # code for power savings
-        GPIO.output(test_master.get_pin('outPinLEDRed'), 0) 
+        led_pass = set_pin('outPinLEDRed', 0) and led_pass
+        
+        # remove error if corrected
+        if led_pass and "GPIO-LED" in error_list:
+            error_list.remove("GPIO-LED")
 
         '''
         --------------------------------------------------------------------------
         Checking the operational time of EDS 8AM-16PM
         '''
         '''
-        current_dt=rtc.datetime
+        current_dt=time_master.now()
         if current_dt.tm_hour >= 16 or current_dt.tm_hour <= 8:
-            GPIO.output(test_master.get_pin('outPinLEDGreen'), 0)
-            GPIO.output(test_master.get_pin('outPinLEDRed'), 1)
+            gpio_m.set(test_master.get_pin('outPinLEDGreen'), 0)
+            gpio_m.set(test_master.get_pin('outPinLEDRed'), 1)
             time.sleep(2)
-            GPIO.output(test_master.get_pin('outPinLEDRed'), 0) 
+            gpio_m.set(test_master.get_pin('outPinLEDRed'), 0) 
             time.sleep(2)
         '''
 
@@ -247,55 +428,74 @@ while not stopped:
         
         # get current solar time
         try:
-            curr_dt = rtc.datetime
+            curr_dt = time_master.now()
             yday = TM.Y_DAYS[curr_dt.tm_mon - 1] + curr_dt.tm_mday
-            solar_time_min = curr_dt.tm_hour * 60 + curr_dt.tm_min + curr_dt.tm_sec / 60 + solar_offset
         except:
             add_error("Sensor-RTC-2")
         
         # if within 30 seconds of solar noon, run measurements
-        if abs(720 - solar_time_min) < 0.5:
+        if test_master.check_noon(curr_dt, solar_offset):
 
-            print_l(rtc.datetime, "Initiating solar noon procedure for charger, EDS6")
+            print_l(time_master.now(), "Initiating solar noon procedure for charger, EDS6")
             
             # get weather and print values in console
             try:
                 w_read = weather.read_humidity_temperature()
                 print("Temp: ", w_read[1], "C")
                 print("Humid: ", w_read[0], "%")
+                record_sensors(curr_dt, w_read, None)
+                # ambient temperature for ADC temperature compensation
+                test_master.adc_m.set_temperature(w_read[1])
                 # remove error if corrected
                 if "Sensor-Weather-1" in error_list:
                     error_list.remove("Sensor-Weather-1")
             except:
                 add_error("Sensor-Weather-1")
             
-            # EDS OCV and SCC measurements
-            for eds in eds_ids:
-                eds_ocv = 0
-                eds_scc = 0
-                [eds_ocv, eds_scc] = test_master.run_measure_EDS(eds)
-                print_l(curr_dt, "Solar Noon OCV for EDS" + str(eds) + ": " + str(eds_ocv))
-                print_l(curr_dt, "Solar Noon SCC for EDS" + str(eds) + ": " + str(eds_scc))
-                # write data to solar noon csv/txt
-                csv_master.write_noon_data(curr_dt, w_read[1], w_read[0], eds, eds_ocv, eds_scc)
+            try:
+                # EDS and CTRL OCV and SCC measurements
+                # panels wired to their own ADC channel are captured in one SPI burst
+                [noon_readings, scan_info] = test_master.run_measure_noon(eds_ids, ctrl_ids)
+                if scan_info is not None:
+                    print_l(curr_dt, "Solar Noon panel scan OCV burst: " + str(scan_info['OCV'][1]) + " s, SCC burst: " + str(scan_info['SCC'][1]) + " s")
+            
+                for eds in eds_ids:
+                    reading = noon_readings['EDS' + str(eds)]
+                    eds_ocv = reading.ocv
+                    eds_scc = reading.scc
+                    print_l(curr_dt, "Solar Noon OCV for EDS" + str(eds) + ": " + str(eds_ocv))
+                    print_l(curr_dt, "Solar Noon SCC for EDS" + str(eds) + ": " + str(eds_scc))
+                    record_measurement(curr_dt, 'EDS' + str(eds), eds_ocv, eds_scc)
+                    # write data to solar noon csv/txt
+                    csv_master.write_noon_data(curr_dt, w_read[1], w_read[0], eds, eds_ocv, eds_scc)
+                    update_rollup(rollup_master.update_noon, curr_dt, w_read[1], w_read[0], eds, eds_ocv, eds_scc)
             
-            # CTRL OCV and SCC measurements
-            for ctrl in ctrl_ids:
-                ctrl_ocv = 0
-                ctrl_scc = 0
-                [ctrl_ocv, ctrl_scc] = test_master.run_measure_CTRL(ctrl)
-                print_l(curr_dt, "Solar Noon OCV for CTRL" + str(ctrl) + ": " + str(ctrl_ocv))
-                print_l(curr_dt, "Solar Noon SCC for CTRL" + str(ctrl) + ": " + str(ctrl_scc))
-                # write data to solar noon csv/txt
-                csv_master.write_noon_data(curr_dt, w_read[1], w_read[0], -1*ctrl, ctrl_ocv, ctrl_scc)
+                for ctrl in ctrl_ids:
+                    reading = noon_readings['CTRL' + str(ctrl)]
+                    ctrl_ocv = reading.ocv
+                    ctrl_scc = reading.scc
+                    print_l(curr_dt, "Solar Noon OCV for CTRL" + str(ctrl) + ": " + str(ctrl_ocv))
+                    print_l(curr_dt, "Solar Noon SCC for CTRL" + str(ctrl) + ": " + str(ctrl_scc))
+                    record_measurement(curr_dt, 'CTRL' + str(ctrl), ctrl_ocv, ctrl_scc)
+                    # write data to solar noon csv/txt
+                    csv_master.write_noon_data(curr_dt, w_read[1], w_read[0], -1*ctrl, ctrl_ocv, ctrl_scc)
+                    update_rollup(rollup_master.update_noon, curr_dt, w_read[1], w_read[0], -1*ctrl, ctrl_ocv, ctrl_scc)
+                print_l(curr_dt, "Solar Noon measurements done (calibration " + cal_version + ")")
             
-            # activate EDS6 for full testing cycle (no measurements taken)
-            # turn on GREEN LED for duration of test
-            GPIO.output(test_master.get_pin('outPinLEDGreen'), 1)
-            # run test
-            test_master.run_test(test_master.get_pin('solarChargerEDSNumber'))
-            # turn off GREEN LED after test
-            GPIO.output(test_master.get_pin('outPinLEDGreen'), 0)
+                # activate EDS6 for full testing cycle (no measurements taken)
+                # turn on GREEN LED for duration of test
+                set_pin('outPinLEDGreen', 1)
+                # run test
+                test_master.run_test(test_master.get_pin('solarChargerEDSNumber'))
+                # turn off GREEN LED after test
+                set_pin('outPinLEDGreen', 0)
+                
+                # remove error if corrected
+                if "Test-Noon" in error_list:
+                    error_list.remove("Test-Noon")
+            except:
+                print_l(time_master.now(), "Error with solar noon measurements. Please check.")
+                add_error("Test-Noon")
 
         '''
         END SOLAR NOON DATA ACQUISITION CODE
@@ -307,25 +507,18 @@ while not stopped:
         BEGIN AUTOMATIC TESTING ACTIVATION CODE
         The following code handles the automated activation of the each EDS as specified by their schedule in config.txt
         Code outline:
-        For each EDS in sequence, do the following:
-        1) Check if current time matches scheduled activation time for EDS
-        2) If yes, check if current weather matches testing weather parameters, within activation window
-        3) If yes, run complete testing procedure for that EDS
-            3a) Measure OCV and SCC for control PV cells
-            3b) Measure [before] OCV and SCC for EDS PV being tested
-            3c) Flip relays to activate EDS for test duration
-            3d) Measure [after] OCV and SCC for EDS PV being tested
-            3e) Write data to CSV/txt files
+        1) Check if current time matches scheduled activation time for each EDS, queue the ones that match
+        2) If any are queued, check if current weather matches testing weather parameters, within one activation window for the queue
+        3) If yes, run the queue back to back in groups of EDS that can be active together (relays and supply budget)
+            3a) Measure OCV and SCC for control PV cells and [before] OCV and SCC for the EDS PV in the group
+            3b) Flip relays to activate the EDS in the group for test duration
+            3c) Measure [after] OCV and SCC for the EDS PV in the group
+            3d) Write data to CSV/txt files for each EDS
         '''
         # for each EDS check time against schedule, set time flag if yes
         # put EDS in a queue if multiple are to be activated simultaneously
-        eds_testing_queue = []
-        
-        for eds_num in eds_ids:
-            schedule_pass = test_master.check_time(curr_dt, yday, 0, eds_num)
-            schedule_pass = True
-            if schedule_pass:
-                eds_testing_queue.append(eds_num)
+        # (each EDS once per schedule window)
+        eds_testing_queue = queue_master.queue_due(test_master, curr_dt, yday, 0, eds_ids)
         
         # print queue
         if not not eds_testing_queue:
@@ -333,37 +526,39 @@ while not stopped:
             for eds in eds_testing_queue:
                 phrase += str(eds) + " "
             phrase += "]"
-            print_l(rtc.datetime, phrase)
+            print_l(time_master.now(), phrase)
             
-        for eds in eds_testing_queue:
-            # if time check is good, check temp and weather within a set window
+        if not not eds_testing_queue:
+            # if time check is good, check temp and weather within a set window (once for the whole queue)
             window = 0
             # check temp and humidity until they fall within parameter range or max window reached
-            w_read = weather.read_humidity_temperature()
-            temp_pass = test_master.check_temp(w_read[1])
-            humid_pass = test_master.check_humid(w_read[0])
-            weather_pass = temp_pass and humid_pass
+            try:
+                w_read = weather.read_humidity_temperature()
+                weather_pass = test_master.check_weather(w_read)
+                
+                # remove error if corrected
+                if "Sensor-Weather-2" in error_list:
+                    error_list.remove("Sensor-Weather-2")
+            except:
+                add_error("Sensor-Weather-2")
             
             while window < test_master.get_param('testWindowSeconds') and not weather_pass:
                 # increment window by 1 sec
                 window += 1
                 time.sleep(1)
-                GPIO.setup(7, GPIO.OUT)
-                GPIO.output(7,GPIO.LOW)
+                set_pin('SCCBRANCH', 0, "GPIO-Cleanup")
                 # flip GREEN LED because test not initiated yet
                 if flip_on:
-                    GPIO.output(test_master.get_pin('outPinLEDGreen'), 1)
+                    set_pin('outPinLEDGreen', 1)
                     flip_on = False
                 else:
-                    GPIO.output(test_master.get_pin('outPinLEDGreen'), 0)
+                    set_pin('outPinLEDGreen', 0)
                     flip_on = True
                     
                 # check temp and humidity until they fall within parameter range or max window reached
                 try:
                     w_read = weather.read_humidity_temperature()
-                    temp_pass = test_master.check_temp(w_read[1])
-                    humid_pass = test_master.check_humid(w_read[0])
-                    weather_pass = temp_pass and humid_pass
+                    weather_pass = test_master.check_weather(w_read)
                     
                     # remove error if corrected
                     if "Sensor-Weather-2" in error_list:
@@ -371,108 +566,161 @@ while not stopped:
                 except:
                     add_error("Sensor-Weather-2")
             
-            # if out of loop and parameters are met
-            if weather_pass:
-                # run test if all flags passed
-                print_l(rtc.datetime, "Time and weather checks passed. Initiating testing procedure for EDS" + str(eds))
-                # run testing procedure
-                
-                curr_dt = rtc.datetime
+            if not weather_pass:
+                # window closed, the whole queue waits for its next schedule
+                for eds in eds_testing_queue:
+                    queue_master.record_test(eds, window, QM.SKIPPED_WEATHER)
+                update_rollup(rollup_master.update_skipped, time_master.now(), eds_testing_queue)
+                print_l(time_master.now(), "Weather window closed after " + str(window) + " s. Skipped testing of EDS" + ", EDS".join(str(eds) for eds in eds_testing_queue))
+        
+        # if out of loop and parameters are met
+        if not not eds_testing_queue and weather_pass:
+            # ambient temperature for ADC temperature compensation
+            test_master.adc_m.set_temperature(w_read[1])
+            
+            # run the queue back to back, EDS in the same group are activated together
+            for eds_group in queue_master.plan_groups(eds_testing_queue):
+                # a sensor or ADC fault skips the rest of the group, the next group still runs
+                try:
+                    # run test if all flags passed
+                    print_l(time_master.now(), "Time and weather checks passed. Initiating testing procedure for EDS" + ", EDS".join(str(eds) for eds in eds_group))
+                    # run testing procedure
                 
-                # 1) get control OCV and SCC  values for each control
-                ctrl_ocv_data = []
-                ctrl_scc_data = []
-                for ctrl in ctrl_ids:
-                    ocv = 0
-                    scc = 0
-                    [ocv, scc] = test_master.run_measure_CTRL(ctrl)
-                    ctrl_ocv_data.append(ocv)
-                    ctrl_scc_data.append(scc)
-                    print_l(rtc.datetime, "OCV for CTRL" + str(ctrl) + ": " + str(ctrl_ocv_data[ctrl - 1]))
-                    print_l(rtc.datetime, "SCC for CTRL" + str(ctrl) + ": " + str(ctrl_scc_data[ctrl - 1]))
-                                
-                # 2) get OCV and SCC 'before' value for EDS being tested
-                [eds_ocv_before, eds_scc_before] = test_master.run_measure_EDS(eds)
-                print_l(rtc.datetime, "Pre-test OCV for EDS" + str(eds) + ": " + str(eds_ocv_before))
-                print_l(rtc.datetime, "Pre-test SCC for EDS" + str(eds) + ": " + str(eds_scc_before))
+                    curr_dt = time_master.now()
                 
-                # 3) activate EDS for test duration
-                # turn on GREEN LED for duration of test
-                GPIO.output(test_master.get_pin('outPinLEDGreen'), 1)
-                # run test
-                test_master.run_test(eds)
-                # turn off GREEN LED after test
-                GPIO.output(test_master.get_pin('outPinLEDGreen'), 0)
+                    # 1) get control OCV and SCC  values for each control
+                    # recent control readings are reused while irradiance is steady, the rest are measured
+                    # together with the 'before' values of the EDS in the group (one SPI burst for panels on their own channel)
+                    g_check = irr_master.get_irradiance()
+                    [ctrl_cached, test_readings, scan_info] = test_master.run_measure_group(eds_group, ctrl_ids, ctrl_cache, g_check)
+                    if scan_info is not None:
+                        print_l(time_master.now(), "Panel scan OCV burst: " + str(scan_info['OCV'][1]) + " s, SCC burst: " + str(scan_info['SCC'][1]) + " s")
                 
-                # 4) get OCV and SCC of PV 'after' value for EDS being tested
-                [eds_ocv_after, eds_scc_after] = test_master.run_measure_EDS(eds)
-                print_l(rtc.datetime, "Post-test OCV for EDS" + str(eds) + ": " + str(eds_ocv_after))
-                print_l(rtc.datetime, "Post-test SCC for EDS" + str(eds) + ": " + str(eds_scc_after))
+                    # control readings in CTRLIDS order, shared by every record of the group
+                    ctrl_readings = []
+                    for ctrl in ctrl_ids:
+                        panel = 'CTRL' + str(ctrl)
+                        if panel in ctrl_cached:
+                            [[ocv, scc], ctrl_age, read_time] = ctrl_cached[panel]
+                            reading = RCM.PanelReading(panel, ocv, scc, stamp=read_time, cached=True, age=ctrl_age)
+                            print_l(time_master.now(), "Using cached values for " + panel + " (" + str(round(ctrl_age)) + " s old)")
+                        else:
+                            reading = test_readings[panel]
+                        ctrl_readings.append(reading)
+                        print_l(time_master.now(), "OCV for " + panel + ": " + str(reading.ocv))
+                        print_l(time_master.now(), "SCC for " + panel + ": " + str(reading.scc))
+                                
+                    # 2) get OCV and SCC 'before' value for each EDS being tested
+                    for eds in eds_group:
+                        reading = test_readings['EDS' + str(eds)]
+                        print_l(time_master.now(), "Pre-test OCV for EDS" + str(eds) + ": " + str(reading.ocv))
+                        print_l(time_master.now(), "Pre-test SCC for EDS" + str(eds) + ": " + str(reading.scc))
                 
-                # 5) compile all measurements for eds and control
-                # write data for EDS tested
-                data_ocv_scc = [eds_ocv_before, eds_ocv_after, eds_scc_before, eds_scc_after]
-                # append control data
-                for ctrl in ctrl_ids:
-                    data_ocv_scc.append(ctrl_ocv_data[ctrl - 1])
-                    data_ocv_scc.append(ctrl_scc_data[ctrl - 1])
+                    # 3) activate EDS for test duration
+                    for eds in eds_group:
+                        record = queue_master.record_test(eds, window, QM.FIRED)
+                        print_l(time_master.now(), "EDS" + str(eds) + " weather wait: " + str(record['wait_seconds']) + " s, start latency: " + str(record['start_latency_seconds']) + " s")
+                    # turn on GREEN LED for duration of test
+                    set_pin('outPinLEDGreen', 1)
+                    # run test
+                    test_master.run_test_group(eds_group)
+                    # turn off GREEN LED after test
+                    set_pin('outPinLEDGreen', 0)
                 
-                # 6) get readings from the SP420 pyranometer
-                g_poa =irr_master.get_irradiance()
-                #g_poa = 800
-                print_l(rtc.datetime, "Global Irradiance" + str(eds) + ": " + str(g_poa))
+                    # 4) get OCV and SCC of PV 'after' value for each EDS being tested
+                    [after_readings, scan_info] = test_master.run_measure_panels(['EDS' + str(eds) for eds in eds_group])
                 
-                # 7) compute the power output from the v_oc and i_sc measurements
-                #initialize empty list
-                power_data = []
-
-                #get the panel temperature using ambient temperature
-                amb_temp = w_read[1]
-                pan_temp = pow_master.get_panel_temp(amb_temp,g_poa)
+                    # 6) get readings from the SP420 pyranometer
+                    g_poa =irr_master.get_irradiance()
+                    #g_poa = 800
                 
-                # compute the measurements for each panel
-                eds_power_before = pow_master.get_power_out(eds_ocv_before,eds_scc_before,pan_temp)
-                eds_power_after = pow_master.get_power_out(eds_ocv_after,eds_scc_after,pan_temp)
-                ctrl1_power = pow_master.get_power_out(data_ocv_scc[4],data_ocv_scc[5],pan_temp)
-                ctrl2_power = pow_master.get_power_out(data_ocv_scc[6],data_ocv_scc[7],pan_temp)
+                    # keep the latest values for the status API
+                    record_sensors(curr_dt, w_read, g_poa)
+                    for reading in ctrl_readings:
+                        record_measurement(curr_dt, reading.panel, reading.ocv, reading.scc, reading.cached)
                 
-                # compile the results to the list
-                power_data.append(eds_power_before)
-                power_data.append(eds_power_after)
-                power_data.append(ctrl1_power)
-                power_data.append(ctrl2_power)
+                    # 7) compute the power output and Performance Ratio of the controls once for the group
+                    #get the panel temperature using ambient temperature
+                    amb_temp = w_read[1]
+                    pan_temp = pow_master.get_panel_temp(amb_temp,g_poa)
+                    pow_master.fill_power(ctrl_readings, pan_temp)
+                    pr_master.fill_pr(ctrl_readings, pan_temp, g_poa)
+                    for reading in ctrl_readings:
+                        print_l(time_master.now(), "Power for " + reading.panel + ": " + str(reading.power))
+                        print_l(time_master.now(), "PR for " + reading.panel + ": " + str(reading.pr))
                 
-                # print and log the power values
-                print_l(rtc.datetime, "Pre-test Power for EDS" + str(eds) + ": " + str(eds_power_before))
-                print_l(rtc.datetime, "Post-test Power for EDS" + str(eds) + ": " + str(eds_power_after))
-                print_l(rtc.datetime, "Power for CTRL1" + str(1) + ": " + str(ctrl1_power))
-                print_l(rtc.datetime, "Power for CTRL2" + str(2) + ": " + str(ctrl2_power))
-
-                # 8) calculate the Performance Ratio measurements for each panel
-                #initialize empty list
-                pr_data = []
-
-                # compute the measurements for each panel
-                eds_pr_before = pr_master.get_pr(eds_ocv_before,eds_scc_before,pan_temp,eds_power_before, g_poa)
-                eds_pr_after = pr_master.get_pr(eds_ocv_after,eds_scc_after,pan_temp,eds_power_after, g_poa)
-                ctrl1_pr = pr_master.get_pr(data_ocv_scc[4],data_ocv_scc[5],pan_temp,ctrl1_power, g_poa)
-                ctrl2_pr = pr_master.get_pr(data_ocv_scc[6],data_ocv_scc[7],pan_temp,ctrl2_power, g_poa)
-
-                # compile the results to the list
-                pr_data.append(eds_pr_before)
-                pr_data.append(eds_pr_after)
-                pr_data.append(ctrl1_pr)
-                pr_data.append(ctrl2_pr)
-
-                # print and log the PR values
-                print_l(rtc.datetime, "Pre-test PR for EDS" + str(eds) + ": " + str(eds_pr_before))
-                print_l(rtc.datetime, "Post-test PR for EDS" + str(eds) + ": " + str(eds_pr_after))
-                print_l(rtc.datetime, "PR for CTRL1" + str(1) + ": " + str(ctrl1_pr))
-                print_l(rtc.datetime, "PR for CTRL2" + str(2) + ": " + str(ctrl2_pr))
+                    recorded = True
+                    for eds in eds_group:
+                        # the EDS of the group were fired together, one failed record does not drop the others
+                        try:
+                            # 5) compile all measurements for eds and control
+                            test_record = RCM.TestRecord(curr_dt, w_read[1], w_read[0], g_poa, eds, test_readings['EDS' + str(eds)],
+                                                        after_readings['EDS' + str(eds)], ctrl_readings, pan_temp, cal_version)
+                            before = test_record.before
+                            after = test_record.after
+                            print_l(time_master.now(), "Post-test OCV for EDS" + str(eds) + ": " + str(after.ocv))
+                            print_l(time_master.now(), "Post-test SCC for EDS" + str(eds) + ": " + str(after.scc))
+                            print_l(time_master.now(), "Global Irradiance" + str(eds) + ": " + str(g_poa))
+                    
+                            # 8) power output and Performance Ratio before and after
+                            pow_master.fill_power([before, after], pan_temp)
+                            pr_master.fill_pr([before, after], pan_temp, g_poa)
+                    
+                            # print and log the power and PR values
+                            print_l(time_master.now(), "Pre-test Power for EDS" + str(eds) + ": " + str(before.power))
+                            print_l(time_master.now(), "Post-test Power for EDS" + str(eds) + ": " + str(after.power))
+                            print_l(time_master.now(), "Pre-test PR for EDS" + str(eds) + ": " + str(before.pr))
+                            print_l(time_master.now(), "Post-test PR for EDS" + str(eds) + ": " + str(after.pr))
+                            flags = test_record.get_flags() & ~RCM.FLAG_CACHED
+                            if flags:
+                                print_l(time_master.now(), "Quality flags for EDS" + str(eds) + ": " + ", ".join(RCM.get_flag_names(flags)))
+                    
+                            record_measurement(curr_dt, 'EDS' + str(eds), after.ocv, after.scc)
+                    
+                            # 9) finish up, write data to CSV (legacy column lists, any number of controls)
+                            testing_data = test_record.get_testing_data()
+                            csv_master.write_testing_data(*testing_data)
+                            update_rollup(rollup_master.update_test, *testing_data, ctrl_stamps=test_record.get_ctrl_stamps())
+                            try:
+                                record_master.append(test_record)
+                            
+                                # remove error if corrected
+                                if "Data-Records" in error_list:
+                                    error_list.remove("Data-Records")
+                            except:
+                                print_l(time_master.now(), "Error writing the binary record of EDS" + str(eds) + ". Please check.")
+                                add_error("Data-Records")
+                    
+                            # 10) update soiling statistics for the EDS (the test is recorded either way)
+                            try:
+                                stats_master.update_test(eds, before.scc, after.scc, [reading.scc for reading in ctrl_readings], before.pr, after.pr)
+                                print_l(time_master.now(), stats_master.get_phrase(eds))
+                            
+                                # remove error if corrected
+                                if "Data-Stats" in error_list:
+                                    error_list.remove("Data-Stats")
+                            except:
+                                print_l(time_master.now(), "Error updating statistics for EDS" + str(eds) + ". Please check.")
+                                add_error("Data-Stats")
+                            print_l(time_master.now(), "Ended automated scheduled test of EDS" + str(eds) + " (calibration " + cal_version + ", " + test_record.get_ctrl_source() + " control values)")
+                        except:
+                            print_l(time_master.now(), "Error recording automated test of EDS" + str(eds) + ". Please check.")
+                            recorded = False
                 
-                # 9) finish up, write data to CSV
-                csv_master.write_testing_data(curr_dt, w_read[1], w_read[0], g_poa, eds, data_ocv_scc, power_data, pr_data)
-                print_l(rtc.datetime, "Ended automated scheduled test of EDS" + str(eds))
+                    
+                    # remove error if corrected
+                    if not recorded:
+                        add_error("Test-Auto")
+                    elif "Test-Auto" in error_list:
+                        error_list.remove("Test-Auto")
+                except:
+                    print_l(time_master.now(), "Error with automated testing of EDS" + ", EDS".join(str(eds) for eds in eds_group) + ". Please check.")
+                    add_error("Test-Auto")
+                    # EDS off and relays open before the next group
+                    try:
+                        gpio_m.apply(dict((pin, GM.RELEASED) for pin in relay_pins))
+                    except:
+                        pass
                 
         '''
         END AUTOMATIC TESTING ACTIVATION CODE
@@ -492,63 +740,72 @@ while not stopped:
         6) Check SCC on EDS for [after] measurement
         '''
         
-        if GPIO.event_detected(test_master.get_pin('inPinManualActivate')):
+        try:
+            manual_pass = gpio_m.event_detected(test_master.get_pin('inPinManualActivate')) and gpio_m.input(test_master.get_pin('inPinManualActivate'))
+            
+            # remove error if corrected
+            if "GPIO-Input" in error_list:
+                error_list.remove("GPIO-Input")
+        except:
+            manual_pass = False
+            add_error("GPIO-Input")
+        
+        if manual_pass:
             # run EDS test on selected manual EDS
+            # flag for test duration
+            man_flag = False
             
-            if GPIO.input(test_master.get_pin('inPinManualActivate')):
-                # flag for test duration
-                man_flag = False
-                
-                eds_num = test_master.get_pin('manualEDSNumber')
-                
+            eds_num = test_master.get_pin('manualEDSNumber')
+            
+            # solid GREEN for duration of manual test
+            set_pin('outPinLEDGreen', 1)
+            print_l(time_master.now(), "FORCED. Running EDS" + str(eds_num) + " testing sequence. FLIP SWITCH OFF TO STOP.")
+            try:
                 # get weather and time for data logging
-                curr_dt = rtc.datetime
+                curr_dt = time_master.now()
                 w_read = weather.read_humidity_temperature()
                 
-                # solid GREEN for duration of manual test
-                GPIO.output(test_master.get_pin('outPinLEDGreen'), 1)
-                print_l(rtc.datetime, "FORCED. Running EDS" + str(eds_num) + " testing sequence. FLIP SWITCH OFF TO STOP.")
-                try:
-                    # measure PV current before activation
-                    [eds_ocv_before, eds_scc_before] = test_master.run_measure_EDS(eds_num)
-                    print_l(rtc.datetime, "Pre-test OCV for EDS" + str(eds_num) + ": " + str(eds_ocv_before)) 
-                    print_l(rtc.datetime, "Pre-test SCC for EDS" + str(eds_num) + ": " + str(eds_scc_before))            
-            
-                    # run first half of test
-                    test_master.run_test_begin(eds_num)
-                    time_elapsed = 0
-                    
-                    # 3) wait for switch to be flipped OFF
-                    while not man_flag:
-                        if GPIO.event_detected(test_master.get_pin('inPinManualActivate')):
-                            man_flag = True
-                            
-                        time_elapsed += 0.1
-                        if time_elapsed > MANUAL_TIME_LIMIT:
-                            man_flag = True
+                # measure PV current before activation
+                [eds_ocv_before, eds_scc_before] = test_master.run_measure_EDS(eds_num)
+                print_l(time_master.now(), "Pre-test OCV for EDS" + str(eds_num) + ": " + str(eds_ocv_before)) 
+                print_l(time_master.now(), "Pre-test SCC for EDS" + str(eds_num) + ": " + str(eds_scc_before))            
+        
+                # run first half of test
+                test_master.run_test_begin(eds_num)
+                time_elapsed = 0
+                
+                # 3) wait for switch to be flipped OFF
+                while not man_flag:
+                    if gpio_m.event_detected(test_master.get_pin('inPinManualActivate')):
+                        man_flag = True
                         
-                        time.sleep(0.1)
-                    
-                    # then run second half of test (cleanup phase)
-                    test_master.run_test_end(eds_num)
-                    
-                    [eds_ocv_after, eds_scc_after] = test_master.run_measure_EDS(eds_num)
-                    print_l(rtc.datetime, "Post-test OCV for EDS" + str(eds_num) + ": " + str(eds_ocv_after))
-                    print_l(rtc.datetime, "Post-test SCC for EDS" + str(eds_num) + ": " + str(eds_scc_after))
+                    time_elapsed += 0.1
+                    if time_elapsed > MANUAL_TIME_LIMIT:
+                        man_flag = True
                     
-                    # write data for EDS tested
-                    csv_master.write_manual_data(curr_dt, w_read[1], w_read[0], eds_num, eds_ocv_before, eds_ocv_after, eds_scc_before, eds_scc_after)
-                    
-                    print_l(rtc.datetime, "Ended manual test of EDS" + str(eds_num))
+                    time.sleep(0.1)
                 
-                except:
-                    print_l(rtc.datetime, "Error with manual testing sequence. Please check.")
-                    add_error("Test-Manual")
-            
+                # then run second half of test (cleanup phase)
+                test_master.run_test_end(eds_num)
+                
+                [eds_ocv_after, eds_scc_after] = test_master.run_measure_EDS(eds_num)
+                print_l(time_master.now(), "Post-test OCV for EDS" + str(eds_num) + ": " + str(eds_ocv_after))
+                print_l(time_master.now(), "Post-test SCC for EDS" + str(eds_num) + ": " + str(eds_scc_after))
+                
+                # write data for EDS tested
+                csv_master.write_manual_data(curr_dt, w_read[1], w_read[0], eds_num, eds_ocv_before, eds_ocv_after, eds_scc_before, eds_scc_after)
+                update_rollup(rollup_master.update_manual, curr_dt, w_read[1], w_read[0], eds_num, eds_ocv_before, eds_ocv_after, eds_scc_before, eds_scc_after)
+                
+                print_l(time_master.now(), "Ended manual test of EDS" + str(eds_num) + " (calibration " + cal_version + ")")
             
-                # either way, turn off GREEN LED indicator
-                GPIO.output(test_master.get_pin('outPinLEDGreen'),0)
+            except:
+                print_l(time_master.now(), "Error with manual testing sequence. Please check.")
+                add_error("Test-Manual")
+        
         
+            # either way, turn off GREEN LED indicator
+            set_pin('outPinLEDGreen', 0)
+    
         '''
         END MANUAL ACTIVATION CODE
         --------------------------------------------------------------------------
@@ -568,16 +825,29 @@ while not stopped:
         e_phrase = "Current error list: "
         for err in error_list:
             e_phrase += " [" + err + "]"
-        print_l(rtc.datetime, e_phrase)
+        print_l(time_master.now(), e_phrase)
         
     # flip indicator RED LED if error flag raised
     if error_flag:
         if flip_on:
-            GPIO.output(test_master.get_pin('outPinLEDRed'), 1)
+            set_pin('outPinLEDRed', 1)
         else:
-            GPIO.output(test_master.get_pin('outPinLEDRed'), 0) 
+            set_pin('outPinLEDRed', 0)
     
     
+    # loop timing (without the processing delay) and status snapshot for the API
+    loop_seconds = time.monotonic() - loop_start
+    loop_timing['iterations'] += 1
+    loop_timing['last_seconds'] = loop_seconds
+    loop_timing['max_seconds'] = max(loop_timing['max_seconds'], loop_seconds)
+    loop_timing['mean_seconds'] += (loop_seconds - loop_timing['mean_seconds']) / loop_timing['iterations']
+    try:
+        publish_status(curr_dt, yday)
+        if "Status-API" in error_list:
+            error_list.remove("Status-API")
+    except:
+        add_error("Status-API")
+    
     # delay to slow down processing
     time.sleep(PROCESS_DELAY)
     
@@ -0,0 +1,308 @@
+'''
+=============================
+Title: Schedule Optimizer - EDS Field Control
+Started: October 2026
+=============================
+'''
+
+'''
+Searches candidate SCHEDS1..SCHEDS6 period/offset sets and weather limits by replaying
+recorded site data for each candidate (ReplayManager) on every CPU core, and ranks them by
+cleaning benefit per unit of EDS energy and measurement time. Results are cached by a hash
+of the candidate, the replay inputs and the unit/simulator code, so running a search again
+only evaluates new candidates.
+
+Usage:
+    python3 OptimizerManager.py <trace .csv> [--config config.json] [--candidates 200] [--space space.json]
+'''
+
+import os
+import glob
+import json
+import random
+import hashlib
+import argparse
+import tempfile
+import multiprocessing
+
+import ReplayManager as RPM
+import QueueManager as QM
+
+# default cache file (kept next to the trace)
+CACHE_FILE_NAME = "optimizer_cache.json"
+
+'''
+Default search space
+periods/offsets build the [period, offset] pairs of each SCHEDS entry, thresholds are
+the values tried for each weather limit in config.json
+'''
+
+DEFAULT_SPACE = {
+    'periods': [1, 2, 3, 7],
+    'offsets': [-3, -2, -1, 0, 1, 2, 3],
+    'max_pairs': 3,
+    'thresholds': {
+        'maxTemperatureCelsius': [35, 40, 45],
+        'minTemperatureCelsius': [5, 10],
+        'maxRelativeHumidity': [50, 60, 70],
+        'minRelativeHumidity': [20, 30],
+        },
+    }
+
+# soiling model used to value a cleaning (same defaults as the simulated environment)
+DEFAULT_MODEL = {
+    'soiling_per_day': 0.003,
+    'max_soiling': 0.3,
+    'clean_efficiency': 0.9,
+    # (EDS supply power while active comes from the config, edsPowerWatts and EDSPOWERWATTS)
+    # Wh of cost charged per hour the unit is busy measuring/testing
+    'time_weight': 1.0,
+    }
+
+
+def make_candidates(config, space, count, seed):
+    # random candidates from the search space, the current config is always first
+    eds_ids = config['EDSIDS']
+    candidates = [dict((key, config[key]) for key in candidate_keys(config, space))]
+    rng = random.Random(seed)
+    pairs = [[period, offset] for period in space['periods'] for offset in space['offsets']]
+    while len(candidates) < count:
+        candidate = {}
+        for eds in eds_ids:
+            size = rng.randint(1, space['max_pairs'])
+            candidate['SCHEDS' + str(eds)] = sorted(rng.sample(pairs, size))
+        for key, values in space['thresholds'].items():
+            candidate[key] = rng.choice(values)
+        candidates.append(candidate)
+    return candidates
+
+
+def candidate_keys(config, space):
+    return ['SCHEDS' + str(eds) for eds in config['EDSIDS']] + sorted(space['thresholds'])
+
+
+def get_trace_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as tf:
+        for chunk in iter(lambda: tf.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_code_hash():
+    # every module of the unit and the simulator, a code change can change any replay
+    digest = hashlib.sha1()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for path in sorted(glob.glob(os.path.join(directory, '*.py'))):
+        digest.update(os.path.basename(path).encode())
+        with open(path, 'rb') as cf:
+            digest.update(cf.read())
+    return digest.hexdigest()
+
+
+def get_candidate_hash(config, candidate, replay_key):
+    # hash of everything that changes the result of an evaluation
+    full_config = dict(config)
+    full_config.update(candidate)
+    content = json.dumps({'config': full_config, 'replay': replay_key}, sort_keys=True)
+    return hashlib.sha1(content.encode()).hexdigest()
+
+
+def get_average_soiling(times, start, end, model):
+    # time averaged soiling fraction of one panel cleaned at the given times
+    rate = model['soiling_per_day'] / 86400
+    cap = model['max_soiling']
+    # panel starts the period half soiled like the simulated environment
+    level = cap / 2
+    total = 0.0
+    last = start
+    for epoch in sorted(times) + [end]:
+        span = epoch - last
+        # integrate min(cap, level + rate * t) over span
+        if rate > 0 and level < cap:
+            rise = min(span, (cap - level) / rate)
+            total += level * rise + rate * rise * rise / 2 + cap * (span - rise)
+        else:
+            total += cap * span
+        level = min(cap, level + rate * span)
+        if epoch < end:
+            level *= 1 - model['clean_efficiency']
+        last = epoch
+    return total / max(end - start, 1)
+
+
+def score_report(report, config, model):
+    # cleaning benefit (panel-days of output recovered) per unit of energy and time
+    start = report['start']
+    end = report['end']
+    days = (end - start) / 86400
+    cleanings = {}
+    for event in report['events']:
+        if event['outcome'] == RPM.FIRED and event['eds'] != 'NOON':
+            cleanings.setdefault(event['eds'], []).append(event['time'] + event['start_latency_seconds'])
+
+    benefit = 0.0
+    for eds in config['EDSIDS']:
+        uncleaned = get_average_soiling([], start, end, model)
+        cleaned = get_average_soiling(cleanings.get(eds, []), start, end, model)
+        benefit += (uncleaned - cleaned) * days
+
+    totals = report['totals']
+    # each EDS draws its own supply power (same as the queue power budget)
+    fired_watts = sum(QM.get_eds_power(config, eds) * len(times) for eds, times in cleanings.items())
+    energy_wh = fired_watts * float(config['testDurationSeconds']) / 3600
+    busy_hours = totals['busy_seconds'] / 3600
+    cost = energy_wh + model['time_weight'] * busy_hours
+    return {
+        'score': benefit / cost if cost > 0 else 0.0,
+        'benefit_panel_days': benefit,
+        'energy_wh': energy_wh,
+        'busy_hours': busy_hours,
+        'wait_hours': totals['wait_seconds'] / 3600,
+        'fired': totals[RPM.FIRED],
+        'skipped_weather': totals[RPM.SKIPPED_WEATHER],
+        'missed_busy': totals[RPM.MISSED_BUSY],
+        }
+
+'''
+Worker process functions (trace is loaded once per process)
+'''
+
+worker_state = {}
+
+
+def init_worker(trace_path, columns, max_gap, config, model, start, end, use_solar_offset):
+    worker_state['trace'] = RPM.WeatherTrace.load(trace_path, columns, max_gap)
+    worker_state['config'] = config
+    worker_state['model'] = model
+    worker_state['span'] = (start, end)
+    worker_state['use_solar_offset'] = use_solar_offset
+
+
+def evaluate(job):
+    candidate_hash, candidate = job
+    config = dict(worker_state['config'])
+    config.update(candidate)
+    with tempfile.TemporaryDirectory(prefix='eds_opt_') as workdir:
+        replay_master = RPM.ReplayMaster(config, worker_state['trace'], workdir, worker_state['use_solar_offset'])
+        try:
+            report = replay_master.run(*worker_state['span'])
+        finally:
+            replay_master.close()
+    result = score_report(report, config, worker_state['model'])
+    result['candidate'] = candidate
+    return candidate_hash, result
+
+'''
+Optimizer Master Class:
+Functionality:
+1) Builds candidate schedules and weather limits from a search space
+2) Evaluates candidates that are not cached yet in parallel across CPU cores
+3) Caches results by configuration hash and ranks all candidates by score
+'''
+
+class OptimizerMaster:
+
+    def __init__(self, config_dictionary, trace_path, cache_path, model=None, space=None):
+        self.config = config_dictionary
+        self.trace_path = trace_path
+        self.cache_path = cache_path
+        self.model = dict(DEFAULT_MODEL)
+        if model:
+            self.model.update(model)
+        self.space = space if space else DEFAULT_SPACE
+        self.cache = {}
+        self.load_cache()
+
+    def load_cache(self):
+        if not os.path.isfile(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, 'r') as cf:
+                self.cache = json.load(cf)
+        except:
+            print("Error loading optimizer cache. Starting with an empty cache!")
+            self.cache = {}
+
+    def save_cache(self):
+        tmp_path = self.cache_path + '.tmp'
+        with open(tmp_path, 'w') as cf:
+            json.dump(self.cache, cf)
+        os.replace(tmp_path, self.cache_path)
+
+    def search(self, count, seed=0, processes=None, columns=None, max_gap=RPM.DEFAULT_MAX_GAP,
+               start=None, end=None, use_solar_offset=False):
+        replay_key = {
+            'trace': get_trace_hash(self.trace_path),
+            'columns': columns,
+            'max_gap': max_gap,
+            'start': start,
+            'end': end,
+            'solar_offset': use_solar_offset,
+            'model': self.model,
+            'code': get_code_hash(),
+            }
+        candidates = make_candidates(self.config, self.space, count, seed)
+        hashes = [get_candidate_hash(self.config, candidate, replay_key) for candidate in candidates]
+        jobs = [(candidate_hash, candidate) for candidate_hash, candidate in zip(hashes, candidates)
+                if candidate_hash not in self.cache]
+        print(str(len(candidates) - len(jobs)) + " cached, " + str(len(jobs)) + " to evaluate")
+
+        if jobs:
+            init_args = (self.trace_path, columns, max_gap, self.config, self.model, start, end, use_solar_offset)
+            with multiprocessing.Pool(processes, init_worker, init_args) as pool:
+                for done, (candidate_hash, result) in enumerate(pool.imap_unordered(evaluate, jobs), 1):
+                    self.cache[candidate_hash] = result
+                    # save as we go so an interrupted search is not lost
+                    self.save_cache()
+                    print("Evaluated " + str(done) + "/" + str(len(jobs)) + ", score " + str(round(result['score'], 4)))
+
+        ranking = [self.cache[candidate_hash] for candidate_hash in set(hashes)]
+        ranking.sort(key=lambda result: result['score'], reverse=True)
+        return ranking
+
+
+def print_ranking(ranking, top):
+    print("rank  score    benefit  energy[Wh]  busy[h]  fired  weather  missed")
+    for rank, result in enumerate(ranking[:top], 1):
+        print(str(rank).ljust(6) + str(round(result['score'], 4)).ljust(9) + str(round(result['benefit_panel_days'], 2)).ljust(9)
+              + str(round(result['energy_wh'], 1)).ljust(12) + str(round(result['busy_hours'], 1)).ljust(9)
+              + str(result['fired']).ljust(7) + str(result['skipped_weather']).ljust(9) + str(result['missed_busy']))
+        print("      " + json.dumps(result['candidate'], sort_keys=True))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Search EDS schedules and weather limits over recorded site data.")
+    RPM.add_trace_arguments(parser)
+    parser.add_argument('--candidates', type=int, default=100, help="number of candidates (including the current config)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--processes', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--space', help=".json search space (see DEFAULT_SPACE)")
+    parser.add_argument('--model', help=".json soiling/energy model overrides (see DEFAULT_MODEL)")
+    parser.add_argument('--cache', help="result cache file (default: next to the trace)")
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--output', help="write the full ranking to this .json")
+    args = parser.parse_args()
+
+    trace, start, end = RPM.load_trace_arguments(args)
+    columns = {'time': args.time_col, 'temperature': args.temp_col, 'humidity': args.humid_col, 'irradiance': args.irr_col}
+    space = None
+    if args.space:
+        with open(args.space, 'r') as sf:
+            space = dict(DEFAULT_SPACE)
+            space.update(json.load(sf))
+    model = None
+    if args.model:
+        with open(args.model, 'r') as mf:
+            model = json.load(mf)
+    cache_path = args.cache
+    if cache_path is None:
+        cache_path = os.path.join(os.path.dirname(os.path.abspath(args.trace)), CACHE_FILE_NAME)
+
+    optimizer_master = OptimizerMaster(RPM.load_config(args.config), args.trace, cache_path, model, space)
+    ranking = optimizer_master.search(args.candidates, args.seed, args.processes, columns, args.max_gap,
+                                      start, end, args.solar_offset)
+    print_ranking(ranking, args.top)
+    if args.output:
+        with open(args.output, 'w') as of:
+            json.dump(ranking, of)
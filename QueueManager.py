@@ -0,0 +1,89 @@
+'''
+=============================
+Title: EDS Testing Queue Dispatcher - EDS Field Control
+Started: October 2026
+=============================
+'''
+
+import time
+from collections import deque
+
+# outcomes of a queued test (same names as the replay simulator report)
+FIRED = 'fired'
+SKIPPED_WEATHER = 'skipped_weather'
+
+
+def get_eds_power(config_dictionary, eds_num):
+    # supply power drawn by an active EDS (W), per EDS overrides in EDSPOWERWATTS
+    power_map = config_dictionary['EDSPOWERWATTS']
+    return float(power_map.get('EDS' + str(eds_num), config_dictionary['edsPowerWatts']))
+
+'''
+Queue Master Class:
+Functionality:
+1) Queues each due EDS once per schedule window (no re-queue while the window is still open)
+2) Splits a queue into groups of EDS that can be active at the same time
+   (no shared relay pins, total EDS power within the supply budget)
+3) Records per-test weather wait and start latency from the time the EDS was queued
+'''
+
+class QueueMaster:
+
+    def __init__(self, config_dictionary, requeue_seconds):
+        self.config = config_dictionary
+        self.requeue_seconds = float(requeue_seconds)
+        self.budget = float(config_dictionary['edsSupplyBudgetWatts'])
+        # {eds: monotonic time queued}
+        self.queued_at = {}
+        # latest test records for the status API
+        self.history = deque(maxlen=int(config_dictionary['queueHistory']))
+
+    def check_queue(self, eds_num):
+        # True if a due EDS should be queued (once per schedule window)
+        now = time.monotonic()
+        last = self.queued_at.get(eds_num)
+        if last is not None and now - last < self.requeue_seconds:
+            return False
+        self.queued_at[eds_num] = now
+        return True
+
+    def queue_due(self, test_master, dt, yday, solar_offset, eds_ids):
+        # EDS whose schedule window is open, each queued once per window
+        return [eds for eds in eds_ids if test_master.check_time(dt, yday, solar_offset, eds) and self.check_queue(eds)]
+
+    def get_power(self, eds_num):
+        return get_eds_power(self.config, eds_num)
+
+    def get_relays(self, eds_num):
+        return {int(self.config['EDS' + str(eds_num)]), int(self.config['EDS' + str(eds_num) + 'PV'])}
+
+    def plan_groups(self, queue):
+        # first fit in queue order, each group can be activated together
+        groups = []
+        for eds in queue:
+            power = self.get_power(eds)
+            relays = self.get_relays(eds)
+            for group in groups:
+                if group['power'] + power <= self.budget and not (group['relays'] & relays):
+                    group['eds'].append(eds)
+                    group['power'] += power
+                    group['relays'] |= relays
+                    break
+            else:
+                groups.append({'eds': [eds], 'power': power, 'relays': set(relays)})
+        return [group['eds'] for group in groups]
+
+    def record_test(self, eds_num, wait_seconds, outcome):
+        # wait is the batch weather wait, start latency is queue to EDS activation
+        queued = self.queued_at.get(eds_num, time.monotonic())
+        record = {
+            'eds': eds_num,
+            'outcome': outcome,
+            'wait_seconds': round(wait_seconds, 3),
+            'start_latency_seconds': round(time.monotonic() - queued, 3),
+            }
+        self.history.append(record)
+        return record
+
+    def get_history(self):
+        return list(self.history)
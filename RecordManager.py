@@ -0,0 +1,293 @@
+'''
+=============================
+Title: Measurement Records - EDS Field Control
+Started: October 2026
+=============================
+'''
+
+'''
+Test records are written to the testing data CSV (legacy column lists) and appended to a
+binary store in the spool, which keeps what the CSV drops (raw ADC codes, read times, cache
+ages, quality flags, panel temperature and calibration version). The store is rotated with
+the other data files, and dumped back to testing data rows with
+
+python3 RecordManager.py dump /media/usb/testing_records.bin [more files/segments]
+'''
+
+import os
+import sys
+import gzip
+import time
+import struct
+import argparse
+import calendar
+
+# quality flags of a panel reading
+FLAG_CACHED = 1
+FLAG_OCV_RANGE = 2
+FLAG_SCC_RANGE = 4
+FLAG_NO_POWER = 8
+FLAG_NO_PR = 16
+FLAG_NAMES = {
+    FLAG_CACHED: 'cached',
+    FLAG_OCV_RANGE: 'ocv-range',
+    FLAG_SCC_RANGE: 'scc-range',
+    FLAG_NO_POWER: 'no-power',
+    FLAG_NO_PR: 'no-pr',
+    }
+
+# plausible readings, panel Voc/Isc (same panel as PowerMaster) with 25% margin
+MAX_OCV = 21.5 * 1.25
+MAX_SCC = 0.68 * 1.25
+
+# binary store of the test records, in the spool next to the data files
+RECORDS_FILE_NAME = "testing_records.bin"
+RECORDS_MAGIC = b'EDSREC\x00\x01'
+
+# binary record: epoch, temperature, humidity, irradiance, EDS, panel temperature, readings, cal version length
+# then the cal version and one reading struct per panel (before, after, controls)
+# reading: panel (EDS > 0, CTRL < 0), flags, ocv, scc, power, pr, ocv code, scc code, read time, cache age
+# values are doubles so a record dumps to the same row as the CSV, missing values are NaN (codes NO_CODE)
+RECORD_STRUCT = struct.Struct('<ddddhdBB')
+READING_STRUCT = struct.Struct('<hBddddHHdd')
+NO_CODE = 0xFFFF
+NAN = float('nan')
+
+
+def time_string(dt):
+    # CSV time column (same as DataManager CSVMaster)
+    return str(dt.tm_mon) + '/' + str(dt.tm_mday) + '/' + str(dt.tm_year) + ' ' + str(dt.tm_hour) + ':' + str(dt.tm_min) + ':' + str(dt.tm_sec)
+
+
+def get_panel_id(panel):
+    # 'EDS3' -> 3, 'CTRL2' -> -2 (same as the noon data)
+    if panel.startswith('CTRL'):
+        return -int(panel[4:])
+    return int(panel[3:])
+
+
+def get_panel_name(panel_id):
+    return 'EDS' + str(panel_id) if panel_id > 0 else 'CTRL' + str(-panel_id)
+
+
+def get_flag_names(flags):
+    return [name for flag, name in FLAG_NAMES.items() if flags & flag]
+
+
+def from_float(value):
+    # NaN back to None
+    return None if value != value else value
+
+
+def to_float(value):
+    return NAN if value is None else value
+
+
+'''
+Panel Reading Class:
+Functionality:
+1) One OCV/SCC reading of a panel with its raw ADC codes, read time and cache state
+2) Derived power and PR filled in by PowerMaster and PerformanceRatio
+3) Quality flags (out of range, cached, power/PR not computable)
+4) Unpacks like the old [ocv, scc] pair
+'''
+
+class PanelReading:
+
+    __slots__ = ('panel', 'ocv', 'scc', 'ocv_code', 'scc_code', 'stamp', 'age', 'power', 'pr', 'flags')
+
+    def __init__(self, panel, ocv, scc, ocv_code=None, scc_code=None, stamp=None, cached=False, age=0.0):
+        self.panel = panel
+        self.ocv = ocv
+        self.scc = scc
+        self.ocv_code = ocv_code
+        self.scc_code = scc_code
+        # read time (epoch seconds), age of a cached reading
+        self.stamp = time.time() - age if stamp is None else stamp
+        self.age = age
+        self.power = None
+        self.pr = None
+        self.flags = FLAG_CACHED if cached else 0
+        if not 0 <= ocv <= MAX_OCV:
+            self.flags |= FLAG_OCV_RANGE
+        if not 0 <= scc <= MAX_SCC:
+            self.flags |= FLAG_SCC_RANGE
+
+    @property
+    def cached(self):
+        return bool(self.flags & FLAG_CACHED)
+
+    def __iter__(self):
+        return iter((self.ocv, self.scc))
+
+    def __repr__(self):
+        return 'PanelReading(' + self.panel + ', ocv=' + str(self.ocv) + ', scc=' + str(self.scc) + ', flags=' + str(get_flag_names(self.flags)) + ')'
+
+    def pack(self):
+        return READING_STRUCT.pack(get_panel_id(self.panel), self.flags, self.ocv, self.scc, to_float(self.power), to_float(self.pr),
+                                   NO_CODE if self.ocv_code is None else self.ocv_code, NO_CODE if self.scc_code is None else self.scc_code,
+                                   self.stamp, self.age)
+
+
+def unpack_reading(data, offset=0):
+    panel_id, flags, ocv, scc, power, pr, ocv_code, scc_code, stamp, age = READING_STRUCT.unpack_from(data, offset)
+    reading = PanelReading(get_panel_name(panel_id), ocv, scc, None if ocv_code == NO_CODE else ocv_code,
+                           None if scc_code == NO_CODE else scc_code, stamp, age=age)
+    reading.power = from_float(power)
+    reading.pr = from_float(pr)
+    reading.flags = flags
+    return reading
+
+'''
+Test Record Class:
+Functionality:
+1) One scheduled EDS test: time, weather, irradiance, the EDS readings before/after and the control readings
+2) Any number of controls, in CTRLIDS order
+3) Serializes to the CSVMaster/rollup arguments, a testing_data.csv row and a binary record
+'''
+
+class TestRecord:
+
+    __slots__ = ('dt', 'temp', 'humid', 'g_poa', 'eds', 'before', 'after', 'controls', 'pan_temp', 'cal_version')
+
+    def __init__(self, dt, temp, humid, g_poa, eds, before, after, controls, pan_temp=None, cal_version=None):
+        self.dt = dt
+        self.temp = temp
+        self.humid = humid
+        self.g_poa = g_poa
+        self.eds = eds
+        self.before = before
+        self.after = after
+        self.controls = tuple(controls)
+        self.pan_temp = pan_temp
+        self.cal_version = cal_version
+
+    def get_readings(self):
+        return (self.before, self.after) + self.controls
+
+    def get_flags(self):
+        flags = 0
+        for reading in self.get_readings():
+            flags |= reading.flags
+        return flags
+
+    def get_ctrl_source(self):
+        # control values of the record: cached, fresh or mixed
+        cached = sum(1 for reading in self.controls if reading.cached)
+        if cached == len(self.controls):
+            return "cached"
+        if not cached:
+            return "fresh"
+        return "mixed"
+
+    # ~~~ legacy lists ~~~
+
+    def get_ocv_scc(self):
+        # [ocv before, ocv after, scc before, scc after, ctrl ocv, ctrl scc, ...]
+        data = [self.before.ocv, self.after.ocv, self.before.scc, self.after.scc]
+        for reading in self.controls:
+            data.append(reading.ocv)
+            data.append(reading.scc)
+        return data
+
+    def get_power_data(self):
+        return [reading.power for reading in self.get_readings()]
+
+    def get_pr_data(self):
+        return [reading.pr for reading in self.get_readings()]
+
+    def get_testing_data(self):
+        # arguments of CSVMaster.write_testing_data and RollupMaster.update_test
+        return (self.dt, self.temp, self.humid, self.g_poa, self.eds, self.get_ocv_scc(), self.get_power_data(), self.get_pr_data())
+
+    def get_ctrl_stamps(self):
+        # read time of each control reading, a cached reading keeps the time it was measured
+        return [reading.stamp for reading in self.controls]
+
+    def get_row(self):
+        # testing_data.csv row
+        return [time_string(self.dt), self.temp, self.humid, self.g_poa, self.eds] + self.get_ocv_scc() + self.get_power_data() + self.get_pr_data()
+
+    # ~~~ binary ~~~
+
+    def pack(self):
+        cal_version = (self.cal_version or '').encode()[:255]
+        readings = self.get_readings()
+        header = RECORD_STRUCT.pack(calendar.timegm(tuple(self.dt)[:6] + (0, 0, 0)), to_float(self.temp), to_float(self.humid),
+                                    to_float(self.g_poa), self.eds, to_float(self.pan_temp), len(readings), len(cal_version))
+        return b''.join([header, cal_version] + [reading.pack() for reading in readings])
+
+
+def unpack_record(data, offset=0):
+    # returns (TestRecord, offset of the next record)
+    epoch, temp, humid, g_poa, eds, pan_temp, count, version_size = RECORD_STRUCT.unpack_from(data, offset)
+    offset += RECORD_STRUCT.size
+    cal_version = bytes(data[offset:offset + version_size]).decode() or None
+    offset += version_size
+    readings = []
+    for i in range(count):
+        readings.append(unpack_reading(data, offset))
+        offset += READING_STRUCT.size
+    record = TestRecord(time.gmtime(epoch), from_float(temp), from_float(humid), from_float(g_poa), eds,
+                        readings[0], readings[1], readings[2:], from_float(pan_temp), cal_version)
+    return record, offset
+
+
+def read_records(path):
+    # every complete record of a store or a rotated (compressed) segment
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as rf:
+        data = rf.read()
+    if not data.startswith(RECORDS_MAGIC):
+        raise ValueError(path + " is not a record store")
+    offset = len(RECORDS_MAGIC)
+    records = []
+    while offset < len(data):
+        try:
+            record, offset = unpack_record(data, offset)
+        except (struct.error, IndexError, UnicodeDecodeError):
+            # last record cut short by a power cut
+            break
+        records.append(record)
+    return records
+
+'''
+Record Master Class:
+Functionality:
+1) Appends every test record to the binary store in the spool
+2) Starts a new store with its header after a rotation
+'''
+
+class RecordMaster:
+
+    def __init__(self, directory, name=RECORDS_FILE_NAME):
+        self.path = os.path.join(directory, name)
+
+    def append(self, record):
+        # opened in append mode on every write like the CSV, so rotation needs no reopen
+        data = record.pack()
+        with open(self.path, 'ab') as rf:
+            if rf.tell() == 0:
+                rf.write(RECORDS_MAGIC)
+            rf.write(data)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Dump binary test records as testing data rows.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    dump_parser = commands.add_parser('dump', help="print the records of stores and rotated segments")
+    dump_parser.add_argument('paths', nargs='+', help="record store files (.bin or .bin.gz)")
+    dump_parser.add_argument('--flags', action='store_true', help="add the quality flags and calibration version")
+    args = parser.parse_args()
+
+    for path in args.paths:
+        try:
+            records = read_records(path)
+        except (ValueError, OSError) as e:
+            print(str(e), file=sys.stderr)
+            continue
+        for record in records:
+            line = ','.join(str(value) for value in record.get_row())
+            if args.flags:
+                line += ',' + '|'.join(get_flag_names(record.get_flags())) + ',' + str(record.cal_version)
+            print(line)
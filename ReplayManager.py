@@ -0,0 +1,441 @@
+'''
+=============================
+Title: Replay Simulator - EDS Field Control
+Started: October 2026
+=============================
+'''
+
+'''
+Replays recorded AM2315 (temperature/humidity) and SP420 (irradiance) histories through
+the real TestingMaster scheduling and weather checks on simulated hardware. Time only
+moves through the virtual clock, so a year of site data replays in well under a minute.
+Reports which tests would have fired, which were skipped for weather, and the waiting time.
+
+The decisions and sequences are the ones MasterManager calls (check_noon, queue_due,
+check_weather, plan_groups, run_measure_group/run_test_group, run_measure_noon). Only the
+idle time between them is skipped: the clock jumps to the next schedule window, noon or
+trace sample instead of polling once per second.
+
+Usage:
+    python3 ReplayManager.py <trace .csv> [--config config.json] [--start ...] [--end ...] [--events out.csv]
+'''
+
+import os
+import csv
+import sys
+import json
+import time
+import bisect
+import argparse
+import tempfile
+import calendar
+import importlib
+import contextlib
+from math import ceil
+
+import StaticManager as SM
+import SimHardware as SH
+import QueueManager as QM
+
+# process delay of the main loop (same as MasterManager)
+PROCESS_DELAY = 1
+
+# accepted time formats in trace files (epoch seconds are also accepted)
+TIME_FORMATS = ['%m/%d/%Y %H:%M:%S', '%m/%d/%Y %H:%M', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M']
+
+# default trace columns
+DEFAULT_COLUMNS = {'time': 'time', 'temperature': 'temperature', 'humidity': 'humidity', 'irradiance': 'irradiance'}
+
+# samples further apart than this are treated as missing sensor data (s)
+DEFAULT_MAX_GAP = 3600
+
+# outcome names used in the report
+FIRED = 'fired'
+SKIPPED_WEATHER = 'skipped_weather'
+SKIPPED_NO_DATA = 'skipped_no_data'
+MISSED_BUSY = 'missed_busy'
+
+
+def parse_time(text):
+    # trace time string to virtual epoch seconds (local wall time)
+    text = text.strip()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    for time_format in TIME_FORMATS:
+        try:
+            return calendar.timegm(time.strptime(text, time_format))
+        except ValueError:
+            continue
+    raise ValueError("Unknown time format: " + text)
+
+
+def parse_value(text):
+    if text is None or text.strip() == '':
+        return None
+    return float(text)
+
+'''
+Weather Trace Class:
+Functionality:
+1) Loads recorded temperature, humidity and irradiance samples from a .csv file
+2) Looks up the sample held at any time (last sample before it, within the max gap)
+3) Lists the times the held sample changes inside a time range
+'''
+
+class WeatherTrace:
+
+    def __init__(self, samples, max_gap=DEFAULT_MAX_GAP):
+        # samples: [(epoch, temperature, humidity, irradiance)]
+        self.samples = sorted(samples)
+        self.times = [sample[0] for sample in self.samples]
+        self.max_gap = max_gap
+
+    @classmethod
+    def load(cls, path, columns=None, max_gap=DEFAULT_MAX_GAP):
+        names = dict(DEFAULT_COLUMNS)
+        if columns:
+            names.update(columns)
+        samples = []
+        with open(path, 'r', newline='') as tf:
+            for row in csv.DictReader(tf):
+                try:
+                    samples.append((
+                        parse_time(row[names['time']]),
+                        parse_value(row.get(names['temperature'])),
+                        parse_value(row.get(names['humidity'])),
+                        parse_value(row.get(names['irradiance'])),
+                        ))
+                except (ValueError, KeyError, TypeError):
+                    # skip corrupted rows like the unit would skip a failed read
+                    continue
+        return cls(samples, max_gap)
+
+    def get_span(self):
+        return self.times[0], self.times[-1]
+
+    def sample(self, epoch):
+        # (epoch, temperature, humidity, irradiance) held at epoch, or None if no data
+        index = bisect.bisect_right(self.times, epoch) - 1
+        if index < 0 or epoch - self.times[index] > self.max_gap:
+            return None
+        return self.samples[index]
+
+    def changes(self, start, end):
+        # times in (start, end] at which the held sample changes
+        first = bisect.bisect_right(self.times, start)
+        last = bisect.bisect_right(self.times, end)
+        points = self.times[first:last]
+        # data also goes missing when a gap starts
+        gaps = [self.times[i] + self.max_gap for i in range(max(first - 1, 0), last)
+                if start < self.times[i] + self.max_gap <= end]
+        return sorted(set(points + gaps))
+
+'''
+Trace Environment Class:
+Functionality:
+1) Feeds the recorded trace to the simulated AM2315, SP420 and panels
+'''
+
+class TraceEnvironment(SH.SimEnvironment):
+
+    def __init__(self, trace):
+        SH.SimEnvironment.__init__(self)
+        self.trace = trace
+
+    def get_value(self, epoch, index, default):
+        sample = self.trace.sample(epoch)
+        if sample is None or sample[index] is None:
+            return default
+        return sample[index]
+
+    def temperature(self, epoch):
+        return self.get_value(epoch, 1, 20.0)
+
+    def humidity(self, epoch):
+        return self.get_value(epoch, 2, 50.0)
+
+    def irradiance(self, epoch):
+        return self.get_value(epoch, 3, 0.0)
+
+'''
+Replay Master Class:
+Functionality:
+1) Finds the scheduled trigger times of every EDS for each replayed day (TestingMaster schedule)
+2) Waits for the weather window on the recorded trace with TestingMaster's checks
+3) Runs the real measurement/test sequences on simulated hardware to get their duration
+4) Builds a report of fired, skipped and missed tests and the time spent waiting
+'''
+
+class ReplayMaster:
+
+    def __init__(self, config_dictionary, trace, workdir=None, use_solar_offset=False):
+        self.trace = trace
+        self.use_solar_offset = use_solar_offset
+        if workdir is None:
+            workdir = tempfile.mkdtemp(prefix='eds_replay_')
+
+        start, end = trace.get_span()
+        self.hw = SH.SimHardware(workdir, start, TraceEnvironment(trace), config_dictionary)
+        self.hw.install()
+        # import against the simulated hardware
+        self.TM = importlib.import_module('TestingManager')
+        self.quiet = open(os.devnull, 'w')
+        with contextlib.redirect_stdout(self.quiet):
+            self.test_master = self.TM.TestingMaster(self.hw.config)
+        self.queue_master = QM.QueueMaster(self.hw.config, 2 * self.TM.MIN_CHECK_THRESHOLD * 60)
+        self.ctrl_cache = self.TM.ControlCacheMaster(self.hw.config)
+
+        self.eds_ids = self.hw.config['EDSIDS']
+        self.ctrl_ids = self.hw.config['CTRLIDS']
+        self.window_seconds = self.test_master.get_param('testWindowSeconds')
+        self.gmt_offset = self.test_master.get_param('offsetGMT')
+        self.longitude = self.test_master.get_param('degLongitude')
+
+    def close(self):
+        self.hw.uninstall()
+        self.quiet.close()
+
+    def jump_to(self, epoch):
+        # move the virtual clock forward to epoch (never backwards)
+        delta = epoch - self.hw.clock.now
+        if delta > 0:
+            self.hw.clock.now += delta
+            self.hw.clock.mono += delta
+
+    def get_day_info(self, day_epoch):
+        # (yday, solar offset in minutes) for the day starting at day_epoch
+        dt = SH.to_struct(day_epoch + 43200)
+        yday = self.TM.Y_DAYS[dt.tm_mon - 1] + dt.tm_mday
+        solar_offset = ceil(SH.get_solar_time(self.gmt_offset, dt, self.longitude, 1) * 100) / 100
+        return yday, solar_offset
+
+    def get_triggers(self, day_epoch, yday, schedule_offset):
+        # [(first epoch the loop sees the schedule window, eds)] for one day
+        triggers = []
+        for eds in self.eds_ids:
+            for schedule_min in self.test_master.get_schedule_minutes(yday, eds):
+                epoch = day_epoch + (schedule_min - schedule_offset - self.TM.MIN_CHECK_THRESHOLD) * 60 + PROCESS_DELAY
+                triggers.append((epoch, eds))
+        triggers.sort()
+        return triggers
+
+    def check_weather(self, epoch):
+        # True/False with TestingMaster's limits, None when the sensors have no data
+        sample = self.trace.sample(epoch)
+        if sample is None or sample[1] is None or sample[2] is None:
+            return None
+        with contextlib.redirect_stdout(self.quiet):
+            return self.test_master.check_weather((sample[2], sample[1]))
+
+    def wait_weather(self, start):
+        # returns (outcome, seconds waited) for the weather window starting at start
+        weather_pass = self.check_weather(start)
+        if weather_pass:
+            return FIRED, 0
+        had_data = weather_pass is not None
+        end = start + self.window_seconds
+        for epoch in self.trace.changes(start, end):
+            weather_pass = self.check_weather(epoch)
+            had_data = had_data or weather_pass is not None
+            if weather_pass:
+                # the loop polls once per second
+                return FIRED, ceil(epoch - start)
+        if had_data:
+            return SKIPPED_WEATHER, self.window_seconds
+        return SKIPPED_NO_DATA, self.window_seconds
+
+    def run_eds_group(self, eds_group):
+        # same sequence as the scheduled test in MasterManager, on simulated hardware
+        # returns the virtual time the EDS were activated
+        g_poa = self.hw.read_irradiance()
+        with contextlib.redirect_stdout(self.quiet):
+            self.test_master.run_measure_group(eds_group, self.ctrl_ids, self.ctrl_cache, g_poa)
+            test_start = self.hw.clock.now
+            self.test_master.run_test_group(eds_group)
+            self.test_master.run_measure_panels(['EDS' + str(eds) for eds in eds_group])
+        return test_start
+
+    def run_noon(self):
+        # same sequence as the solar noon procedure in MasterManager
+        with contextlib.redirect_stdout(self.quiet):
+            self.test_master.run_measure_noon(self.eds_ids, self.ctrl_ids)
+            self.test_master.run_test(self.test_master.get_pin('solarChargerEDSNumber'))
+
+    def run_queue(self, queue, events):
+        # one weather window for the whole queue, then groups back to back (as MasterManager)
+        queued_at = self.hw.clock.now
+        outcome, waited = self.wait_weather(queued_at)
+        self.jump_to(queued_at + waited)
+        if outcome != FIRED:
+            for eds in queue:
+                events.append({'time': queued_at, 'eds': eds, 'outcome': outcome, 'wait_seconds': waited,
+                               'start_latency_seconds': waited, 'busy_seconds': 0})
+            return
+        for eds_group in self.queue_master.plan_groups(queue):
+            group_start = self.hw.clock.now
+            test_start = self.run_eds_group(eds_group)
+            # busy time of a group is shared by its EDS
+            busy = (self.hw.clock.now - group_start) / len(eds_group)
+            for eds in eds_group:
+                events.append({
+                    'time': queued_at,
+                    'eds': eds,
+                    'outcome': FIRED,
+                    'wait_seconds': waited,
+                    'start_latency_seconds': test_start - queued_at,
+                    'busy_seconds': busy,
+                    })
+
+    def run_day(self, day_epoch, events):
+        yday, solar_offset = self.get_day_info(day_epoch)
+        # MasterManager checks the schedule in local time (solar offset 0)
+        schedule_offset = solar_offset if self.use_solar_offset else 0
+        triggers = self.get_triggers(day_epoch, yday, schedule_offset)
+        # solar noon procedure runs within 30 s of solar noon
+        noon = day_epoch + (720 - solar_offset) * 60
+
+        candidates = sorted(set([epoch for epoch, eds in triggers] + [noon - 30 + PROCESS_DELAY]))
+        queued = set()
+        noon_done = False
+        for candidate in candidates:
+            if candidate < self.hw.clock.now:
+                # busy when this window opened, the loop sees it once the running work ends
+                candidate = self.hw.clock.now + PROCESS_DELAY
+            self.jump_to(candidate)
+            while True:
+                dt = SH.to_struct(self.hw.clock.now)
+                if not noon_done and self.test_master.check_noon(dt, solar_offset):
+                    noon_done = True
+                    noon_start = self.hw.clock.now
+                    self.run_noon()
+                    events.append({'time': noon_start, 'eds': 'NOON', 'outcome': FIRED, 'wait_seconds': 0,
+                                   'start_latency_seconds': 0, 'busy_seconds': self.hw.clock.now - noon_start})
+                    dt = SH.to_struct(self.hw.clock.now)
+                queue = self.queue_master.queue_due(self.test_master, dt, yday, schedule_offset, self.eds_ids)
+                if not queue:
+                    break
+                for eds in queue:
+                    queued.add(eds)
+                self.run_queue(queue, events)
+                # next loop iteration
+                self.jump_to(self.hw.clock.now + PROCESS_DELAY)
+
+        # scheduled windows that passed while the unit was busy
+        for epoch, eds in triggers:
+            if eds not in queued:
+                events.append({'time': epoch, 'eds': eds, 'outcome': MISSED_BUSY, 'wait_seconds': 0,
+                               'start_latency_seconds': 0, 'busy_seconds': 0})
+
+    def run(self, start=None, end=None):
+        # replay every day from start to end (epoch seconds, default: whole trace)
+        trace_start, trace_end = self.trace.get_span()
+        if start is None:
+            start = trace_start
+        if end is None:
+            end = trace_end
+        day_epoch = start - start % 86400
+        self.jump_to(day_epoch)
+
+        events = []
+        days = 0
+        while day_epoch <= end:
+            self.run_day(day_epoch, events)
+            day_epoch += 86400
+            days += 1
+        return build_report(events, days, start, end)
+
+
+def build_report(events, days, start, end):
+    # summary per EDS and in total
+    report = {'start': start, 'end': end, 'days': days, 'noon': 0, 'eds': {}, 'events': events}
+    totals = {FIRED: 0, SKIPPED_WEATHER: 0, SKIPPED_NO_DATA: 0, MISSED_BUSY: 0, 'wait_seconds': 0, 'busy_seconds': 0}
+    for event in events:
+        if event['eds'] == 'NOON':
+            report['noon'] += 1
+            totals['busy_seconds'] += event['busy_seconds']
+            continue
+        summary = report['eds'].setdefault(str(event['eds']), {FIRED: 0, SKIPPED_WEATHER: 0, SKIPPED_NO_DATA: 0,
+                                                               MISSED_BUSY: 0, 'wait_seconds': 0, 'busy_seconds': 0})
+        for target in (summary, totals):
+            target[event['outcome']] += 1
+            target['wait_seconds'] += event['wait_seconds']
+            target['busy_seconds'] += event['busy_seconds']
+    report['totals'] = totals
+    return report
+
+
+def print_report(report):
+    print("Replayed " + str(report['days']) + " days, " + str(report['noon']) + " solar noon procedures")
+    print("EDS   fired  weather  no-data  missed  wait[h]  busy[h]")
+    rows = sorted(report['eds'].items()) + [('total', report['totals'])]
+    for name, summary in rows:
+        print(str(name).ljust(6) + str(summary[FIRED]).rjust(5) + str(summary[SKIPPED_WEATHER]).rjust(9)
+              + str(summary[SKIPPED_NO_DATA]).rjust(9) + str(summary[MISSED_BUSY]).rjust(8)
+              + str(round(summary['wait_seconds'] / 3600, 1)).rjust(9) + str(round(summary['busy_seconds'] / 3600, 1)).rjust(9))
+
+
+def write_events(report, path):
+    with open(path, 'w', newline='') as ef:
+        writer = csv.writer(ef)
+        writer.writerow(['time', 'eds', 'outcome', 'wait_seconds', 'start_latency_seconds', 'busy_seconds'])
+        for event in report['events']:
+            writer.writerow([time.strftime('%Y-%m-%d %H:%M:%S', SH.to_struct(event['time'])), event['eds'],
+                             event['outcome'], event['wait_seconds'], event['start_latency_seconds'], event['busy_seconds']])
+
+
+def load_config(path):
+    # unit config.json merged over the defaults
+    config = dict(SM.DEFAULT_CONFIG_PARAM)
+    if path:
+        with open(path, 'r') as cf:
+            config.update(json.load(cf))
+    return config
+
+
+def add_trace_arguments(parser):
+    # trace options shared with the schedule optimizer
+    parser.add_argument('trace', help="recorded weather/irradiance .csv")
+    parser.add_argument('--config', help="unit config.json (defaults are used for missing parameters)")
+    parser.add_argument('--start', help="first replayed time (default: start of trace)")
+    parser.add_argument('--end', help="last replayed time (default: end of trace)")
+    parser.add_argument('--time-col', default='time')
+    parser.add_argument('--temp-col', default='temperature')
+    parser.add_argument('--humid-col', default='humidity')
+    parser.add_argument('--irr-col', default='irradiance')
+    parser.add_argument('--max-gap', type=float, default=DEFAULT_MAX_GAP, help="seconds before a sample counts as missing")
+    parser.add_argument('--solar-offset', action='store_true', help="check schedules in solar time instead of local time")
+
+
+def load_trace_arguments(args):
+    columns = {'time': args.time_col, 'temperature': args.temp_col, 'humidity': args.humid_col, 'irradiance': args.irr_col}
+    trace = WeatherTrace.load(args.trace, columns, args.max_gap)
+    if not trace.samples:
+        print("No usable samples in " + args.trace)
+        sys.exit(1)
+    start = parse_time(args.start) if args.start else None
+    end = parse_time(args.end) if args.end else None
+    return trace, start, end
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replay recorded weather through the EDS schedule and test logic.")
+    add_trace_arguments(parser)
+    parser.add_argument('--events', help="write every trigger outcome to this .csv")
+    parser.add_argument('--json', help="write the full report to this .json")
+    args = parser.parse_args()
+
+    trace, start, end = load_trace_arguments(args)
+    replay_master = ReplayMaster(load_config(args.config), trace, use_solar_offset=args.solar_offset)
+    try:
+        report = replay_master.run(start, end)
+    finally:
+        replay_master.close()
+
+    print_report(report)
+    if args.events:
+        write_events(report, args.events)
+    if args.json:
+        with open(args.json, 'w') as jf:
+            json.dump(report, jf)
@@ -0,0 +1,321 @@
+'''
+=============================
+Title: Daily Data Rollups - EDS Field Control
+Started: October 2026
+=============================
+'''
+
+'''
+Per day, per panel aggregates of the testing, noon and manual data, updated with every
+record written and kept in one small .json file per month next to the data
+(rollup_YYYYmm.json), so dashboards and fleet summaries never read the raw history.
+
+python3 RollupManager.py show /media/usb --month 2026-06 --panel EDS3
+python3 RollupManager.py rebuild /media/usb
+'''
+
+import os
+import re
+import sys
+import copy
+import json
+import time
+import calendar
+import argparse
+
+import StaticManager as SM
+import IndexManager as IM
+
+# monthly rollup files: rollup_<YYYYmm>.json
+ROLLUP_FILE_PREFIX = "rollup_"
+ROLLUP_FILE_EXT = ".json"
+
+# aggregates are [count, min, max, mean] lists, values rounded to this many decimals
+AGG_DIGITS = 4
+
+# months kept in memory while running (current and previous)
+MEMORY_MONTHS = 2
+
+# data file names (same as DataManager CSVMaster)
+NOON_FILE_NAME = "noon_data.csv"
+TESTING_FILE_NAME = "testing_data.csv"
+MANUAL_FILE_NAME = "manual_data.csv"
+
+# log phrase of a closed weather window (MasterManager)
+SKIPPED_PATTERN = re.compile(rb'Skipped testing of (EDS\d+(?:, EDS\d+)*)')
+
+# slack on the control cache age when cached readings are told apart by their values
+# (the record time is taken a little before the cache is checked)
+CTRL_AGE_SLACK = 60
+
+
+def get_panel_name(panel):
+    # EDS number, control panels are negative in the noon data
+    return 'EDS' + str(panel) if panel > 0 else 'CTRL' + str(-panel)
+
+
+def update_agg(agg, value):
+    # [count, min, max, mean] with a running mean, rounded so a month stays small
+    value = round(value, AGG_DIGITS)
+    if agg[0] == 0:
+        agg[1:] = [value, value, value]
+    else:
+        agg[1] = min(agg[1], value)
+        agg[2] = max(agg[2], value)
+        agg[3] = round(agg[3] + (value - agg[3]) / (agg[0] + 1), AGG_DIGITS)
+    agg[0] += 1
+
+
+def is_counted_ctrl(last, epoch, values, stamp, max_age):
+    # whether a control reading is the one counted last, last is (epoch, values, read time) of that reading
+    # with its read time (live) the reading is known, from the data files a cached reading
+    # repeats the exact values of the counted one while the cache holds it
+    if last is None:
+        return False
+    if stamp is not None:
+        return stamp == last[2]
+    return values == last[1] and 0 <= epoch - last[0] <= max_age + CTRL_AGE_SLACK
+
+
+'''
+Rollup Master Class:
+Functionality:
+1) Updates per day, per panel counts and aggregates [count, min, max, mean] with every data record
+2) EDS: OCV, SCC, power and PR before and after, cleaning gain, weather at test time, tests skipped for weather
+3) Controls: OCV, SCC, power and PR at test time by CTRLIDS (each reading once, cached values aren't counted twice)
+4) Keeps one .json file per month, saved after every update
+'''
+
+class RollupMaster:
+
+    def __init__(self, path, config_dictionary, autosave=True):
+        self.path = path
+        self.autosave = autosave
+        # control panels of the testing data, in column order
+        self.ctrl_ids = config_dictionary['CTRLIDS']
+        self.ctrl_max_age = float(config_dictionary['ctrlCacheMaxSeconds'])
+        # {YYYYmm: {'days': {YYYY-mm-dd: {panel: {...}}}}}
+        self.months = {}
+        # last control reading counted {panel: (epoch, [ocv, scc], read time)}
+        self.last_ctrl = {}
+
+    # ~~~ record updates (same arguments as the CSVMaster writes) ~~~
+
+    def update_noon(self, dt, temp, humid, panel, ocv, scc):
+        rollup = self.get_panel(dt, get_panel_name(panel))
+        rollup['noon'] = rollup.get('noon', 0) + 1
+        self.update_value(rollup, 'noon_ocv', ocv)
+        self.update_value(rollup, 'noon_scc', scc)
+        self.save(dt)
+
+    def update_test(self, dt, temp, humid, g_poa, eds, data_ocv_scc, power_data, pr_data, ctrl_stamps=None):
+        # ctrl_stamps: read time of each control reading (cached readings keep theirs), None from the data files
+        rollup = self.get_panel(dt, get_panel_name(eds))
+        rollup['tests'] = rollup.get('tests', 0) + 1
+        [ocv_before, ocv_after, scc_before, scc_after] = data_ocv_scc[:4]
+        self.update_value(rollup, 'ocv_before', ocv_before)
+        self.update_value(rollup, 'ocv_after', ocv_after)
+        self.update_value(rollup, 'scc_before', scc_before)
+        self.update_value(rollup, 'scc_after', scc_after)
+        self.update_value(rollup, 'power_before', power_data[0])
+        self.update_value(rollup, 'power_after', power_data[1])
+        self.update_value(rollup, 'pr_before', pr_data[0])
+        self.update_value(rollup, 'pr_after', pr_data[1])
+        if scc_before > 0:
+            self.update_value(rollup, 'gain', scc_after / scc_before)
+        self.update_value(rollup, 'temperature', temp)
+        self.update_value(rollup, 'humidity', humid)
+        self.update_value(rollup, 'irradiance', g_poa)
+
+        # control values are repeated in every record of a test group and reused from the control cache,
+        # count each reading once
+        epoch = calendar.timegm(dt)
+        for i, ctrl in enumerate(self.ctrl_ids[:(len(data_ocv_scc) - 4) // 2]):
+            name = 'CTRL' + str(ctrl)
+            values = data_ocv_scc[4 + 2 * i:6 + 2 * i]
+            stamp = None if ctrl_stamps is None else ctrl_stamps[i]
+            if is_counted_ctrl(self.last_ctrl.get(name), epoch, values, stamp, self.ctrl_max_age):
+                continue
+            self.last_ctrl[name] = (epoch, values, stamp)
+            ctrl_rollup = self.get_panel(dt, name)
+            ctrl_rollup['tests'] = ctrl_rollup.get('tests', 0) + 1
+            self.update_value(ctrl_rollup, 'ocv', values[0])
+            self.update_value(ctrl_rollup, 'scc', values[1])
+            if 2 + i < len(power_data):
+                self.update_value(ctrl_rollup, 'power', power_data[2 + i])
+            if 2 + i < len(pr_data):
+                self.update_value(ctrl_rollup, 'pr', pr_data[2 + i])
+        self.save(dt)
+
+    def update_manual(self, dt, temp, humid, eds, ocv_before, ocv_after, scc_before, scc_after):
+        rollup = self.get_panel(dt, get_panel_name(eds))
+        rollup['manual'] = rollup.get('manual', 0) + 1
+        if scc_before > 0:
+            self.update_value(rollup, 'manual_gain', scc_after / scc_before)
+        self.save(dt)
+
+    def update_skipped(self, dt, eds_list):
+        # EDS tests skipped because the weather window closed
+        for eds in eds_list:
+            rollup = self.get_panel(dt, get_panel_name(eds))
+            rollup['skipped_weather'] = rollup.get('skipped_weather', 0) + 1
+        self.save(dt)
+
+    def update_value(self, rollup, key, value):
+        # PR is -1 when there was no irradiance reading
+        if value is None or (key.startswith('pr') and value == -1):
+            return
+        if key not in rollup:
+            rollup[key] = [0, None, None, None]
+        update_agg(rollup[key], float(value))
+
+    # ~~~ month files ~~~
+
+    def get_month_key(self, dt):
+        return time.strftime('%Y%m', dt)
+
+    def get_file(self, month_key):
+        return os.path.join(self.path, ROLLUP_FILE_PREFIX + month_key + ROLLUP_FILE_EXT)
+
+    def get_month(self, month_key):
+        if month_key not in self.months:
+            self.months[month_key] = self.load_month(month_key)
+            if self.autosave:
+                # only the latest months stay in memory
+                for key in sorted(self.months)[:-MEMORY_MONTHS]:
+                    del self.months[key]
+        return self.months[month_key]
+
+    def get_panel(self, dt, panel_name):
+        days = self.get_month(self.get_month_key(dt))['days']
+        day = days.setdefault(time.strftime('%Y-%m-%d', dt), {})
+        return day.setdefault(panel_name, {})
+
+    def get_day(self, dt):
+        # copy of the rollup of one day (status API)
+        return copy.deepcopy(self.get_month(self.get_month_key(dt))['days'].get(time.strftime('%Y-%m-%d', dt), {}))
+
+    def load_month(self, month_key):
+        path = self.get_file(month_key)
+        if not os.path.isfile(path):
+            return {'days': {}}
+        try:
+            with open(path, 'r') as rf:
+                return json.load(rf)
+        except:
+            print("Error loading rollup file " + path + ". Starting the month over!")
+            return {'days': {}}
+
+    def save(self, dt=None):
+        # month of dt, or every month in memory
+        if dt is not None and not self.autosave:
+            return
+        keys = [self.get_month_key(dt)] if dt is not None else list(self.months)
+        for month_key in keys:
+            path = self.get_file(month_key)
+            # write to temp file then replace so a power cut can't leave a half written file
+            tmp_file = path + ".tmp"
+            try:
+                with open(tmp_file, 'w') as rf:
+                    json.dump(self.months[month_key], rf, separators=(',', ':'))
+                os.replace(tmp_file, path)
+            except OSError:
+                # kept in memory, saved again with the next update
+                print("Error saving rollup file " + path)
+
+
+def rebuild(directory, config_dictionary):
+    # rollups from the raw data and log files (live and rotated), replaces the month files
+    rollup_master = RollupMaster(directory, config_dictionary, autosave=False)
+    for name in IM.find_names(directory, config_dictionary['INDEXFILES']):
+        column = IM.get_column(config_dictionary['INDEXFILES'], name)[1]
+        for data_path, idx_path in IM.find_files(directory, name):
+            if data_path is None:
+                continue
+            with IM.open_data(data_path) as fin:
+                for line in fin:
+                    epoch = IM.parse_line_time(line)
+                    if epoch is None:
+                        continue
+                    rebuild_line(rollup_master, name, column, time.gmtime(epoch), line)
+    rollup_master.save()
+    return sorted(rollup_master.months)
+
+
+def parse_values(line):
+    # values after the time column of a data line, None for headers
+    try:
+        return [float(value) for value in line.rstrip(b'\r\n').split(b',')[1:]]
+    except ValueError:
+        return None
+
+
+def split_testing_values(values):
+    # temp, humid, g_poa, eds, ocv/scc (4 + 2 per control), power (2 + 1 per control), PR (same)
+    controls = (len(values) + 1 - 13) // 4
+    if controls < 0 or len(values) + 1 != 13 + 4 * controls:
+        return None
+    data_ocv_scc = values[4:8 + 2 * controls]
+    power_data = values[8 + 2 * controls:10 + 3 * controls]
+    pr_data = values[10 + 3 * controls:]
+    return values[0], values[1], values[2], int(values[3]), data_ocv_scc, power_data, pr_data
+
+
+def rebuild_line(rollup_master, name, column, dt, line):
+    if column is None:
+        match = SKIPPED_PATTERN.search(line)
+        if match is not None:
+            rollup_master.update_skipped(dt, [int(eds[3:]) for eds in match.group(1).split(b', ')])
+        return
+    values = parse_values(line)
+    if values is None:
+        return
+    if name == TESTING_FILE_NAME:
+        test = split_testing_values(values)
+        if test is not None:
+            rollup_master.update_test(dt, *test)
+    elif name == MANUAL_FILE_NAME and len(values) == 7:
+        rollup_master.update_manual(dt, values[0], values[1], int(values[2]), *values[3:])
+    elif name == NOON_FILE_NAME and len(values) == 5:
+        rollup_master.update_noon(dt, values[0], values[1], int(values[2]), values[3], values[4])
+
+
+def print_month(month, panel=None):
+    print("Day         Panel    tests  skipped  noon  gain     PR before  PR after")
+    for day in sorted(month['days']):
+        for name, rollup in sorted(month['days'][day].items()):
+            if panel is not None and name != panel:
+                continue
+            gain = rollup.get('gain', [0, None, None, None])[3]
+            pr_before = rollup.get('pr_before', rollup.get('pr', [0, None, None, None]))[3]
+            pr_after = rollup.get('pr_after', [0, None, None, None])[3]
+            print(day.ljust(12) + name.ljust(8) + str(rollup.get('tests', 0)).rjust(6) + str(rollup.get('skipped_weather', 0)).rjust(9)
+                  + str(rollup.get('noon', 0)).rjust(6) + ('' if gain is None else str(round(gain, 3))).rjust(7)
+                  + ('' if pr_before is None else str(round(pr_before, 3))).rjust(11)
+                  + ('' if pr_after is None else str(round(pr_after, 3))).rjust(10))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Show or rebuild the daily rollups of EDS data.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    show_parser = commands.add_parser('show', help="print the daily rollups of a month")
+    show_parser.add_argument('directory', help="spool or USB directory")
+    show_parser.add_argument('--month', required=True, help="YYYY-mm")
+    show_parser.add_argument('--panel', help="e.g. EDS3 or CTRL1")
+    show_parser.add_argument('--config', help="unit config.json (defaults are used for missing parameters)")
+    rebuild_parser = commands.add_parser('rebuild', help="rebuild every month from the raw data and log files")
+    rebuild_parser.add_argument('directory', help="spool or USB directory")
+    rebuild_parser.add_argument('--config', help="unit config.json (defaults are used for missing parameters)")
+    args = parser.parse_args()
+
+    config = dict(SM.DEFAULT_CONFIG_PARAM)
+    if args.config:
+        with open(args.config, 'r') as cf:
+            config.update(json.load(cf))
+    if args.command == 'rebuild':
+        months = rebuild(args.directory, config)
+        print("Rebuilt " + str(len(months)) + " months: " + ', '.join(months))
+        sys.exit(0)
+
+    rollup_master = RollupMaster(args.directory, config, autosave=False)
+    print_month(rollup_master.get_month(args.month.replace('-', '')), args.panel)
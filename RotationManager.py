@@ -0,0 +1,278 @@
+'''
+=============================
+Title: Log and Data Rotation - EDS Field Control
+Started: October 2026
+=============================
+'''
+
+import os
+import re
+import json
+import time
+import gzip
+import queue
+import shutil
+import threading
+
+# zstd is optional, gzip is used when it is not installed
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# manifest file kept in the rotated directory
+MANIFEST_NAME = "manifest.json"
+
+# extension of each compression type
+COMPRESSED_EXT = {'gzip': '.gz', 'zstd': '.zst'}
+
+# rotated segments are named <base>.<YYYYmmdd-HHMMSS>.<ext>[.gz|.zst]
+SEGMENT_PATTERN = re.compile(r'^(.+)\.(\d{8}-\d{6})(\.[^.]+)(\.gz|\.zst)?$')
+
+# sidecar index of a live file or segment (IndexManager), renamed and removed with it
+INDEX_EXT = '.idx'
+
+# copy size for streaming compression
+CHUNK_BYTES = 1024 * 1024
+
+'''
+Rotation Master Class:
+Functionality:
+1) Rotates live log/data files by size and by day
+2) Compresses closed segments in the background (gzip or zstd)
+3) Drops the oldest compressed segments when over the disk usage cap
+4) Maintains a manifest of segments for fast lookup
+'''
+
+class RotationMaster:
+
+    def __init__(self, config_dictionary, directory):
+        self.directory = directory
+        self.max_bytes = int(config_dictionary['rotationMaxBytes'])
+        self.max_disk_bytes = int(config_dictionary['rotationMaxDiskBytes'])
+        self.check_seconds = float(config_dictionary['rotationCheckSeconds'])
+        self.extensions = tuple(config_dictionary['rotationExtensions'])
+
+        self.compression = config_dictionary['rotationCompression']
+        if self.compression == 'zstd' and zstandard is None:
+            print("zstandard not installed. Compressing rotated segments with gzip.")
+            self.compression = 'gzip'
+        if self.compression not in COMPRESSED_EXT:
+            self.compression = 'gzip'
+
+        self.manifest_path = os.path.join(directory, MANIFEST_NAME)
+        self.manifest_lock = threading.Lock()
+        self.manifest = {'live': {}, 'segments': {}}
+        self.load_manifest()
+        self.last_check = None
+        # optional function(segment name) -> bool, segments it refuses are never removed by the cap
+        self.can_remove = None
+        # optional function(live file name) called right before the file is rotated
+        self.before_rotate = None
+        # optional function(live file name) called right after the rename, writers that keep
+        # the file open reopen it here (writers opening in append mode on every write need nothing)
+        self.after_rotate = None
+
+        # background compression so the loop only pays for a rename
+        self.compress_queue = queue.Queue()
+        self.compress_thread = threading.Thread(target=self.compress_worker, daemon=True)
+        self.compress_thread.start()
+        self.recover_segments()
+
+    def set_directory(self, directory):
+        # switch to a new directory (e.g. remounted media)
+        if directory == self.directory:
+            return
+        with self.manifest_lock:
+            self.directory = directory
+            self.manifest_path = os.path.join(directory, MANIFEST_NAME)
+            self.manifest = {'live': {}, 'segments': {}}
+            self.load_manifest()
+        self.recover_segments()
+
+    def is_live_file(self, name):
+        return name.endswith(self.extensions) and SEGMENT_PATTERN.match(name) is None
+
+    def check_rotation(self, dt):
+        # called every loop, only looks at the disk every rotationCheckSeconds
+        now = time.monotonic()
+        if self.last_check is not None and now - self.last_check < self.check_seconds:
+            return
+        self.last_check = now
+
+        day = time.strftime('%Y%m%d', dt)
+        stamp = time.strftime('%Y%m%d-%H%M%S', dt)
+        seen = set()
+        for entry in os.scandir(self.directory):
+            if not entry.is_file() or not self.is_live_file(entry.name):
+                continue
+            seen.add(entry.name)
+            size = entry.stat().st_size
+            with self.manifest_lock:
+                if entry.name not in self.manifest['live']:
+                    self.manifest['live'][entry.name] = {'opened': stamp}
+                    self.save_manifest()
+                live = self.manifest['live'][entry.name]
+            # rotate once the file is too big or was opened on a previous day
+            if size >= self.max_bytes or (size > 0 and live['opened'][:8] != day):
+                self.rotate(entry.name, stamp)
+
+        # forget live files that were removed (e.g. the date named log of a previous day)
+        with self.manifest_lock:
+            stale = [name for name in self.manifest['live'] if name not in seen]
+            for name in stale:
+                del self.manifest['live'][name]
+            if stale:
+                self.save_manifest()
+
+    def rotate(self, name, stamp):
+        base, ext = os.path.splitext(name)
+        segment = base + '.' + stamp + ext
+        if self.before_rotate is not None:
+            # a failing hook never blocks rotation
+            try:
+                self.before_rotate(name)
+            except Exception as e:
+                print("Error before rotating " + name + ": " + str(e))
+        # rename is atomic, writers that open in append mode start a fresh live file
+        os.replace(os.path.join(self.directory, name), os.path.join(self.directory, segment))
+        if os.path.isfile(os.path.join(self.directory, name + INDEX_EXT)):
+            os.replace(os.path.join(self.directory, name + INDEX_EXT), os.path.join(self.directory, segment + INDEX_EXT))
+        with self.manifest_lock:
+            opened = self.manifest['live'].pop(name, {'opened': stamp})['opened']
+            self.manifest['segments'][segment] = {
+                'source': name,
+                'start': opened,
+                'end': stamp,
+                'bytes': os.path.getsize(os.path.join(self.directory, segment)),
+                'file': segment,
+                }
+            self.save_manifest()
+        if self.after_rotate is not None:
+            try:
+                self.after_rotate(name)
+            except Exception as e:
+                print("Error after rotating " + name + ": " + str(e))
+        self.compress_queue.put((self.directory, segment))
+
+    def recover_segments(self):
+        # finish compression interrupted by a restart or power cut
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith('.part'):
+                os.remove(path)
+                continue
+            match = SEGMENT_PATTERN.match(name)
+            if match is None:
+                continue
+            with self.manifest_lock:
+                if name not in self.manifest['segments']:
+                    self.manifest['segments'][name] = {
+                        'source': match.group(1) + match.group(3),
+                        'start': match.group(2),
+                        'end': match.group(2),
+                        'bytes': os.path.getsize(path),
+                        'file': name,
+                        }
+            if match.group(4) is None:
+                self.compress_queue.put((self.directory, name))
+
+    def compress_worker(self):
+        while True:
+            directory, segment = self.compress_queue.get()
+            try:
+                self.compress_segment(directory, segment)
+                self.enforce_cap()
+            except Exception as e:
+                print("Error compressing segment " + segment + ": " + str(e))
+
+    def compress_segment(self, directory, segment):
+        src = os.path.join(directory, segment)
+        if not os.path.isfile(src):
+            return
+        with self.manifest_lock:
+            info = self.manifest['segments'].get(segment)
+            if info is not None and 'bytes' in info and os.path.getsize(src) != info['bytes']:
+                # a writer kept the file open across the rename, lines after this point are lost
+                print("Segment " + segment + " was written after rotation. Its writer must reopen the live file!")
+        dst_name = segment + COMPRESSED_EXT[self.compression]
+        dst = os.path.join(directory, dst_name)
+        part = dst + '.part'
+
+        # stream in chunks so memory use stays flat for any segment size
+        with open(src, 'rb') as fin:
+            if self.compression == 'zstd':
+                with open(part, 'wb') as fout:
+                    with zstandard.ZstdCompressor().stream_writer(fout) as zout:
+                        shutil.copyfileobj(fin, zout, CHUNK_BYTES)
+            else:
+                with gzip.open(part, 'wb') as fout:
+                    shutil.copyfileobj(fin, fout, CHUNK_BYTES)
+        os.replace(part, dst)
+        os.remove(src)
+
+        with self.manifest_lock:
+            # directory may have been switched while compressing
+            if directory != self.directory:
+                return
+            info = self.manifest['segments'].pop(segment, {'source': segment, 'start': '', 'end': ''})
+            info['file'] = dst_name
+            info['compressed_bytes'] = os.path.getsize(dst)
+            self.manifest['segments'][dst_name] = info
+            self.save_manifest()
+
+    def enforce_cap(self):
+        # drop oldest compressed segments until the directory fits under the cap
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.is_file():
+                total += entry.stat().st_size
+        if total <= self.max_disk_bytes:
+            return
+
+        with self.manifest_lock:
+            compressed = [name for name in self.manifest['segments'] if name.endswith(tuple(COMPRESSED_EXT.values()))]
+            compressed.sort(key=lambda name: self.manifest['segments'][name]['end'])
+            for name in compressed:
+                if total <= self.max_disk_bytes:
+                    break
+                if self.can_remove is not None and not self.can_remove(name):
+                    continue
+                path = os.path.join(self.directory, name)
+                if os.path.isfile(path):
+                    total -= os.path.getsize(path)
+                    os.remove(path)
+                # compressed names end in .gz/.zst, the index is named after the plain segment
+                index_path = os.path.join(self.directory, os.path.splitext(name)[0] + INDEX_EXT)
+                if os.path.isfile(index_path):
+                    total -= os.path.getsize(index_path)
+                    os.remove(index_path)
+                del self.manifest['segments'][name]
+                print("Disk cap reached. Removed oldest segment " + name)
+            self.save_manifest()
+
+    def find_segments(self, source, start, end):
+        # segment files of a live file overlapping [start, end] (YYYYmmdd-HHMMSS strings)
+        with self.manifest_lock:
+            found = [info for info in self.manifest['segments'].values()
+                     if info['source'] == source and info['end'] >= start and info['start'] <= end]
+        found.sort(key=lambda info: info['start'])
+        return [info['file'] for info in found]
+
+    def load_manifest(self):
+        if not os.path.isfile(self.manifest_path):
+            return
+        try:
+            with open(self.manifest_path, 'r') as mf:
+                manifest = json.load(mf)
+            self.manifest['live'] = manifest.get('live', {})
+            self.manifest['segments'] = manifest.get('segments', {})
+        except:
+            print("Error loading rotation manifest. Rebuilding from segment names!")
+
+    def save_manifest(self):
+        # manifest lock must be held by caller
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as mf:
+            json.dump(self.manifest, mf)
+        os.replace(tmp_path, self.manifest_path)
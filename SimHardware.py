@@ -0,0 +1,625 @@
+'''
+=============================
+Title: Simulated Hardware - EDS Field Control
+Started: October 2026
+=============================
+'''
+
+'''
+Stand-ins for the Raspberry Pi peripherals (GPIO, MCP3008, PCF8523, AM2315, SP420),
+the USB data files and a virtual clock, so the real testing and control code can run
+on a desktop at accelerated time. Used by the replay simulator and test harnesses.
+'''
+
+import os
+import sys
+import json
+import math
+import time
+import types
+import runpy
+import calendar
+import threading
+
+import StaticManager as SM
+import StatusManager as STSM
+
+# adc constants
+VREF = 3.3
+STEPS = 1023
+
+# year days for start of each month (same table as TestingManager)
+Y_DAYS = [0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334]
+
+# panel specifications (same panel as PowerMaster)
+PANEL_VOC = 21.5
+PANEL_ISC = 0.68
+PANEL_CELLS = 36
+
+# sim data file names
+NOON_FILE_NAME = "noon_data.csv"
+TESTING_FILE_NAME = "testing_data.csv"
+MANUAL_FILE_NAME = "manual_data.csv"
+LOG_FILE_NAME = "log.txt"
+
+
+def to_struct(epoch):
+    # virtual epoch seconds are local wall time, kept in UTC functions so DST never applies
+    return time.gmtime(epoch)
+
+
+def to_epoch(dt):
+    return calendar.timegm(tuple(dt)[:6] + (0, 0, 0))
+
+
+def get_solar_time(gmt_offset, dt, longitude, latitude):
+    # minutes to add to local time to get solar time (longitude correction + equation of time)
+    yday = Y_DAYS[dt.tm_mon - 1] + dt.tm_mday
+    b = 2 * math.pi * (yday - 81) / 364
+    eot = 9.87 * math.sin(2 * b) - 7.53 * math.cos(b) - 1.5 * math.sin(b)
+    return 4 * (longitude - 15 * gmt_offset) + eot
+
+
+class SimulationEnd(BaseException):
+    # raised by the virtual clock once the simulated run is over
+    # (BaseException so it is not swallowed as a sensor error, the clock keeps raising it)
+    pass
+
+'''
+Sim Clock Class:
+Functionality:
+1) Keeps virtual wall time and monotonic time
+2) Replaces time.sleep/time.time/time.monotonic while installed, sleeping just advances the clock
+3) Ends the simulation at a set virtual time and calls listeners as time passes
+'''
+
+class SimClock:
+
+    def __init__(self, start_epoch):
+        self.now = float(start_epoch)
+        self.mono = 0.0
+        self.end = None
+        self.ended = False
+        # [function(clock)] called after every advance
+        self.listeners = []
+        self.owner = None
+        self.originals = None
+
+    def advance(self, seconds):
+        if self.ended:
+            raise SimulationEnd()
+        if seconds > 0:
+            self.now += seconds
+            self.mono += seconds
+        for listener in self.listeners:
+            listener(self)
+        if self.end is not None and self.now >= self.end:
+            self.ended = True
+            raise SimulationEnd()
+
+    def sleep(self, seconds):
+        # only the simulated main thread moves the clock, helper threads really sleep
+        if threading.get_ident() != self.owner:
+            self.originals['sleep'](min(seconds, 0.01))
+            return
+        self.advance(seconds)
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.mono
+
+    def datetime(self):
+        return to_struct(self.now)
+
+    def install(self):
+        self.owner = threading.get_ident()
+        self.originals = {'sleep': time.sleep, 'time': time.time, 'monotonic': time.monotonic}
+        time.sleep = self.sleep
+        time.time = self.time
+        time.monotonic = self.monotonic
+
+    def uninstall(self):
+        if self.originals is None:
+            return
+        time.sleep = self.originals['sleep']
+        time.time = self.originals['time']
+        time.monotonic = self.originals['monotonic']
+        self.originals = None
+
+'''
+Sim Environment Class:
+Functionality:
+1) Synthetic clear-sky weather and irradiance as a function of virtual time
+2) Soiling of each panel, reset when its EDS is activated
+'''
+
+class SimEnvironment:
+
+    def __init__(self, soiling_per_day=0.003, max_soiling=0.3, clean_efficiency=0.9):
+        self.soiling_per_day = soiling_per_day
+        self.max_soiling = max_soiling
+        self.clean_efficiency = clean_efficiency
+        # {panel: (epoch of last cleaning, soiling left after it)}
+        self.cleaned = {}
+
+    def day_fraction(self, epoch):
+        return (epoch % 86400) / 86400.0
+
+    def temperature(self, epoch):
+        return 20 + 8 * math.sin(2 * math.pi * (self.day_fraction(epoch) - 0.375))
+
+    def humidity(self, epoch):
+        return 50 - 10 * math.sin(2 * math.pi * (self.day_fraction(epoch) - 0.375))
+
+    def irradiance(self, epoch):
+        hour = self.day_fraction(epoch) * 24
+        return max(0.0, 1000 * math.sin(math.pi * (hour - 6) / 12))
+
+    def get_soiling(self, panel, epoch):
+        # fraction of light lost to dust on the panel
+        last_clean, left = self.cleaned.get(panel, (None, 0.0))
+        if last_clean is None:
+            return self.max_soiling / 2
+        return min(self.max_soiling, left + self.soiling_per_day * (epoch - last_clean) / 86400)
+
+    def clean_panel(self, panel, epoch):
+        left = self.get_soiling(panel, epoch) * (1 - self.clean_efficiency)
+        self.cleaned[panel] = (epoch, left)
+
+    def panel_voc(self, panel, epoch):
+        g = self.irradiance(epoch) * (1 - self.get_soiling(panel, epoch))
+        if g <= 1:
+            return 0.0
+        return max(0.0, PANEL_VOC + PANEL_CELLS * 0.0257 * math.log(g / 1000))
+
+    def panel_isc(self, panel, epoch):
+        return PANEL_ISC * self.irradiance(epoch) * (1 - self.get_soiling(panel, epoch)) / 1000
+
+'''
+Sim GPIO Class:
+Functionality:
+1) Behaves like the RPi.GPIO module (setup/output/input/cleanup/events)
+2) Keeps the state of every pin so the simulated panels know which relays are closed
+'''
+
+class SimGPIO:
+
+    BCM = 11
+    BOARD = 10
+    OUT = 0
+    IN = 1
+    LOW = 0
+    HIGH = 1
+    RISING = 31
+    FALLING = 32
+    BOTH = 33
+    PUD_OFF = 20
+    PUD_DOWN = 21
+    PUD_UP = 22
+
+    def __init__(self, hw):
+        self.hw = hw
+        self.mode = None
+        # {pin: direction}, {pin: level}
+        self.directions = {}
+        self.levels = {}
+        self.inputs = {}
+        self.detect = set()
+        self.pending_events = set()
+
+    def setmode(self, mode):
+        self.mode = mode
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, pin, direction, pull_up_down=None, initial=None):
+        self.hw.call('GPIO', self._setup, pin, direction, initial)
+
+    def _setup(self, pin, direction, initial):
+        self.directions[pin] = direction
+        if direction == self.OUT:
+            self.set_level(pin, self.LOW if initial is None else initial)
+
+    def output(self, pin, level):
+        self.hw.call('GPIO', self._output, pin, level)
+
+    def _output(self, pin, level):
+        if self.directions.get(pin) != self.OUT:
+            raise RuntimeError("The GPIO channel has not been set up as an OUTPUT")
+        self.set_level(pin, 1 if level else 0)
+
+    def set_level(self, pin, level):
+        if self.levels.get(pin) != level:
+            self.levels[pin] = level
+            self.hw.on_pin_change(pin, level)
+
+    def input(self, pin):
+        if self.directions.get(pin) == self.OUT:
+            return self.levels.get(pin, 0)
+        return self.inputs.get(pin, 0)
+
+    def cleanup(self, pins=None):
+        self.hw.call('GPIO', self._cleanup, pins)
+
+    def _cleanup(self, pins):
+        if pins is None:
+            pins = list(self.directions)
+        elif isinstance(pins, int):
+            pins = [pins]
+        for pin in pins:
+            if pin in self.levels and self.levels[pin]:
+                self.hw.on_pin_change(pin, 0)
+            self.directions.pop(pin, None)
+            self.levels.pop(pin, None)
+            self.detect.discard(pin)
+
+    def add_event_detect(self, pin, edge, callback=None, bouncetime=None):
+        self.detect.add(pin)
+
+    def remove_event_detect(self, pin):
+        self.detect.discard(pin)
+
+    def event_detected(self, pin):
+        if pin in self.pending_events:
+            self.pending_events.discard(pin)
+            return True
+        return False
+
+    def set_input(self, pin, level):
+        # simulate a switch on an input pin
+        if level and not self.inputs.get(pin, 0) and pin in self.detect:
+            self.pending_events.add(pin)
+        self.inputs[pin] = level
+
+    def get_pin_module(self):
+        # module object for 'import RPi.GPIO as GPIO'
+        module = types.ModuleType('RPi.GPIO')
+        for name in dir(self):
+            if not name.startswith('_'):
+                setattr(module, name, getattr(self, name))
+        return module
+
+'''
+Simulated peripherals, each one reads the shared SimHardware state
+'''
+
+class SimSPI:
+    def __init__(self, *args, **kwargs):
+        pass
+
+class SimI2C:
+    def __init__(self, *args, **kwargs):
+        pass
+
+class SimDigitalInOut:
+    def __init__(self, pin):
+        self.pin = pin
+
+
+def make_mcp_class(hw):
+    class SimMCP3008:
+        def __init__(self, spi, cs):
+            self.spi = spi
+            self.cs = cs
+
+        def read(self, pin, is_differential=False):
+            return hw.call('MCP3008', hw.read_adc_code, pin)
+
+    return SimMCP3008
+
+
+class SimAnalogIn:
+    def __init__(self, mcp, positive_pin, negative_pin=None):
+        self.mcp = mcp
+        self.pin = positive_pin
+
+    @property
+    def value(self):
+        return self.mcp.read(self.pin) << 6
+
+    @property
+    def voltage(self):
+        return (self.value * VREF) / 65535
+
+
+def make_rtc_class(hw):
+    class SimPCF8523:
+        def __init__(self, i2c):
+            self.i2c = i2c
+
+        @property
+        def datetime(self):
+            return hw.call('RTC', hw.read_rtc)
+
+        @datetime.setter
+        def datetime(self, value):
+            hw.call('RTC', hw.write_rtc, value)
+
+    return SimPCF8523
+
+
+def make_weather_class(hw):
+    class SimAM2315:
+        def read_humidity_temperature(self):
+            return hw.call('AM2315', hw.read_weather)
+
+    return SimAM2315
+
+
+def make_irradiance_class(hw):
+    class SimIrradiance:
+        def get_irradiance(self):
+            return hw.call('SP420', hw.read_irradiance)
+
+    return SimIrradiance
+
+'''
+Sim data file classes (same calls as DataManager USBMaster/CSVMaster/LogMaster)
+'''
+
+def time_string(dt):
+    return str(dt.tm_mon) + '/' + str(dt.tm_mday) + '/' + str(dt.tm_year) + ' ' + str(dt.tm_hour) + ':' + str(dt.tm_min) + ':' + str(dt.tm_sec)
+
+
+def make_data_module(hw):
+    class SimUSBMaster:
+        def get_USB_path(self):
+            return hw.usb_dir
+
+    class SimCSVMaster:
+        def __init__(self, path):
+            self.path = path
+
+        def write_row(self, name, row):
+            with open(os.path.join(self.path, name), 'a') as df:
+                df.write(','.join(str(value) for value in row) + '\n')
+            hw.on_record(name, row)
+
+        def write_noon_data(self, dt, temp, humid, eds, ocv, scc):
+            self.write_row(NOON_FILE_NAME, [time_string(dt), temp, humid, eds, ocv, scc])
+
+        def write_testing_data(self, dt, temp, humid, g_poa, eds, data_ocv_scc, power_data, pr_data):
+            self.write_row(TESTING_FILE_NAME, [time_string(dt), temp, humid, g_poa, eds] + list(data_ocv_scc) + list(power_data) + list(pr_data))
+
+        def write_manual_data(self, dt, temp, humid, eds, ocv_before, ocv_after, scc_before, scc_after):
+            self.write_row(MANUAL_FILE_NAME, [time_string(dt), temp, humid, eds, ocv_before, ocv_after, scc_before, scc_after])
+
+    class SimLogMaster:
+        def __init__(self, path, dt):
+            self.path = path
+
+        def write_log(self, dt, phrase):
+            with open(os.path.join(self.path, LOG_FILE_NAME), 'a') as lf:
+                lf.write(time_string(dt) + ' ' + phrase + '\n')
+            hw.on_log(dt, phrase)
+
+    module = types.ModuleType('DataManager')
+    module.USBMaster = SimUSBMaster
+    module.CSVMaster = SimCSVMaster
+    module.LogMaster = SimLogMaster
+    module.get_solar_time = get_solar_time
+    return module
+
+
+def make_status_module(hw):
+    # real status API, every snapshot the loop publishes is also handed to the harness
+    class SimStatusMaster(STSM.StatusMaster):
+        def publish(self, snapshot):
+            STSM.StatusMaster.publish(self, snapshot)
+            hw.on_status(snapshot)
+
+    module = types.ModuleType('StatusManager')
+    for name, value in vars(STSM).items():
+        if not name.startswith('__'):
+            setattr(module, name, value)
+    module.StatusMaster = SimStatusMaster
+    return module
+
+'''
+Sim Hardware Class:
+Functionality:
+1) Owns the virtual clock, environment and simulated peripherals of one unit
+2) Installs stand-in modules for the Pi libraries and DataManager
+3) Models panel Voc/Isc at the ADC from the relay states and environment
+4) Runs MasterManager until the virtual end time
+'''
+
+class SimHardware:
+
+    def __init__(self, workdir, start_epoch, environment=None, config_overrides=None):
+        self.workdir = workdir
+        self.clock = SimClock(start_epoch)
+        if environment is None:
+            environment = SimEnvironment()
+        self.environment = environment
+
+        self.config_dir = os.path.join(workdir, 'config')
+        self.usb_dir = os.path.join(workdir, 'usb')
+        os.makedirs(self.config_dir, exist_ok=True)
+        os.makedirs(self.usb_dir, exist_ok=True)
+
+        self.config = dict(SM.DEFAULT_CONFIG_PARAM)
+        # no status port unless a harness asks for one
+        self.config['statusEnabled'] = False
+        if config_overrides:
+            self.config.update(config_overrides)
+        # unit files always live in the work directory
+        self.config['spoolPath'] = os.path.join(workdir, 'spool') + os.sep
+        # the simulated USB is a directory next to the spool, on the same device
+        self.config['spoolUSBMountCheck'] = False
+        # RTC setter offset (seconds)
+        self.rtc_offset = 0.0
+
+        self.gpio = SimGPIO(self)
+        # [function(name, row)], [function(dt, phrase)], [function(snapshot)]
+        self.record_listeners = []
+        self.log_listeners = []
+        self.status_listeners = []
+        self.record_count = 0
+        self.log_count = 0
+        self.saved_modules = None
+        self.saved_config_path = None
+
+    def call(self, device, function, *args):
+        # every device access goes through here (fault injection hooks in)
+        return function(*args)
+
+    # ~~~ device models ~~~
+
+    def read_rtc(self):
+        return to_struct(self.clock.now + self.rtc_offset)
+
+    def write_rtc(self, value):
+        try:
+            self.rtc_offset = to_epoch(value) - self.clock.now
+        except (OverflowError, ValueError):
+            self.rtc_offset = 0.0
+
+    def read_weather(self):
+        now = self.clock.now
+        return (self.environment.humidity(now), self.environment.temperature(now))
+
+    def read_irradiance(self):
+        return self.environment.irradiance(self.clock.now)
+
+    def closed_panels(self):
+        # PV relays currently closed, in config order
+        panels = []
+        for key, pin in self.config.items():
+            # relays are active low, a PV pin driven as an output closes the relay
+            if key.endswith('PV') and self.gpio.levels.get(pin) is not None:
+                panels.append(key[:-2])
+        return panels
+
+    def read_adc_code(self, pin):
+        channel_map = self.config['ADCCHANNELMAP']
+        closed = self.closed_panels()
+        panel = None
+        for name, channel in channel_map.items():
+            if int(channel) == pin and name in closed:
+                panel = name
+        if panel is None and pin == int(channel_map.get('PV', 0)) and closed:
+            panel = closed[0]
+        if panel is None:
+            return 0
+
+        now = self.clock.now
+        branch = int(self.config['OCVBRANCH'])
+        if self.gpio.levels.get(branch):
+            value = self.environment.panel_voc(panel, now) / 11
+        else:
+            value = self.environment.panel_isc(panel, now) * 1
+        return max(0, min(STEPS, int(round(value * STEPS / VREF))))
+
+    def on_pin_change(self, pin, level):
+        # EDS activation relay switched on cleans its panel
+        if not level:
+            return
+        for key, value in self.config.items():
+            if value == pin and key.startswith('EDS') and key[3:].isdigit():
+                self.environment.clean_panel(key, self.clock.now)
+
+    def on_record(self, name, row):
+        self.record_count += 1
+        for listener in self.record_listeners:
+            listener(name, row)
+
+    def on_log(self, dt, phrase):
+        self.log_count += 1
+        for listener in self.log_listeners:
+            listener(dt, phrase)
+
+    def on_status(self, snapshot):
+        # one snapshot per completed loop iteration
+        for listener in self.status_listeners:
+            listener(snapshot)
+
+    # ~~~ install/uninstall ~~~
+
+    def get_modules(self):
+        gpio_module = self.gpio.get_pin_module()
+        rpi = types.ModuleType('RPi')
+        rpi.GPIO = gpio_module
+
+        busio = types.ModuleType('busio')
+        busio.SPI = SimSPI
+        busio.I2C = SimI2C
+
+        board = types.ModuleType('board')
+        for pin_name in ['SCK', 'MISO', 'MOSI', 'CE0', 'CE1', 'SCL', 'SDA', 'D5', 'D6']:
+            setattr(board, pin_name, pin_name)
+
+        digitalio = types.ModuleType('digitalio')
+        digitalio.DigitalInOut = SimDigitalInOut
+
+        mcp_package = types.ModuleType('adafruit_mcp3xxx')
+        mcp3008 = types.ModuleType('adafruit_mcp3xxx.mcp3008')
+        mcp3008.MCP3008 = make_mcp_class(self)
+        for channel in range(8):
+            setattr(mcp3008, 'P' + str(channel), channel)
+        analog_in = types.ModuleType('adafruit_mcp3xxx.analog_in')
+        analog_in.AnalogIn = SimAnalogIn
+        mcp_package.mcp3008 = mcp3008
+        mcp_package.analog_in = analog_in
+
+        pcf8523 = types.ModuleType('adafruit_pcf8523')
+        pcf8523.PCF8523 = make_rtc_class(self)
+        am2315 = types.ModuleType('AM2315')
+        am2315.AM2315 = make_weather_class(self)
+        sp420 = types.ModuleType('SP420')
+        sp420.Irradiance = make_irradiance_class(self)
+
+        return {
+            'RPi': rpi,
+            'RPi.GPIO': gpio_module,
+            'busio': busio,
+            'board': board,
+            'digitalio': digitalio,
+            'adafruit_mcp3xxx': mcp_package,
+            'adafruit_mcp3xxx.mcp3008': mcp3008,
+            'adafruit_mcp3xxx.analog_in': analog_in,
+            'adafruit_pcf8523': pcf8523,
+            'AM2315': am2315,
+            'SP420': sp420,
+            'DataManager': make_data_module(self),
+            'StatusManager': make_status_module(self),
+            }
+
+    def install(self):
+        # swap in simulated modules and config, drop project modules so they re-import against them
+        modules = self.get_modules()
+        self.saved_modules = {}
+        for name in list(modules) + ['TestingManager', 'MasterManager']:
+            self.saved_modules[name] = sys.modules.pop(name, None)
+        sys.modules.update(modules)
+
+        self.saved_config_path = SM.CONFIG_FILE_PATH
+        SM.CONFIG_FILE_PATH = self.config_dir + os.sep
+        with open(os.path.join(self.config_dir, SM.CONFIG_FILE_NAME), 'w') as cf:
+            json.dump(self.config, cf)
+        self.clock.install()
+
+    def uninstall(self):
+        self.clock.uninstall()
+        if self.saved_config_path is not None:
+            SM.CONFIG_FILE_PATH = self.saved_config_path
+        if self.saved_modules is not None:
+            for name, module in self.saved_modules.items():
+                if module is None:
+                    sys.modules.pop(name, None)
+                else:
+                    sys.modules[name] = module
+        self.saved_modules = None
+
+    def run_master(self, duration):
+        # run the real MasterManager loop for duration virtual seconds
+        self.clock.end = self.clock.now + duration
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'MasterManager.py')
+        try:
+            # not run as __main__, so no exit handlers pile up over simulated restarts
+            runpy.run_path(path, run_name='__sim__')
+        except SimulationEnd:
+            pass
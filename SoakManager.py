@@ -0,0 +1,433 @@
+'''
+=============================
+Title: Soak Test Harness - EDS Field Control
+Started: October 2026
+=============================
+'''
+
+'''
+Runs the real MasterManager loop on simulated hardware (SimHardware) for simulated weeks
+and samples the process while it runs: resident memory, traced Python memory and its top
+allocators, open file descriptors, thread count and the loop period (virtual seconds per
+iteration and real processing time per iteration). Samples are grouped per simulated day,
+and a metric fails when its daily values keep growing at a rate that would exceed its limit
+over a month. The JSON report can be compared between releases.
+
+Usage:
+    python3 SoakManager.py run [--days 14] [--config config.json] [--output soak_report.json]
+    python3 SoakManager.py compare <old report .json> <new report .json>
+'''
+
+import os
+import gc
+import csv
+import sys
+import json
+import time
+import socket
+import argparse
+import contextlib
+import platform
+import tempfile
+import threading
+import subprocess
+import tracemalloc
+import urllib.request
+
+import SimHardware as SH
+import ReplayManager as RPM
+
+# default simulated start (virtual local wall time, midnight so every window is a full day)
+DEFAULT_START = "2026-06-01 00:00:00"
+
+# days at the start of the run left out of the growth checks (caches, files and stats filling up)
+DEFAULT_WARMUP_DAYS = 1
+
+# growth checks are made over this many days of projected growth
+PROJECTION_DAYS = 30
+
+# number of allocation sites kept in the report
+TOP_ALLOCATORS = 10
+
+# sampled metrics, window aggregate ('max' or 'mean') and allowed growth over PROJECTION_DAYS
+# (relative metrics are a fraction of the first window value, the rest are absolute)
+METRICS = ['rss_bytes', 'traced_bytes', 'open_fds', 'threads', 'loop_period_s', 'loop_real_ms']
+WINDOW_AGGREGATE = {
+    'rss_bytes': 'max',
+    'traced_bytes': 'max',
+    'open_fds': 'max',
+    'threads': 'max',
+    'loop_period_s': 'mean',
+    'loop_real_ms': 'mean',
+    }
+DEFAULT_LIMITS = {
+    'rss_bytes': 8 * 1024 * 1024,
+    'traced_bytes': 4 * 1024 * 1024,
+    'open_fds': 2,
+    'threads': 1,
+    'loop_period_s': 0.05,
+    'loop_real_ms': 0.5,
+    }
+RELATIVE_METRICS = ['loop_period_s', 'loop_real_ms']
+
+
+def get_rss_bytes():
+    # current resident set size (falls back to the peak where /proc is missing)
+    try:
+        with open('/proc/self/statm', 'r') as sf:
+            return int(sf.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def get_open_fds():
+    for fd_dir in ['/proc/self/fd', '/dev/fd']:
+        if os.path.isdir(fd_dir):
+            return len(os.listdir(fd_dir))
+    return None
+
+
+def get_free_port():
+    # port for the status API of the simulated unit
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def get_revision():
+    # git revision of the code under test, None outside a checkout
+    try:
+        directory = os.path.dirname(os.path.abspath(__file__))
+        output = subprocess.check_output(['git', 'describe', '--always', '--dirty'], cwd=directory, stderr=subprocess.DEVNULL)
+        return output.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_slope(values):
+    # least squares slope of values against their index (per window)
+    count = len(values)
+    if count < 2:
+        return 0.0
+    mean_x = (count - 1) / 2
+    mean_y = sum(values) / count
+    num = sum((x - mean_x) * (y - mean_y) for x, y in enumerate(values))
+    den = sum((x - mean_x) ** 2 for x in range(count))
+    return num / den
+
+
+def check_growth(windows, metric, limit):
+    # summary of one metric over the daily windows after warmup
+    values = [window[metric] for window in windows if window[metric] is not None]
+    result = {'first': None, 'last': None, 'peak': None, 'slope_per_day': None,
+              'projected_growth': None, 'limit': limit, 'passed': True}
+    if not values:
+        return result
+    result['first'] = values[0]
+    result['last'] = values[-1]
+    result['peak'] = max(values)
+    if len(values) < 3:
+        # not enough days to tell growth from noise
+        return result
+    # trend of the later half only, allocator pools and caches level off early in a run
+    recent = values[-max(3, len(values) // 2):]
+    slope = get_slope(recent)
+    growth = slope * PROJECTION_DAYS
+    daily_limit = limit / PROJECTION_DAYS
+    if metric in RELATIVE_METRICS:
+        growth = growth / values[0] if values[0] > 0 else 0.0
+        daily_limit *= values[0]
+    result['slope_per_day'] = slope
+    result['projected_growth'] = growth
+    # unbounded growth is still rising at the end: a new peak on the last day, not a plateau
+    still_rising = values[-1] - max(values[:-1]) > daily_limit / 2
+    result['passed'] = not (growth > limit and still_rising)
+    return result
+
+
+def format_traceback(stat):
+    frame = stat.traceback[0]
+    return os.path.basename(frame.filename) + ':' + str(frame.lineno)
+
+'''
+Soak Master Class:
+Functionality:
+1) Runs MasterManager on simulated hardware for a number of virtual days
+2) Samples memory, file descriptors, threads and loop timing on virtual time intervals
+3) Reads the loop iteration count from the unit's status API
+4) Builds daily windows, checks them for sustained growth and writes the report
+'''
+
+class SoakMaster:
+
+    def __init__(self, workdir, config_overrides=None, limits=None, use_tracemalloc=True):
+        self.workdir = workdir
+        self.config_overrides = dict(config_overrides) if config_overrides else {}
+        self.limits = dict(DEFAULT_LIMITS)
+        if limits:
+            self.limits.update(limits)
+        self.use_tracemalloc = use_tracemalloc
+        self.samples_path = os.path.join(workdir, 'soak_samples.csv')
+
+        self.hw = None
+        self.status_url = None
+        self.sample_seconds = None
+        self.next_sample = None
+        self.last_sample = None
+        self.sampling_seconds = 0.0
+        # per-day aggregates only, the full samples go to the samples file
+        self.windows = []
+        self.window = None
+        self.window_start = None
+        self.warmup_end = None
+        self.baseline = None
+        self.sample_writer = None
+        self.api_errors = 0
+
+    def run(self, start, days, sample_seconds, warmup_days=DEFAULT_WARMUP_DAYS):
+        unit_dir = os.path.join(self.workdir, 'unit')
+        os.makedirs(unit_dir, exist_ok=True)
+        overrides = dict(self.config_overrides)
+        overrides.update({'statusEnabled': True, 'statusHost': '127.0.0.1', 'statusPort': get_free_port()})
+        self.status_url = 'http://127.0.0.1:' + str(overrides['statusPort']) + '/status/loop'
+
+        self.hw = SH.SimHardware(unit_dir, start, config_overrides=overrides)
+        self.sample_seconds = float(sample_seconds)
+        self.next_sample = start + self.sample_seconds
+        self.window_start = start
+        self.warmup_end = start + warmup_days * 86400
+        self.hw.clock.listeners.append(self.on_clock)
+
+        if self.use_tracemalloc:
+            tracemalloc.start()
+        real_start = time.perf_counter()
+        with open(self.samples_path, 'w', newline='') as sf:
+            self.sample_writer = csv.writer(sf)
+            self.sample_writer.writerow(['time', 'iterations'] + METRICS)
+            # console output of the unit goes to a file, printing weeks of it would dominate the run
+            with open(os.path.join(self.workdir, 'console.txt'), 'w') as console:
+                self.hw.install()
+                try:
+                    with contextlib.redirect_stdout(console):
+                        self.hw.run_master(days * 86400)
+                finally:
+                    self.hw.uninstall()
+                    self.sample_writer = None
+        real_seconds = time.perf_counter() - real_start
+
+        allocators = self.get_top_allocators()
+        if self.use_tracemalloc:
+            tracemalloc.stop()
+        return self.build_report(start, days, warmup_days, real_seconds, allocators)
+
+    # ~~~ sampling ~~~
+
+    def on_clock(self, clock):
+        if clock.now < self.next_sample:
+            return
+        self.next_sample += self.sample_seconds
+        sample_start = time.perf_counter()
+        self.take_sample(clock)
+        self.sampling_seconds += time.perf_counter() - sample_start
+
+    def get_iterations(self):
+        # loop iterations published by the unit, None if the API doesn't answer
+        try:
+            with urllib.request.urlopen(self.status_url, timeout=5) as response:
+                return json.loads(response.read())['iterations']
+        except Exception:
+            self.api_errors += 1
+            return None
+
+    def take_sample(self, clock):
+        # descriptors and threads first, so the status request itself isn't counted
+        sample = {
+            'open_fds': get_open_fds(),
+            'threads': threading.active_count(),
+            'loop_period_s': None,
+            'loop_real_ms': None,
+            }
+        iterations = self.get_iterations()
+        gc.collect()
+        sample['rss_bytes'] = get_rss_bytes()
+        sample['traced_bytes'] = tracemalloc.get_traced_memory()[0] if self.use_tracemalloc else None
+
+        # loop period since the previous sample, real time without the harness's own sampling
+        real_now = time.perf_counter()
+        if self.last_sample is not None and iterations is not None and self.last_sample['iterations'] is not None:
+            done = iterations - self.last_sample['iterations']
+            if done > 0:
+                sample['loop_period_s'] = (clock.now - self.last_sample['time']) / done
+                real_spent = real_now - self.last_sample['real'] - self.sampling_seconds
+                sample['loop_real_ms'] = max(0.0, real_spent) * 1000 / done
+        self.last_sample = {'time': clock.now, 'real': real_now, 'iterations': iterations}
+        self.sampling_seconds = 0.0
+
+        self.sample_writer.writerow([clock.now, iterations] + [sample[metric] for metric in METRICS])
+        self.add_to_window(clock.now, sample)
+
+        # allocation baseline once the warmup is over
+        if self.use_tracemalloc and self.baseline is None and clock.now >= self.warmup_end:
+            self.baseline = tracemalloc.take_snapshot()
+
+    def add_to_window(self, now, sample):
+        if now - self.window_start >= 86400:
+            self.close_window()
+            self.window_start += 86400 * int((now - self.window_start) // 86400)
+        if self.window is None:
+            self.window = {'start': self.window_start, 'count': 0, 'values': dict((metric, []) for metric in METRICS)}
+        self.window['count'] += 1
+        for metric in METRICS:
+            if sample[metric] is not None:
+                self.window['values'][metric].append(sample[metric])
+
+    def close_window(self):
+        if self.window is None:
+            return
+        summary = {'start': self.window['start'], 'samples': self.window['count']}
+        for metric in METRICS:
+            values = self.window['values'][metric]
+            if not values:
+                summary[metric] = None
+            elif WINDOW_AGGREGATE[metric] == 'max':
+                summary[metric] = max(values)
+            else:
+                summary[metric] = sum(values) / len(values)
+        self.windows.append(summary)
+        self.window = None
+
+    def get_top_allocators(self):
+        # allocation sites that grew the most between the end of warmup and the end of the run
+        if not self.use_tracemalloc or self.baseline is None:
+            return []
+        gc.collect()
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        final = tracemalloc.take_snapshot().filter_traces(ignore)
+        baseline = self.baseline.filter_traces(ignore)
+        allocators = []
+        stats = final.compare_to(baseline, 'lineno')
+        stats.sort(key=lambda stat: stat.size_diff, reverse=True)
+        for stat in stats[:TOP_ALLOCATORS]:
+            allocators.append({
+                'location': format_traceback(stat),
+                'size_diff': stat.size_diff,
+                'count_diff': stat.count_diff,
+                'size': stat.size,
+                })
+        return allocators
+
+    # ~~~ report ~~~
+
+    def build_report(self, start, days, warmup_days, real_seconds, allocators):
+        # partial last day is dropped so every window covers the same time of day
+        if self.window is not None and self.window_start + 86400 <= self.hw.clock.now:
+            self.close_window()
+        checked = [window for window in self.windows if window['start'] >= self.warmup_end]
+        checks = dict((metric, check_growth(checked, metric, self.limits[metric])) for metric in METRICS)
+        return {
+            'revision': get_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'start': start,
+            'days': days,
+            'warmup_days': warmup_days,
+            'sample_seconds': self.sample_seconds,
+            'real_seconds': real_seconds,
+            'iterations': self.last_sample['iterations'] if self.last_sample else None,
+            'records': self.hw.record_count,
+            'log_lines': self.hw.log_count,
+            'api_errors': self.api_errors,
+            'tracemalloc': self.use_tracemalloc,
+            'projection_days': PROJECTION_DAYS,
+            'windows': self.windows,
+            'checks': checks,
+            'top_allocators': allocators,
+            'passed': all(check['passed'] for check in checks.values()) and self.api_errors == 0,
+            }
+
+
+def format_value(value):
+    if value is None:
+        return '-'
+    if isinstance(value, float):
+        return str(round(value, 4))
+    return str(value)
+
+
+def print_report(report):
+    print("Soak run of " + str(report['days']) + " simulated days in " + str(round(report['real_seconds'], 1))
+          + " s (revision " + str(report['revision']) + ")")
+    print("Loop iterations: " + str(report['iterations']) + ", records: " + str(report['records'])
+          + ", log lines: " + str(report['log_lines']) + ", status API errors: " + str(report['api_errors']))
+    print("metric          first         last          growth/" + str(report['projection_days']) + "d   limit         result")
+    for metric in METRICS:
+        check = report['checks'][metric]
+        print(metric.ljust(16) + format_value(check['first']).ljust(14) + format_value(check['last']).ljust(14)
+              + format_value(check['projected_growth']).ljust(14) + format_value(check['limit']).ljust(14)
+              + ("ok" if check['passed'] else "GROWING"))
+    if report['top_allocators']:
+        print("Top allocation growth since warmup:")
+        for allocator in report['top_allocators']:
+            print("  " + allocator['location'].ljust(36) + str(allocator['size_diff']).rjust(10) + " B "
+                  + str(allocator['count_diff']).rjust(7) + " blocks")
+    print("PASSED" if report['passed'] else "FAILED")
+
+
+def compare_reports(old, new):
+    # side by side growth of two reports (e.g. two releases)
+    print("old: " + str(old['revision']) + " (" + str(old['days']) + " days), new: " + str(new['revision'])
+          + " (" + str(new['days']) + " days)")
+    print("metric          old last      new last      old growth    new growth    new result")
+    for metric in METRICS:
+        old_check = old['checks'].get(metric, {})
+        new_check = new['checks'].get(metric, {})
+        print(metric.ljust(16) + format_value(old_check.get('last')).ljust(14) + format_value(new_check.get('last')).ljust(14)
+              + format_value(old_check.get('projected_growth')).ljust(14) + format_value(new_check.get('projected_growth')).ljust(14)
+              + ("ok" if new_check.get('passed', True) else "GROWING"))
+    print("old " + ("PASSED" if old['passed'] else "FAILED") + ", new " + ("PASSED" if new['passed'] else "FAILED"))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Soak test MasterManager on simulated hardware at accelerated time.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help="run a soak test and write a report")
+    run_parser.add_argument('--days', type=float, default=14, help="simulated days to run")
+    run_parser.add_argument('--start', default=DEFAULT_START, help="simulated start time")
+    run_parser.add_argument('--sample-minutes', type=float, default=10, help="simulated minutes between samples")
+    run_parser.add_argument('--warmup-days', type=int, default=DEFAULT_WARMUP_DAYS)
+    run_parser.add_argument('--config', help="unit config.json (defaults are used for missing parameters)")
+    run_parser.add_argument('--limits', help=".json growth limit overrides (see DEFAULT_LIMITS)")
+    run_parser.add_argument('--no-tracemalloc', action='store_true', help="skip Python allocation tracing (faster)")
+    run_parser.add_argument('--workdir', help="keep the unit files and samples here (default: temporary)")
+    run_parser.add_argument('--output', default='soak_report.json')
+    compare_parser = commands.add_parser('compare', help="compare two soak reports")
+    compare_parser.add_argument('old')
+    compare_parser.add_argument('new')
+    args = parser.parse_args()
+
+    if args.command == 'compare':
+        with open(args.old, 'r') as rf:
+            old_report = json.load(rf)
+        with open(args.new, 'r') as rf:
+            new_report = json.load(rf)
+        compare_reports(old_report, new_report)
+        sys.exit(0 if new_report['passed'] else 1)
+
+    limits = None
+    if args.limits:
+        with open(args.limits, 'r') as lf:
+            limits = json.load(lf)
+    config = RPM.load_config(args.config)
+
+    with tempfile.TemporaryDirectory(prefix='eds_soak_') as tmp_dir:
+        workdir = args.workdir if args.workdir else tmp_dir
+        os.makedirs(workdir, exist_ok=True)
+        soak_master = SoakMaster(workdir, config, limits, not args.no_tracemalloc)
+        report = soak_master.run(RPM.parse_time(args.start), args.days, args.sample_minutes * 60, args.warmup_days)
+
+    with open(args.output, 'w') as of:
+        json.dump(report, of, indent=1)
+    print_report(report)
+    sys.exit(0 if report['passed'] else 1)
@@ -0,0 +1,267 @@
+'''
+=============================
+Title: Local Spool and USB Sync - EDS Field Control
+Started: October 2026
+=============================
+'''
+
+import os
+import json
+import time
+import threading
+
+import RotationManager as RM
+
+# sync state file kept in the spool directory (dot files are never synced)
+STATE_FILE_NAME = ".spool_state.json"
+
+# copy size for bulk writes to the USB
+CHUNK_BYTES = 1024 * 1024
+
+'''
+Spool Master Class:
+Functionality:
+1) Provides a local spool directory on the SD card for CSVMaster/LogMaster, so writes never wait on the USB
+2) Syncs the spool to the USB in a background thread with large sequential writes
+3) Appends only the new bytes of live files and copies closed segments once
+4) Detects a missing/remounted USB with a cached path and periodic re-check
+5) Keeps sync offsets on disk so it resumes where it left off after a restart or swap
+'''
+
+class SpoolMaster:
+
+    def __init__(self, config_dictionary, usb_master):
+        self.spool_path = config_dictionary['spoolPath']
+        self.sync_seconds = float(config_dictionary['spoolSyncSeconds'])
+        self.recheck_seconds = float(config_dictionary['spoolRecheckSeconds'])
+        self.mount_check = bool(config_dictionary['spoolUSBMountCheck'])
+        self.usb_master = usb_master
+        os.makedirs(self.spool_path, exist_ok=True)
+
+        # cached USB path, None while the stick is missing
+        self.usb_path = None
+        self.last_recheck = None
+        self.last_sync = None
+        self.last_error = None
+        self.pending_bytes = 0
+
+        # {file name: {'ino', 'offset'} for live files, {'size', 'mtime'} for closed files}
+        self.state_file = os.path.join(self.spool_path, STATE_FILE_NAME)
+        self.state_lock = threading.Lock()
+        self.state = {}
+        self.load_state()
+
+        self.stop_event = threading.Event()
+        self.sync_thread = None
+
+    def get_spool_path(self):
+        return self.spool_path
+
+    def start(self):
+        self.sync_thread = threading.Thread(target=self.sync_worker, daemon=True)
+        self.sync_thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.sync_thread is not None:
+            self.sync_thread.join()
+
+    def get_status(self):
+        return {
+            'usb_path': self.usb_path,
+            'connected': self.usb_path is not None,
+            'pending_bytes': self.pending_bytes,
+            'last_sync': self.last_sync,
+            'last_error': self.last_error,
+            }
+
+    def is_synced(self, name):
+        # True once a closed file in the spool has been copied to the USB
+        path = os.path.join(self.spool_path, name)
+        with self.state_lock:
+            info = self.state.get(name)
+        if info is None or not os.path.isfile(path):
+            return False
+        stat = os.stat(path)
+        return info.get('size') == stat.st_size and info.get('mtime') == stat.st_mtime
+
+    # ~~~ USB detection ~~~
+
+    def is_usb_usable(self, path):
+        # a pulled stick leaves its mount point behind on the SD card (still a writable directory),
+        # so the path must be on another device than the spool
+        try:
+            if not (os.path.isdir(path) and os.access(path, os.W_OK)):
+                return False
+            if not self.mount_check:
+                return os.path.realpath(path) != os.path.realpath(self.spool_path)
+            return os.stat(path).st_dev != os.stat(self.spool_path).st_dev
+        except OSError:
+            return False
+
+    def check_usb(self):
+        # returns the usable USB path or None, re-asking USBMaster at most every recheck interval
+        if self.usb_path is not None and self.is_usb_usable(self.usb_path):
+            return self.usb_path
+        self.usb_path = None
+
+        now = time.monotonic()
+        if self.last_recheck is not None and now - self.last_recheck < self.recheck_seconds:
+            return None
+        self.last_recheck = now
+        try:
+            path = self.usb_master.get_USB_path()
+        except Exception as e:
+            self.last_error = "USB lookup failed: " + str(e)
+            return None
+        if path and self.is_usb_usable(path):
+            self.usb_path = path
+        return self.usb_path
+
+    # ~~~ sync ~~~
+
+    def sync_worker(self):
+        while not self.stop_event.is_set():
+            self.sync_once()
+            self.stop_event.wait(self.sync_seconds)
+
+    def sync_once(self):
+        usb_path = self.check_usb()
+        if usb_path is None:
+            self.pending_bytes = self.get_pending_bytes()
+            return False
+        try:
+            names = set()
+            for entry in os.scandir(self.spool_path):
+                if not entry.is_file() or not self.is_syncable(entry.name):
+                    continue
+                names.add(entry.name)
+                if self.is_live_file(entry.name):
+                    self.sync_live(entry.name, usb_path)
+                else:
+                    self.sync_closed(entry.name, usb_path)
+            self.forget_removed(names)
+            self.save_state()
+            self.last_sync = time.time()
+            self.last_error = None
+            self.pending_bytes = self.get_pending_bytes()
+            return True
+        except OSError as e:
+            # stick pulled or full, drop the cached path and re-check next time
+            self.last_error = "USB sync failed: " + str(e)
+            self.usb_path = None
+            self.save_state()
+            return False
+
+    def is_syncable(self, name):
+        # skip dot files, temp files and segments still waiting for compression
+        if name.startswith('.') or name.endswith('.tmp') or name.endswith('.part'):
+            return False
+        match = RM.SEGMENT_PATTERN.match(name)
+        return match is None or match.group(4) is not None
+
+    def is_live_file(self, name):
+        # live files grow by appends, everything else (segments, manifest) is copied whole
+        return RM.SEGMENT_PATTERN.match(name) is None and name != RM.MANIFEST_NAME
+
+    def sync_live(self, name, usb_path):
+        src = os.path.join(self.spool_path, name)
+        dst = os.path.join(usb_path, name)
+        with open(src, 'rb') as fin:
+            stat = os.fstat(fin.fileno())
+            with self.state_lock:
+                info = self.state.get(name)
+            # start over if the live file was rotated/replaced or the USB copy doesn't match (new stick)
+            dst_size = os.path.getsize(dst) if os.path.isfile(dst) else -1
+            if info is None or info.get('ino') != stat.st_ino or info['offset'] > stat.st_size or dst_size != info['offset']:
+                info = {'ino': stat.st_ino, 'offset': 0}
+                mode = 'wb'
+            else:
+                info = dict(info)
+                mode = 'ab'
+            if mode == 'ab' and info['offset'] == stat.st_size:
+                return
+
+            fin.seek(info['offset'])
+            with open(dst, mode) as fout:
+                remaining = stat.st_size - info['offset']
+                while remaining > 0:
+                    chunk = fin.read(min(CHUNK_BYTES, remaining))
+                    if not chunk:
+                        break
+                    fout.write(chunk)
+                    remaining -= len(chunk)
+                    info['offset'] += len(chunk)
+                fout.flush()
+                os.fsync(fout.fileno())
+        with self.state_lock:
+            self.state[name] = info
+
+    def sync_closed(self, name, usb_path):
+        src = os.path.join(self.spool_path, name)
+        dst = os.path.join(usb_path, name)
+        stat = os.stat(src)
+        with self.state_lock:
+            info = self.state.get(name)
+        if info is not None and info.get('size') == stat.st_size and info.get('mtime') == stat.st_mtime and os.path.isfile(dst):
+            return
+        # copy to a temp name then rename so the USB never holds half a segment
+        tmp = dst + '.part'
+        with open(src, 'rb') as fin:
+            with open(tmp, 'wb') as fout:
+                while True:
+                    chunk = fin.read(CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    fout.write(chunk)
+                fout.flush()
+                os.fsync(fout.fileno())
+        os.replace(tmp, dst)
+        with self.state_lock:
+            self.state[name] = {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+    def forget_removed(self, names):
+        # files removed from the spool (SD card disk cap) are only dropped from the state,
+        # the USB keeps its copy (it holds the full history)
+        with self.state_lock:
+            for name in [name for name in self.state if name not in names]:
+                del self.state[name]
+
+    def get_pending_bytes(self):
+        # bytes in the spool not yet on the USB
+        pending = 0
+        for entry in os.scandir(self.spool_path):
+            if not entry.is_file() or not self.is_syncable(entry.name):
+                continue
+            stat = entry.stat()
+            with self.state_lock:
+                info = self.state.get(entry.name)
+            if self.is_live_file(entry.name):
+                if info is None or info.get('ino') != stat.st_ino:
+                    pending += stat.st_size
+                else:
+                    pending += max(0, stat.st_size - info['offset'])
+            elif info is None or info.get('size') != stat.st_size or info.get('mtime') != stat.st_mtime:
+                pending += stat.st_size
+        return pending
+
+    # ~~~ state ~~~
+
+    def load_state(self):
+        if not os.path.isfile(self.state_file):
+            return
+        try:
+            with open(self.state_file, 'r') as sf:
+                self.state = json.load(sf)
+        except:
+            # without state everything is copied again from the start
+            print("Error loading spool state. Resyncing spool to USB from the start!")
+            self.state = {}
+
+    def save_state(self):
+        with self.state_lock:
+            state = dict(self.state)
+        tmp_file = self.state_file + '.tmp'
+        with open(tmp_file, 'w') as sf:
+            json.dump(state, sf)
+        os.replace(tmp_file, self.state_file)
@@ -52,6 +52,9 @@ DEFAULT_CONFIG_PARAM = {
     'POWER': 24,
     'OCVBRANCH': 25,
     'SCCBRANCH': 7,
+    # MCP3008 channel map: 'PV' is the relay multiplexed channel, panels wired
+    # to their own channel are added as e.g. 'EDS1': 1, 'CTRL1': 5
+    'ADCCHANNELMAP': {'PV': 0},
     
     # testing requirements
     'maxTemperatureCelsius': 40,
@@ -60,6 +63,16 @@ DEFAULT_CONFIG_PARAM = {
     'minRelativeHumidity': 30,
     'testDurationSeconds': 5,
     'testWindowSeconds': 2700,
+    # EDS supply power per active EDS (W), per EDS overrides as e.g. 'EDS3': 12
+    # EDS whose total power fits the budget (and share no relays) are activated together
+    'edsPowerWatts': 10,
+    'EDSPOWERWATTS': {},
+    'edsSupplyBudgetWatts': 10,
+    'queueHistory': 20,
+    # control panel readings are reused between tests while younger than this (s, 0 to always measure)
+    # and while SP420 irradiance stays within this fraction of the cached reading's
+    'ctrlCacheMaxSeconds': 300,
+    'ctrlCacheIrradianceChange': 0.05,
     
     # indicators/switches
     'outPinLEDGreen': 5,
@@ -68,12 +81,52 @@ DEFAULT_CONFIG_PARAM = {
     'manualEDSNumber': 1,
     'solarChargerEDSNumber': 6,
     
+    # GPIO relay wear statistics (transition counts) save interval (s)
+    'gpioCountSaveSeconds': 600,
+    
     # reboot
     'rebootFlag': False,
     
+    # RTC time service: RTC read interval, retry interval while faulty, and the largest
+    # difference to the monotonic clock accepted without a confirming second read (s)
+    'timeResyncSeconds': 3600,
+    'timeRetrySeconds': 60,
+    'timeMaxDriftSeconds': 5,
+    
     # location data
     'degLongitude': -71.05,
     'offsetGMT': -4,
+    
+    # soiling statistics
+    'statsWindowSize': 30,
+    'statsEWMAAlpha': 0.1,
+    
+    # log and data rotation
+    'rotationMaxBytes': 4194304,
+    'rotationMaxDiskBytes': 268435456,
+    'rotationCheckSeconds': 60,
+    'rotationExtensions': ['.csv', '.txt', '.log', '.bin'],
+    'rotationCompression': 'gzip',
+    
+    # sidecar time index of data and log files {file name or pattern: EDS column, null for logs}
+    # (LogMaster names a log by its start date, every .txt/.log file in the spool is a log)
+    'INDEXFILES': {'noon_data.csv': 3, 'testing_data.csv': 4, 'manual_data.csv': 3, '*.txt': None, '*.log': None},
+    # data files whose rows also hold a reading of every control in CTRLIDS order
+    'INDEXCTRLFILES': ['testing_data.csv'],
+    'indexCheckSeconds': 60,
+    
+    # local spool on the SD card, synced to the USB in the background
+    'spoolPath': '/home/pi/EDSPython/spool/',
+    'spoolSyncSeconds': 30,
+    'spoolRecheckSeconds': 60,
+    # only sync to a USB path on another device than the spool (off for simulated units)
+    'spoolUSBMountCheck': True,
+    
+    # local read-only status API (0.0.0.0 serves it to the network)
+    'statusEnabled': True,
+    'statusHost': '127.0.0.1',
+    'statusPort': 8080,
+    'statusSensorHistory': 120,
     }
 
 '''
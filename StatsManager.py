@@ -0,0 +1,166 @@
+'''
+=============================
+Title: Soiling Statistics - EDS Field Control
+Started: October 2026
+=============================
+'''
+
+import os
+import json
+from collections import deque
+
+# stats state file statics
+STATS_FILE_NAME = "eds_stats.json"
+
+# tracked metrics for every EDS
+# SR_BEFORE/SR_AFTER: EDS Isc relative to the mean control Isc (soiling ratio)
+# GAIN: after/before Isc of the EDS (cleaning gain)
+# PR_DELTA: after - before performance ratio of the EDS
+STAT_KEYS = ['SR_BEFORE', 'SR_AFTER', 'GAIN', 'PR_DELTA']
+
+'''
+Rolling Stat Class:
+Functionality:
+1) Keeps a fixed size window of the latest values with a running sum
+2) Keeps an exponentially weighted moving average of every value
+3) Updates in constant time for each new value
+'''
+
+class RollingStat:
+
+    def __init__(self, window_size, alpha):
+        self.window = deque(maxlen=window_size)
+        self.alpha = alpha
+        self.total = 0.0
+        self.ewma = None
+        self.last = None
+        self.count = 0
+
+    def update(self, value):
+        # drop the oldest value from the running sum once the window is full
+        if len(self.window) == self.window.maxlen:
+            self.total -= self.window[0]
+        self.window.append(value)
+        self.total += value
+        self.count += 1
+        # resum once per window so float error can't build up over months
+        if self.count % self.window.maxlen == 0:
+            self.total = sum(self.window)
+
+        if self.ewma is None:
+            self.ewma = value
+        else:
+            self.ewma = self.alpha * value + (1 - self.alpha) * self.ewma
+        self.last = value
+
+    def get_mean(self):
+        if not self.window:
+            return None
+        return self.total / len(self.window)
+
+    def to_dict(self):
+        return {'window': list(self.window), 'ewma': self.ewma, 'last': self.last, 'count': self.count}
+
+    def from_dict(self, state):
+        self.window.clear()
+        self.window.extend(state.get('window', []))
+        self.total = sum(self.window)
+        self.ewma = state.get('ewma')
+        self.last = state.get('last')
+        self.count = state.get('count', len(self.window))
+
+'''
+Stats Master Class:
+Functionality:
+1) Tracks soiling ratio, cleaning gain and PR delta for each EDS
+2) Persists state between restarts in a small .json file
+3) Provides current values for logging and status
+'''
+
+class StatsMaster:
+
+    def __init__(self, config_dictionary, path):
+        # a window of at least one value (0 or less in the config would divide by zero)
+        self.window_size = max(1, int(config_dictionary['statsWindowSize']))
+        self.alpha = float(config_dictionary['statsEWMAAlpha'])
+        self.stats_file = os.path.join(path, STATS_FILE_NAME)
+
+        # {eds number: {stat key: RollingStat}}
+        self.stats = {}
+        self.load_stats()
+
+    def get_eds_stats(self, eds_num):
+        # create stats for an EDS the first time it is seen
+        if eds_num not in self.stats:
+            self.stats[eds_num] = {}
+            for key in STAT_KEYS:
+                self.stats[eds_num][key] = RollingStat(self.window_size, self.alpha)
+        return self.stats[eds_num]
+
+    def update_test(self, eds_num, scc_before, scc_after, ctrl_scc_data, pr_before, pr_after):
+        # update statistics with the results of one EDS test
+        eds_stats = self.get_eds_stats(eds_num)
+
+        # control mean only counts valid readings
+        ctrl_valid = [scc for scc in ctrl_scc_data if scc > 0]
+        if ctrl_valid:
+            ctrl_mean = sum(ctrl_valid) / len(ctrl_valid)
+            eds_stats['SR_BEFORE'].update(scc_before / ctrl_mean)
+            eds_stats['SR_AFTER'].update(scc_after / ctrl_mean)
+
+        if scc_before > 0:
+            eds_stats['GAIN'].update(scc_after / scc_before)
+
+        # PR is -1 when there was no irradiance reading
+        if pr_before != -1 and pr_after != -1:
+            eds_stats['PR_DELTA'].update(pr_after - pr_before)
+
+        self.save_stats()
+
+    def get_summary(self, eds_num):
+        # returns {stat key: {'last', 'mean', 'ewma', 'count'}} for an EDS
+        summary = {}
+        for key, stat in self.get_eds_stats(eds_num).items():
+            summary[key] = {
+                'last': stat.last,
+                'mean': stat.get_mean(),
+                'ewma': stat.ewma,
+                'count': stat.count,
+                }
+        return summary
+
+    def get_phrase(self, eds_num):
+        # single log line with the current values for an EDS
+        phrase = "Stats for EDS" + str(eds_num) + ":"
+        for key, values in self.get_summary(eds_num).items():
+            if values['count'] == 0:
+                continue
+            phrase += " " + key + " mean=" + str(round(values['mean'], 3)) + " ewma=" + str(round(values['ewma'], 3))
+        return phrase
+
+    def load_stats(self):
+        # load previous state if it exists
+        if not os.path.isfile(self.stats_file):
+            return
+        try:
+            with open(self.stats_file, 'r') as sf:
+                state = json.load(sf)
+            for eds_num, eds_state in state.items():
+                eds_stats = self.get_eds_stats(int(eds_num))
+                for key in STAT_KEYS:
+                    if key in eds_state:
+                        eds_stats[key].from_dict(eds_state[key])
+        except:
+            # start over if the state can't be read
+            print("Error loading stats file. Starting with empty statistics!")
+            self.stats = {}
+
+    def save_stats(self):
+        state = {}
+        for eds_num, eds_stats in self.stats.items():
+            state[str(eds_num)] = {key: stat.to_dict() for key, stat in eds_stats.items()}
+        # write to temp file then replace so a power cut can't leave a half written file
+        tmp_file = self.stats_file + ".tmp"
+        with open(tmp_file, 'w') as sf:
+            json.dump(state, sf)
+        os.replace(tmp_file, self.stats_file)
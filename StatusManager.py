@@ -0,0 +1,98 @@
+'''
+=============================
+Title: Local Status API - EDS Field Control
+Started: October 2026
+=============================
+'''
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+'''
+Status Master Class:
+Functionality:
+1) Holds the latest status snapshot published by the main loop (one reference swap per loop)
+2) Serves the snapshot as read-only JSON over HTTP from background threads
+3) Encodes each snapshot at most once no matter how often it is polled
+
+Endpoints:
+    /status            full snapshot
+    /status/<section>  one section (e.g. errors, measurements, triggers, sensors, loop)
+'''
+
+class StatusMaster:
+
+    def __init__(self, config_dictionary):
+        self.enabled = bool(config_dictionary['statusEnabled'])
+        self.host = config_dictionary['statusHost']
+        self.port = int(config_dictionary['statusPort'])
+
+        # (version, snapshot) is replaced as a whole, never modified after publishing
+        self.published = (0, {})
+        # (version, {section: encoded bytes}) only touched by server threads
+        self.encoded = (-1, {})
+        self.encode_lock = threading.Lock()
+        self.server = None
+        self.server_thread = None
+
+    def start(self):
+        if not self.enabled:
+            return
+        handler = make_handler(self)
+        self.server = ThreadingHTTPServer((self.host, self.port), handler)
+        self.server.daemon_threads = True
+        self.server_thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.server_thread.start()
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def publish(self, snapshot):
+        # called by the loop with a freshly built dictionary it will not touch again
+        self.published = (self.published[0] + 1, snapshot)
+
+    def get_encoded(self, section):
+        # JSON bytes of the snapshot (or one section), None if the section doesn't exist
+        version, snapshot = self.published
+        with self.encode_lock:
+            if self.encoded[0] != version:
+                self.encoded = (version, {})
+            cache = self.encoded[1]
+            if section not in cache:
+                if section is None:
+                    cache[section] = json.dumps(snapshot, default=str).encode()
+                elif section in snapshot:
+                    cache[section] = json.dumps(snapshot[section], default=str).encode()
+                else:
+                    return None
+            return cache[section]
+
+
+def make_handler(status_master):
+    class StatusHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            parts = [part for part in self.path.split('?')[0].split('/') if part]
+            if not parts or parts[0] != 'status' or len(parts) > 2:
+                self.send_error(404)
+                return
+            body = status_master.get_encoded(parts[1] if len(parts) == 2 else None)
+            if body is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Cache-Control', 'no-store')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # keep polling out of the console/log
+            pass
+
+    return StatusHandler
@@ -16,7 +16,12 @@ import busio
 import digitalio
 import board
 import adafruit_mcp3xxx.mcp3008 as MCP 
-from adafruit_mcp3xxx.analog_in import AnalogIn
+
+import StaticManager as SM
+import CalibrationManager as CM
+import GpioManager as GM
+import RecordManager as RCM
+
 # adc constants
 #ADC_PV_CHAN = 1
 #ADC_BAT_CHAN = 2
@@ -36,6 +41,13 @@ H_TOL = 0.1
 # how close current time must be to scheduled time to initiate test (min)
 MIN_CHECK_THRESHOLD = 0.5
 
+# default ADC channel for panels measured through the relay multiplexer
+DEFAULT_PV_CHANNEL = 0
+
+# irradiance below this counts as this much when checking cached control readings (W/m^2)
+# (keeps the relative change check from tripping on every reading at dawn/dusk)
+CACHE_MIN_IRRADIANCE = 50
+
 # GPIO setup
 GPIO.cleanup()
 
@@ -51,46 +63,78 @@ ADC Master Class:
 Functionality:
 1) Initializes connection with ADC chip
 2) Reads and processes raw data from ADC
-3) Converts raw data into usable information
+3) Converts raw data into usable information through the calibration tables
 4) Logs data into .csv file
 '''
 
 class ADCMaster:
-    def __init__(self):
-        #GPIO pin to trigger the relay, high is OCV, low is SCC
-        GPIO.setup(25, GPIO.OUT)
+    def __init__(self, channel_map=None):
         #Properties
-        #self.mcp = MCP.MCP3008(spi, cs)
+        # SPI connection is opened once on first read and reused
+        self.mcp = None
         self.bat_div = 10
+        # {name: MCP3008 channel}, 'PV' is the multiplexed panel channel
+        if channel_map is None:
+            channel_map = {}
+        self.channel_map = channel_map
+        self.pv_channel = int(channel_map.get('PV', DEFAULT_PV_CHANNEL))
+        # per-unit calibration lookup tables (raw code -> value)
+        self.cal_master = CM.CalibrationMaster(SM.CONFIG_FILE_PATH)
+        # ambient temperature for calibration temperature compensation (None = off)
+        self.temperature = None
+        # raw code of the last single channel read
+        self.last_code = None
+        
+    def get_cal_version(self):
+        return self.cal_master.get_version()
+    
+    def set_temperature(self, temp):
+        self.temperature = temp
+    
+    def get_mcp(self):
+        # open the SPI connection once instead of on every read
+        if self.mcp is None:
+            spi = busio.SPI(clock=board.SCK, MISO=board.MISO, MOSI=board.MOSI)
+            cs = digitalio.DigitalInOut(board.CE0)
+            self.mcp = MCP.MCP3008(spi, cs)
+        return self.mcp
+    
+    def read_code(self, channel):
+        # raw 10 bit code of a single channel
+        return self.get_mcp().read(channel)
         
     def get_ocv_PV(self):
-        spi = busio.SPI(clock=board.SCK, MISO=board.MISO, MOSI=board.MOSI)
-        cs = digitalio.DigitalInOut(board.CE0)
-        mcp = MCP.MCP3008(spi, cs)
-        chan=AnalogIn(mcp, MCP.P0)
         time.sleep(1)
-        raw = chan.voltage
-        print('PV Raw volt read: ' + str(raw) + '[V]')
-        # Since we divided voltage by 11, multiply by 11 to get actual Voc
-        return raw * 11
+        raw = self.read_code(self.pv_channel)
+        self.last_code = raw
+        print('PV Raw volt read: ' + str(raw) + '[code]')
+        # Voc divider (x11) is part of the calibration table
+        return self.cal_master.convert(self.cal_master.resolve('PV_OCV', self.pv_channel), raw, self.temperature)
     
     def get_scc_PV(self):
-        spi = busio.SPI(clock=board.SCK, MISO=board.MISO, MOSI=board.MOSI)
-        cs = digitalio.DigitalInOut(board.CE0)
-        mcp = MCP.MCP3008(spi, cs)
-        chan=AnalogIn(mcp, MCP.P0)
         time.sleep(1)
-        raw = chan.voltage
-        print('PV Raw curr read: ' + str(raw) + '[A]')
-        #SCC = Voc x 1 ohm
-        return raw * 1
+        raw = self.read_code(self.pv_channel)
+        self.last_code = raw
+        print('PV Raw curr read: ' + str(raw) + '[code]')
+        #SCC = Voc x 1 ohm (shunt is part of the calibration table)
+        return self.cal_master.convert(self.cal_master.resolve('PV_SCC', self.pv_channel), raw, self.temperature)
     
     def get_ocv_BAT(self):
-        chan=AnalogIn(self.mcp, MCP.P0)
-        raw = self.mcp.read_adc(channel)
-        print('Battery raw volt read: ' + str(raw) + '[V]')
-        # voltage divider calc
-        return self.bat_div * VREF * raw / STEPS
+        bat_channel = int(self.channel_map.get('BAT', self.pv_channel))
+        raw = self.read_code(bat_channel)
+        print('Battery raw volt read: ' + str(raw) + '[code]')
+        # voltage divider calc (bat_div is part of the calibration table)
+        return self.cal_master.convert(self.cal_master.resolve('BAT', bat_channel), raw, self.temperature)
+    
+    def scan(self, channels):
+        # read every channel in one tight SPI burst
+        # returns (timestamp, burst length in seconds, [raw codes])
+        read = self.get_mcp().read
+        timestamp = time.time()
+        start = time.monotonic()
+        codes = [read(channel) for channel in channels]
+        span = time.monotonic() - start
+        return timestamp, span, codes
 
 '''
 Testing Master Class:
@@ -104,7 +148,12 @@ class TestingMaster:
     def __init__(self, config_dictionary):
         self.okay_to_test = False
         self.test_config = config_dictionary
-        self.adc_m = ADCMaster()
+        self.adc_m = ADCMaster(config_dictionary['ADCCHANNELMAP'])
+        # every pin goes through the GPIO manager
+        self.gpio_m = GM.GpioMaster(GPIO, config_dictionary, SM.CONFIG_FILE_PATH)
+        #GPIO pin to trigger the relay, high is OCV, low is SCC
+        self.ocv_pin = self.get_pin('OCVBRANCH')
+        self.gpio_m.set(self.ocv_pin, 0)
         
     # simple getter for config dictionary
     def get_config(self):
@@ -119,23 +168,44 @@ class TestingMaster:
         return int(self.test_config[key])
         
         
+    # scheduled test times of an EDS on a year day (minutes of the day)
+    def get_schedule_minutes(self, yday, eds_num):
+        schedule = self.test_config['SCHEDS'+str(eds_num)]
+        # if mod of the year day with schedule is zero, then day is correct
+        return [720 + float(pair[1]) * 60 for pair in schedule if yday % float(pair[0]) == 0]
+    
     # check time against schedule
     def check_time(self, dt, yday, solar_offset, eds_num):
-        sched_name = 'SCHEDS'+str(eds_num)
-        schedule = self.test_config[sched_name]
+        # convert current time to minutes and add solar time offset
+        dt_min = dt.tm_hour * 60 + dt.tm_min + dt.tm_sec / 60
+        dt_min_solar = dt_min + solar_offset
+        for schedule_min in self.get_schedule_minutes(yday, eds_num):
+            # if the time is within 30 seconds of scheduled time
+            if abs(dt_min_solar - schedule_min) < MIN_CHECK_THRESHOLD:
+                return True
+    
+    # check time against solar noon (within 30 seconds)
+    def check_noon(self, dt, solar_offset):
+        solar_time_min = dt.tm_hour * 60 + dt.tm_min + dt.tm_sec / 60 + solar_offset
+        return abs(720 - solar_time_min) < MIN_CHECK_THRESHOLD
+    
+    # minutes from dt until the next scheduled test of an EDS (same rules as check_time)
+    def get_next_trigger(self, dt, yday, solar_offset, eds_num):
+        schedule = self.test_config['SCHEDS'+str(eds_num)]
+        dt_min_solar = dt.tm_hour * 60 + dt.tm_min + dt.tm_sec / 60 + solar_offset
+        next_min = None
         for pair in schedule:
-            # if mod of the year day with schedule is zero, then day is correct
-            if yday % float(pair[0]) == 0:
-                # convert current time to minutes and add solar time offset
-                dt_min = dt.tm_hour * 60 + dt.tm_min + dt.tm_sec / 60
-                dt_min_solar = dt_min + solar_offset
-                
-                # check if current minute is close enough to schedule time offset
-                # calculate schedule time in minutes
-                schedule_min = 720 + float(pair[1]) * 60
-                # if the time is within 30 seconds of scheduled time
-                if abs(dt_min_solar - schedule_min) < MIN_CHECK_THRESHOLD:
-                    return True
+            period = float(pair[0])
+            schedule_min = 720 + float(pair[1]) * 60
+            # a matching day comes up at least once per period
+            for day in range(int(math.ceil(period)) + 1):
+                if (yday + day) % period == 0:
+                    minutes = day * 1440 + schedule_min - dt_min_solar
+                    if minutes > -MIN_CHECK_THRESHOLD:
+                        if next_min is None or minutes < next_min:
+                            next_min = minutes
+                        break
+        return next_min
     
     # check weather against parameters
     def check_temp(self, t_curr):
@@ -157,6 +227,12 @@ class TestingMaster:
         else:
             print("Humidity (", h_curr, " %) not within testing parameters. Will check again shortly.")
             return False
+    
+    # check one AM2315 read (humidity, temperature) against the testing window
+    def check_weather(self, w_read):
+        temp_pass = self.check_temp(w_read[1])
+        humid_pass = self.check_humid(w_read[0])
+        return temp_pass and humid_pass
 
     
     # Activating EDS to repel soiling/dust/etc
@@ -170,6 +246,20 @@ class TestingMaster:
         # run second half of test
         self.run_test_end(eds_num)
 
+    # Activating several EDS together (relays and supply budget checked by QueueMaster)
+    def run_test_group(self, eds_nums):
+        test_duration = self.get_param('testDurationSeconds')
+        eds_selects = [self.get_pin('EDS' + str(eds_num)) for eds_num in eds_nums]
+        # EDS activation relays ON together
+        self.gpio_m.apply(dict((eds_select, 1) for eds_select in eds_selects))
+        time.sleep(0.5)
+        # wait for test duration
+        time.sleep(test_duration)
+        # deactivate the EDS together
+        self.gpio_m.apply(dict((eds_select, 0) for eds_select in eds_selects))
+        self.gpio_m.apply(dict((eds_select, GM.RELEASED) for eds_select in eds_selects))
+        time.sleep(0.5)
+
     # Measure Voc and Isc of EDS
     def run_measure_EDS(self, eds_num):
         # Get pin for PV relay
@@ -177,35 +267,37 @@ class TestingMaster:
         
         # Setup GPIO pins to measure Voc and Isc of desired panel
         time.sleep(0.5)
-        GPIO.setup(pv_relay, GPIO.OUT)
-        GPIO.setup(25, GPIO.OUT)
+        self.gpio_m.apply({pv_relay: 0, self.ocv_pin: 0})
         time.sleep(0.5)
         
         # OCV READ
         # Switch the relay to read Voc
-        GPIO.output(25, GPIO.HIGH)
+        self.gpio_m.set(self.ocv_pin, 1)
         time.sleep(0.5)
         # Get reading
+        read_time = time.time()
         read_ocv = self.adc_m.get_ocv_PV()
+        ocv_code = self.adc_m.last_code
         # Switch relay back
         time.sleep(5)
         
         # SCC READ
         # Switch relay to read Isc
-        GPIO.output(25, GPIO.LOW)
+        self.gpio_m.set(self.ocv_pin, 0)
         time.sleep(2)
         # get reading
         read_scc = self.adc_m.get_scc_PV()
+        scc_code = self.adc_m.last_code
         # Default pin is LOW, no need to switch, just clean up
         time.sleep(2)
-        GPIO.cleanup(25)
+        self.gpio_m.release(self.ocv_pin)
         
         # Close EDS PV Relay
         time.sleep(2)
-        GPIO.cleanup(pv_relay)
+        self.gpio_m.release(pv_relay)
         time.sleep(2)
         
-        return [read_ocv, read_scc]
+        return RCM.PanelReading('EDS' + str(eds_num), read_ocv, read_scc, ocv_code, scc_code, read_time)
     
     
     def run_measure_CTRL(self, ctrl_num):
@@ -214,38 +306,128 @@ class TestingMaster:
         
         # Setup GPIO pins to measure Voc and Isc of desired panel
         time.sleep(0.5)
-        GPIO.setup(pv_relay, GPIO.OUT)
+        self.gpio_m.set(pv_relay, 0)
         time.sleep(0.5)
-        GPIO.setup(25, GPIO.OUT)
+        self.gpio_m.set(self.ocv_pin, 0)
         time.sleep(0.5)
         
         # OCV READ
         # Switch the relay to read Voc
-        GPIO.output(25, GPIO.HIGH)
+        self.gpio_m.set(self.ocv_pin, 1)
         time.sleep(1)
         # Get reading
+        read_time = time.time()
         read_ocv = self.adc_m.get_ocv_PV()
+        ocv_code = self.adc_m.last_code
         # Switch relay back
         time.sleep(1)
         
         # SCC READ
         # Switch relay to read Isc
-        GPIO.output(25, GPIO.LOW)
+        self.gpio_m.set(self.ocv_pin, 0)
         time.sleep(1)
         # get reading
         read_scc = self.adc_m.get_scc_PV()
+        scc_code = self.adc_m.last_code
         # Default pin is LOW, no need to switch, just clean up
         time.sleep(1)
-        GPIO.cleanup(25)
+        self.gpio_m.release(self.ocv_pin)
         
         # Close EDS PV Relay
         time.sleep(0.5)
-        GPIO.cleanup(pv_relay)
+        self.gpio_m.release(pv_relay)
         time.sleep(0.5)
         
-        return [read_ocv, read_scc]
+        return RCM.PanelReading('CTRL' + str(ctrl_num), read_ocv, read_scc, ocv_code, scc_code, read_time)
 
 
+    def get_scan_panels(self, panels):
+        # panels (e.g. 'EDS1', 'CTRL2') wired to their own ADC channel
+        channel_map = self.test_config['ADCCHANNELMAP']
+        return [panel for panel in panels if panel in channel_map]
+    
+    
+    def run_scan_panels(self, panels):
+        # Measure Voc and Isc of several panels wired to their own ADC channels
+        # returns ({panel: PanelReading}, {'OCV'/'SCC': (timestamp, burst length)})
+        channel_map = self.test_config['ADCCHANNELMAP']
+        channels = [int(channel_map[panel]) for panel in panels]
+        pv_relays = [self.get_pin(panel + 'PV') for panel in panels]
+        
+        # Close every panel relay at once
+        time.sleep(0.5)
+        closed = dict((pv_relay, 0) for pv_relay in pv_relays)
+        closed[self.ocv_pin] = 0
+        self.gpio_m.apply(closed)
+        time.sleep(0.5)
+        
+        # OCV SCAN
+        self.gpio_m.set(self.ocv_pin, 1)
+        time.sleep(1)
+        ocv_time, ocv_span, ocv_codes = self.adc_m.scan(channels)
+        
+        # SCC SCAN
+        self.gpio_m.set(self.ocv_pin, 0)
+        time.sleep(2)
+        scc_time, scc_span, scc_codes = self.adc_m.scan(channels)
+        self.gpio_m.release(self.ocv_pin)
+        
+        # Open panel relays
+        time.sleep(0.5)
+        self.gpio_m.apply(dict((pv_relay, GM.RELEASED) for pv_relay in pv_relays))
+        time.sleep(0.5)
+        
+        cal_m = self.adc_m.cal_master
+        temp = self.adc_m.temperature
+        readings = {}
+        for panel, channel, ocv_code, scc_code in zip(panels, channels, ocv_codes, scc_codes):
+            read_ocv = cal_m.convert(cal_m.resolve('PV_OCV', channel), ocv_code, temp)
+            read_scc = cal_m.convert(cal_m.resolve('PV_SCC', channel), scc_code, temp)
+            readings[panel] = RCM.PanelReading(panel, read_ocv, read_scc, ocv_code, scc_code, ocv_time)
+        return readings, {'OCV': (ocv_time, ocv_span), 'SCC': (scc_time, scc_span)}
+    
+    
+    def run_measure_panels(self, panels):
+        # Measure all panels, scanning the ones with their own channel in one burst
+        # and falling back to the relay multiplexer for the rest (in the given order)
+        scan_panels = self.get_scan_panels(panels)
+        readings = {}
+        scan_info = None
+        if scan_panels:
+            readings, scan_info = self.run_scan_panels(scan_panels)
+        for panel in panels:
+            if panel in readings:
+                continue
+            if panel.startswith('CTRL'):
+                readings[panel] = self.run_measure_CTRL(int(panel[4:]))
+            else:
+                readings[panel] = self.run_measure_EDS(int(panel[3:]))
+        return readings, scan_info
+    
+    
+    # Measure the 'before' values of a test group
+    # control readings still valid in the cache are reused, the other controls are measured
+    # together with the EDS of the group and cached
+    # returns ({control panel: cached ([ocv, scc], age, read time)}, {panel: PanelReading}, scan info)
+    def run_measure_group(self, eds_group, ctrl_ids, ctrl_cache, g_poa):
+        ctrl_cached = {}
+        for ctrl in ctrl_ids:
+            cached = ctrl_cache.get('CTRL' + str(ctrl), g_poa)
+            if cached is not None:
+                ctrl_cached['CTRL' + str(ctrl)] = cached
+        panels = ['CTRL' + str(ctrl) for ctrl in ctrl_ids if 'CTRL' + str(ctrl) not in ctrl_cached] + ['EDS' + str(eds) for eds in eds_group]
+        [readings, scan_info] = self.run_measure_panels(panels)
+        for panel, reading in readings.items():
+            if panel.startswith('CTRL'):
+                ctrl_cache.put(panel, g_poa, [reading.ocv, reading.scc], reading.stamp)
+        return ctrl_cached, readings, scan_info
+    
+    
+    # Measure every EDS and control at solar noon
+    def run_measure_noon(self, eds_ids, ctrl_ids):
+        return self.run_measure_panels(['EDS' + str(eds) for eds in eds_ids] + ['CTRL' + str(ctrl) for ctrl in ctrl_ids])
+    
+    
     def run_measure_BAT(self):
         # the battery will not require flipping relays/transistors (only ~14uW power lost)
         # get reading
@@ -258,8 +440,7 @@ class TestingMaster:
         eds_select = self.get_pin('EDS'+str(eds_num))
 
         # EDS activation relays ON
-        GPIO.setup(eds_select, GPIO.OUT)
-        GPIO.output(eds_select, 1)
+        self.gpio_m.set(eds_select, 1)
         # short delay between relay switching
         time.sleep(0.5)
 
@@ -270,10 +451,51 @@ class TestingMaster:
         #ps_relay = self.get_pin('POWER')
         # THIS MUST FOLLOW run_test_begin() TO FINISH TEST PROPERLY
         # deactivate the EDS
-        GPIO.output(eds_select, 0)
-        GPIO.cleanup(eds_select)
+        self.gpio_m.set(eds_select, 0)
+        self.gpio_m.release(eds_select)
         time.sleep(0.5)
 
+'''
+Control Cache Master Class:
+Functionality:
+1) Keeps the latest OCV and SCC of each control panel with the time and SP420 irradiance of the reading
+2) Hands a reading back only while it is younger than the max age and irradiance hasn't moved more than the set fraction
+'''
+
+class ControlCacheMaster:
+
+    def __init__(self, config_dictionary):
+        self.max_age = float(config_dictionary['ctrlCacheMaxSeconds'])
+        self.max_change = float(config_dictionary['ctrlCacheIrradianceChange'])
+        # {panel: (monotonic time, irradiance, [ocv, scc], read time)}
+        self.readings = {}
+
+    def get(self, panel, g_poa):
+        # returns ([ocv, scc], age in seconds, read time) or None if the panel has to be measured
+        entry = self.readings.get(panel)
+        if entry is None or g_poa is None:
+            return None
+        stamp, g_then, values, read_time = entry
+        age = time.monotonic() - stamp
+        if age > self.max_age:
+            return None
+        if abs(g_poa - g_then) > self.max_change * max(g_then, CACHE_MIN_IRRADIANCE):
+            return None
+        return list(values), age, read_time
+
+    def put(self, panel, g_poa, values, read_time=None):
+        # read time (epoch seconds) identifies the reading while it is reused, the age counts from it
+        # (a control read at the start of a group is put after the EDS of the group are measured)
+        if g_poa is None:
+            return
+        now = time.time()
+        if read_time is None:
+            read_time = now
+        self.readings[panel] = (time.monotonic() - max(0.0, now - read_time), g_poa, list(values), read_time)
+
+    def clear(self):
+        self.readings = {}
+
 '''
 Power Master Class:
 Functionality:
@@ -325,6 +547,15 @@ class PowerMaster:
         noct = 47 #This needs to be confirmed
         t_pan = amb_temp + ((noct - 20)*g_poa)/800
         return t_pan
+    
+    def fill_power(self, readings, temp):
+        # power of each PanelReading, -1 and flagged when the readings don't allow it (e.g. negative OCV)
+        for reading in readings:
+            try:
+                reading.power = self.get_power_out(reading.ocv, reading.scc, temp)
+            except (ValueError, ZeroDivisionError):
+                reading.power = -1
+                reading.flags |= RCM.FLAG_NO_POWER
 
 '''
 Performance Ratio Class:
@@ -347,4 +578,14 @@ class PerformanceRatio:
             PR = -1
         else:
             PR = power/((self.ptc*gpoa)/self.gstc)
-        return round(PR,2)
\ No newline at end of file
+        return round(PR,2)
+    
+    def fill_pr(self, readings, temp, gpoa):
+        # PR of each PanelReading (after fill_power), -1 and flagged without irradiance or power
+        for reading in readings:
+            if reading.flags & RCM.FLAG_NO_POWER:
+                reading.pr = -1
+            else:
+                reading.pr = self.get_pr(reading.ocv, reading.scc, temp, reading.power, gpoa)
+            if reading.pr == -1:
+                reading.flags |= RCM.FLAG_NO_PR
\ No newline at end of file
@@ -0,0 +1,158 @@
+'''
+=============================
+Title: RTC Time Service - EDS Field Control
+Started: October 2026
+=============================
+'''
+
+import time
+import calendar
+
+# RTC readings before this year are treated as a reset clock (PCF8523 lost its backup battery)
+MIN_VALID_YEAR = 2020
+MAX_VALID_YEAR = 2100
+
+# RTC only counts whole seconds, smaller differences are not drift
+RTC_RESOLUTION = 1.0
+
+# fault names reported by get_fault()
+FAULT_READ = "read failed"
+FAULT_INVALID = "invalid time"
+FAULT_LOST_POWER = "lost power"
+FAULT_JUMP = "time jump"
+
+
+def to_epoch(dt):
+    # RTC struct_time is local wall time, kept in UTC functions so DST never applies
+    return calendar.timegm(tuple(dt)[:6] + (0, 0, 0))
+
+
+def to_struct(epoch):
+    return time.gmtime(epoch)
+
+'''
+Time Master Class:
+Functionality:
+1) Reads the PCF8523 at startup and on a slow resync interval, everything in between is derived from time.monotonic
+2) Gives every caller a cheap wall time (struct_time, same as rtc.datetime) that never needs the I2C bus
+3) Measures drift between the RTC and the monotonic clock at every resync
+4) Detects RTC faults (failed reads, reset/invalid time, lost power, sudden jumps) and keeps time through them
+'''
+
+class TimeMaster:
+
+    def __init__(self, config_dictionary, rtc):
+        self.rtc = rtc
+        self.resync_seconds = float(config_dictionary['timeResyncSeconds'])
+        self.retry_seconds = float(config_dictionary['timeRetrySeconds'])
+        self.max_drift = float(config_dictionary['timeMaxDriftSeconds'])
+
+        # wall time = base_epoch + (monotonic - base_mono)
+        self.base_epoch = None
+        self.base_mono = None
+        self.source = None
+        self.next_sync = 0.0
+        self.last_sync = None
+        self.fault = None
+        # offset of an unconfirmed jump, adopted if the next read agrees
+        self.pending_jump = None
+        self.drift_seconds = 0.0
+        self.drift_ppm = None
+        self.sync_count = 0
+        self.fault_count = 0
+
+        self.resync()
+        if self.base_epoch is None:
+            # no usable RTC at startup, fall back to the system clock until it answers
+            self.set_base(time.time(), time.monotonic(), 'system')
+
+    def set_base(self, epoch, mono, source):
+        self.base_epoch = float(epoch)
+        self.base_mono = mono
+        self.source = source
+
+    def get_epoch(self):
+        if time.monotonic() >= self.next_sync:
+            self.resync()
+        return self.base_epoch + (time.monotonic() - self.base_mono)
+
+    def now(self):
+        # current wall time as a struct_time (replaces rtc.datetime)
+        return to_struct(self.get_epoch())
+
+    def get_fault(self):
+        return self.fault
+
+    def set_fault(self, fault):
+        if fault != self.fault:
+            self.fault_count += 1
+        self.fault = fault
+        # faulty RTC is asked again sooner
+        self.next_sync = time.monotonic() + self.retry_seconds
+
+    def resync(self):
+        # one RTC read, compare with the monotonic estimate and re-base if needed
+        mono = time.monotonic()
+        try:
+            dt = self.rtc.datetime
+            lost_power = getattr(self.rtc, 'lost_power', False)
+        except Exception:
+            self.set_fault(FAULT_READ)
+            return
+        try:
+            rtc_epoch = to_epoch(dt)
+        except (TypeError, ValueError, OverflowError):
+            self.set_fault(FAULT_INVALID)
+            return
+        if not MIN_VALID_YEAR <= dt.tm_year <= MAX_VALID_YEAR:
+            self.set_fault(FAULT_INVALID)
+            return
+        if lost_power:
+            self.set_fault(FAULT_LOST_POWER)
+            return
+
+        self.sync_count += 1
+        self.next_sync = mono + self.resync_seconds
+        if self.base_epoch is None or self.source == 'system':
+            # first good read
+            self.set_base(rtc_epoch, mono, 'rtc')
+            self.last_sync = (rtc_epoch, mono)
+            self.fault = None
+            self.pending_jump = None
+            return
+
+        drift = rtc_epoch - (self.base_epoch + (mono - self.base_mono))
+        if abs(drift) > self.max_drift:
+            # a jump is only believed once two reads agree on it
+            if self.pending_jump is not None and abs(drift - self.pending_jump) <= self.max_drift:
+                self.set_base(rtc_epoch, mono, 'rtc')
+                self.last_sync = (rtc_epoch, mono)
+                self.pending_jump = None
+                self.fault = None
+                self.next_sync = mono + self.resync_seconds
+            else:
+                self.pending_jump = drift
+                self.drift_seconds = drift
+                self.set_fault(FAULT_JUMP)
+            return
+
+        self.pending_jump = None
+        self.fault = None
+        self.drift_seconds = drift
+        if mono > self.base_mono:
+            # drift rate since the clock was last set from the RTC
+            self.drift_ppm = drift / (mono - self.base_mono) * 1e6
+        if abs(drift) >= RTC_RESOLUTION:
+            self.set_base(rtc_epoch, mono, 'rtc')
+        self.last_sync = (rtc_epoch, mono)
+
+    def get_status(self):
+        return {
+            'source': self.source,
+            'fault': self.fault,
+            'drift_seconds': self.drift_seconds,
+            'drift_ppm': self.drift_ppm,
+            'last_sync': time.strftime('%Y-%m-%d %H:%M:%S', to_struct(self.last_sync[0])) if self.last_sync else None,
+            'sync_count': self.sync_count,
+            'fault_count': self.fault_count,
+            }
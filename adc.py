@@ -1,19 +1,522 @@
-import busio
+'''
+=============================
+Title: ADC Streaming Diagnostics - EDS Field Control
+Started: October 2026
+=============================
+'''
+
+'''
+Diagnostic tool for the MCP3008. Streams raw codes of chosen channels as fast as SPI
+allows into a buffered binary file, then reports the achieved sample rate, sampling
+jitter and (with NumPy) the spectrum, noise floor and spurs of every channel.
+Used to find EDS high voltage coupling and relay chatter in the field and to check a
+unit's ADC before deployment. Analysis runs on any machine, only capture needs the Pi.
+
+python3 adc.py monitor --channel 0                      (old behaviour, voltage every 0.5 s)
+python3 adc.py stream --channels 0 1 --seconds 10 --output capture.adc --hold EDS1=1
+python3 adc.py analyze capture.adc --json report.json
+'''
+
+import os
+import gc
+import sys
+import json
+import math
 import time
-import RPi.GPIO as GPIO
-import digitalio
-import board
-import adafruit_mcp3xxx.mcp3008 as MCP
-from adafruit_mcp3xxx.analog_in import AnalogIn
-spi = busio.SPI(clock=board.SCK, MISO=board.MISO, MOSI=board.MOSI)
-cs = digitalio.DigitalInOut(board.D6)
-mcp = MCP.MCP3008(spi, cs)
-GPIO.setup(25, GPIO.OUT)
-GPIO.output(25, GPIO.HIGH)
-channel = AnalogIn(mcp, MCP.P0)
-print(channel)
-
-
-while True:
-    print('ADC Voltage: ' + str(channel.voltage) + 'V')
-    time.sleep(0.5) 
\ No newline at end of file
+import queue
+import struct
+import argparse
+import threading
+
+import StaticManager as SM
+import GpioManager as GM
+
+# numpy is only needed for the spectrum analysis
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# adc constants (same as TestingManager)
+VREF = 3.3
+STEPS = 1023
+
+# capture file: header, channel numbers, then one row per scan of all channels
+# header: magic, version, channel count, steps, vref, start epoch
+# row: nanoseconds since the first row (monotonic), one raw code per channel
+FILE_MAGIC = b'EDSADC\x00\x01'
+FILE_VERSION = 1
+HEADER_STRUCT = struct.Struct('<8sHHHdd')
+
+# rows per write buffer, buffers are handed to a writer thread so disk writes never stall sampling
+DEFAULT_BUFFER_ROWS = 4096
+WRITE_BUFFERS = 4
+
+# analysis defaults
+DEFAULT_FFT_SIZE = 8192
+# spurs must stand this far above the noise floor (dB)
+DEFAULT_SPUR_DB = 10
+MAX_SPURS = 8
+# samples this far from the channel median count as spikes (LSB)
+DEFAULT_SPIKE_LSB = 8
+# intervals this many times the median count as gaps in the capture
+GAP_FACTOR = 2
+
+
+def get_row_struct(channel_count):
+    return struct.Struct('<Q' + 'H' * channel_count)
+
+
+def write_header(f, channels, start_epoch):
+    f.write(HEADER_STRUCT.pack(FILE_MAGIC, FILE_VERSION, len(channels), STEPS, VREF, start_epoch))
+    f.write(bytes(channels))
+
+
+def read_header(path):
+    # capture file layout, row count is taken from the file size (a cut off last row is ignored)
+    with open(path, 'rb') as f:
+        fixed = f.read(HEADER_STRUCT.size)
+        if len(fixed) < HEADER_STRUCT.size:
+            raise ValueError(path + " is not an ADC capture file")
+        magic, version, channel_count, steps, vref, start_epoch = HEADER_STRUCT.unpack(fixed)
+        if magic != FILE_MAGIC or version != FILE_VERSION:
+            raise ValueError(path + " is not an ADC capture file")
+        channels = list(f.read(channel_count))
+    header_size = HEADER_STRUCT.size + channel_count
+    row_size = get_row_struct(channel_count).size
+    return {
+        'channels': channels,
+        'steps': steps,
+        'vref': vref,
+        'start_epoch': start_epoch,
+        'header_size': header_size,
+        'row_size': row_size,
+        'rows': (os.path.getsize(path) - header_size) // row_size,
+        }
+
+
+def iter_chunks(path, chunk_rows=DEFAULT_BUFFER_ROWS):
+    # [(seconds since the first row, (codes...)), ...] in chunks, memory stays bounded
+    header = read_header(path)
+    row_struct = get_row_struct(len(header['channels']))
+    remaining = header['rows']
+    with open(path, 'rb') as f:
+        f.seek(header['header_size'])
+        while remaining > 0:
+            count = min(chunk_rows, remaining)
+            block = f.read(count * header['row_size'])
+            remaining -= count
+            yield [(row[0] / 1e9, row[1:]) for row in row_struct.iter_unpack(block)]
+
+
+def load_rows(path):
+    # whole capture as a numpy memmap (times in ns, codes as rows x channels)
+    header = read_header(path)
+    dtype = np.dtype([('t', '<u8'), ('codes', '<u2', (len(header['channels']),))])
+    rows = np.memmap(path, dtype=dtype, mode='r', offset=header['header_size'], shape=(header['rows'],))
+    return header, rows
+
+
+def open_mcp(cs_name, baudrate=None):
+    # Pi libraries are imported here so the analysis runs on a desktop
+    import busio
+    import digitalio
+    import board
+    import adafruit_mcp3xxx.mcp3008 as MCP
+    spi = busio.SPI(clock=board.SCK, MISO=board.MISO, MOSI=board.MOSI)
+    cs = digitalio.DigitalInOut(getattr(board, cs_name))
+    if baudrate is None:
+        return MCP.MCP3008(spi, cs)
+    try:
+        return MCP.MCP3008(spi, cs, baudrate=baudrate)
+    except TypeError:
+        print("adafruit_mcp3xxx is too old to set the SPI clock, using its default", file=sys.stderr)
+        return MCP.MCP3008(spi, cs)
+
+
+def load_config():
+    # the unit's own config.json (same as MasterManager), pins may be remapped per unit
+    return SM.StaticMaster().get_config()
+
+
+def open_gpio(config):
+    # transition counts aren't saved, the running unit owns gpio_counts.json
+    import RPi.GPIO as GPIO
+    return GM.GpioMaster(GPIO, config, None)
+
+
+def parse_holds(holds, config):
+    # ['EDS1=1', '25=0'] -> {pin: level}, names are pins of the unit config
+    pins = {}
+    for hold in holds:
+        name, _, level = hold.partition('=')
+        if name.isdigit():
+            pin = int(name)
+        elif name in config:
+            pin = int(config[name])
+        else:
+            raise ValueError("unknown pin " + name)
+        pins[pin] = 1 if level.strip() in ['1', 'HIGH', 'high'] else 0
+    return pins
+
+'''
+Stream Master Class:
+Functionality:
+1) Reads the chosen MCP3008 channels back to back in a tight loop (one row per scan)
+2) Packs rows into preallocated buffers, a writer thread puts full buffers on disk
+3) Keeps track of buffers the writer could not keep up with
+'''
+
+class StreamMaster:
+
+    def __init__(self, mcp, channels, path, buffer_rows=DEFAULT_BUFFER_ROWS):
+        self.mcp = mcp
+        self.channels = [int(channel) for channel in channels]
+        self.path = path
+        self.buffer_rows = int(buffer_rows)
+        self.row_struct = get_row_struct(len(self.channels))
+        self.buffer_size = self.row_struct.size * self.buffer_rows
+
+        # full buffers to write as (buffer, bytes), None ends the writer
+        self.full = queue.Queue()
+        self.free = queue.Queue()
+        for i in range(WRITE_BUFFERS):
+            self.free.put(bytearray(self.buffer_size))
+        self.extra_buffers = 0
+        self.max_queued = 0
+        self.write_error = None
+
+    def writer(self, f):
+        while True:
+            item = self.full.get()
+            if item is None:
+                return
+            buf, size = item
+            try:
+                f.write(memoryview(buf)[:size])
+            except OSError as e:
+                self.write_error = e
+            self.free.put(buf)
+
+    def get_buffer(self):
+        try:
+            return self.free.get_nowait()
+        except queue.Empty:
+            # writer is behind, keep sampling into a new buffer
+            self.extra_buffers += 1
+            return bytearray(self.buffer_size)
+
+    def hand_over(self, buf, rows):
+        self.full.put((buf, rows * self.row_struct.size))
+        self.max_queued = max(self.max_queued, self.full.qsize())
+
+    def run(self, seconds):
+        # capture for seconds (0 = until Ctrl-C), returns the capture summary
+        read = self.mcp.read
+        channels = self.channels
+        pack_into = self.row_struct.pack_into
+        row_size = self.row_struct.size
+        buffer_rows = self.buffer_rows
+        clock = time.perf_counter_ns
+        end_ns = int(seconds * 1e9) if seconds > 0 else None
+
+        with open(self.path, 'wb') as f:
+            write_header(f, channels, time.time())
+            writer_thread = threading.Thread(target=self.writer, args=(f,), daemon=True)
+            writer_thread.start()
+
+            buf = self.get_buffer()
+            index = 0
+            rows = 0
+            # collector pauses are the biggest source of jitter in the loop
+            gc.disable()
+            start_ns = clock()
+            try:
+                while True:
+                    t = clock() - start_ns
+                    pack_into(buf, index * row_size, t, *[read(channel) for channel in channels])
+                    index += 1
+                    if index == buffer_rows:
+                        self.hand_over(buf, index)
+                        rows += index
+                        buf = self.get_buffer()
+                        index = 0
+                    if end_ns is not None and t >= end_ns:
+                        break
+            except KeyboardInterrupt:
+                pass
+            finally:
+                elapsed = (clock() - start_ns) / 1e9
+                gc.enable()
+                if index:
+                    self.hand_over(buf, index)
+                    rows += index
+                self.full.put(None)
+                writer_thread.join()
+
+        if self.write_error is not None:
+            raise self.write_error
+        return {
+            'path': self.path,
+            'channels': channels,
+            'rows': rows,
+            'seconds': elapsed,
+            'bytes': os.path.getsize(self.path),
+            'extra_buffers': self.extra_buffers,
+            'max_queued_buffers': self.max_queued,
+            }
+
+
+def analyze_timing(path):
+    # achieved rate and jitter of the row interval
+    header = read_header(path)
+    channel_count = len(header['channels'])
+    result = {'rows': header['rows'], 'channels': header['channels']}
+    if header['rows'] < 2:
+        return result
+
+    if np is not None:
+        rows = load_rows(path)[1]
+        t = rows['t']
+        intervals = np.diff(t).astype(float) / 1e9
+        span = float(t[-1] - t[0]) / 1e9
+        median = float(np.median(intervals))
+        result.update({
+            'interval_mean_us': float(intervals.mean()) * 1e6,
+            'jitter_std_us': float(intervals.std()) * 1e6,
+            'interval_min_us': float(intervals.min()) * 1e6,
+            'interval_max_us': float(intervals.max()) * 1e6,
+            'interval_p50_us': median * 1e6,
+            'interval_p99_us': float(np.percentile(intervals, 99)) * 1e6,
+            'interval_p999_us': float(np.percentile(intervals, 99.9)) * 1e6,
+            'gaps': int((intervals > GAP_FACTOR * median).sum()),
+            })
+    else:
+        # running mean/variance over the chunks (Welford)
+        count = 0
+        mean = 0.0
+        m2 = 0.0
+        low = None
+        high = None
+        first = None
+        last = None
+        for chunk in iter_chunks(path):
+            for t, codes in chunk:
+                if last is not None:
+                    interval = t - last
+                    count += 1
+                    delta = interval - mean
+                    mean += delta / count
+                    m2 += delta * (interval - mean)
+                    low = interval if low is None else min(low, interval)
+                    high = interval if high is None else max(high, interval)
+                else:
+                    first = t
+                last = t
+        span = last - first
+        result.update({
+            'interval_mean_us': mean * 1e6,
+            'jitter_std_us': math.sqrt(m2 / count) * 1e6,
+            'interval_min_us': low * 1e6,
+            'interval_max_us': high * 1e6,
+            })
+
+    result['seconds'] = span
+    result['rows_per_second'] = (header['rows'] - 1) / span if span > 0 else None
+    result['samples_per_second'] = result['rows_per_second'] * channel_count if span > 0 else None
+    return result
+
+
+def analyze_channels(path, fft_size=DEFAULT_FFT_SIZE, spur_db=DEFAULT_SPUR_DB, spike_lsb=DEFAULT_SPIKE_LSB):
+    # per channel level, noise and spectrum (numpy only)
+    header, rows = load_rows(path)
+    lsb = header['vref'] / header['steps']
+    results = {}
+    if header['rows'] < 16:
+        return results
+    t = rows['t'].astype(float) / 1e9
+    dt = (t[-1] - t[0]) / (len(t) - 1)
+    fs = 1 / dt
+
+    # largest power of two segment that fits, Welch average with half overlap
+    size = 1 << int(math.log2(min(fft_size, len(t))))
+    step = size // 2
+    window = np.hanning(size)
+    scale = fs * (window ** 2).sum()
+    freqs = np.fft.rfftfreq(size, dt)
+    df = freqs[1]
+
+    for index, channel in enumerate(header['channels']):
+        codes = rows['codes'][:, index]
+        median = float(np.median(codes))
+        std = float(codes.std())
+        result = {
+            'mean_code': float(codes.mean()),
+            'mean_volts': float(codes.mean()) * lsb,
+            'min_code': int(codes.min()),
+            'max_code': int(codes.max()),
+            'peak_to_peak_lsb': int(codes.max()) - int(codes.min()),
+            'noise_rms_lsb': std,
+            'noise_rms_mv': std * lsb * 1000,
+            # ideal converter: LSB/sqrt(12)
+            'quantization_rms_lsb': 1 / math.sqrt(12),
+            'spikes': int((np.abs(codes.astype(float) - median) > spike_lsb).sum()),
+            }
+
+        # rows are not evenly spaced, each segment is resampled onto the mean interval
+        psd = np.zeros(len(freqs))
+        segments = 0
+        for start in range(0, len(t) - size + 1, step):
+            seg_t = t[start:start + size]
+            grid = seg_t[0] + np.arange(size) * dt
+            volts = np.interp(grid, seg_t, codes[start:start + size].astype(float)) * lsb
+            volts -= volts.mean()
+            psd += np.abs(np.fft.rfft(volts * window)) ** 2
+            segments += 1
+        psd = psd / segments / scale
+        psd[1:-1] *= 2
+
+        # median of an averaged chi-square spectrum sits below its mean, ln 2 corrects it
+        floor = float(np.median(psd[2:])) / math.log(2)
+        result['noise_floor_uv_per_rthz'] = math.sqrt(floor) * 1e6
+        result['noise_floor_total_mv'] = math.sqrt(floor * fs / 2) * 1000
+
+        # local maxima above the floor, DC and the window leakage next to it skipped
+        threshold = floor * 10 ** (spur_db / 10)
+        spurs = []
+        for k in range(2, len(psd) - 1):
+            if psd[k] > threshold and psd[k] > psd[k - 1] and psd[k] >= psd[k + 1]:
+                power = (psd[max(0, k - 2):k + 3].sum() - 5 * floor) * df
+                spurs.append({
+                    'frequency_hz': float(freqs[k]),
+                    'rms_mv': math.sqrt(max(0.0, power)) * 1000,
+                    'above_floor_db': 10 * math.log10(psd[k] / floor),
+                    })
+        spurs.sort(key=lambda spur: spur['above_floor_db'], reverse=True)
+        result['spurs'] = spurs[:MAX_SPURS]
+        result['fft_size'] = size
+        result['fft_segments'] = segments
+        result['resolution_hz'] = float(df)
+        results[str(channel)] = result
+    return results
+
+
+def analyze(path, fft_size=DEFAULT_FFT_SIZE, spur_db=DEFAULT_SPUR_DB, spike_lsb=DEFAULT_SPIKE_LSB):
+    report = {'timing': analyze_timing(path)}
+    if np is not None:
+        report['channels'] = analyze_channels(path, fft_size, spur_db, spike_lsb)
+    return report
+
+
+def print_report(report):
+    timing = report['timing']
+    print("Channels " + ', '.join(str(channel) for channel in timing['channels']) + ", " + str(timing['rows']) + " scans")
+    if timing.get('samples_per_second') is None:
+        print("Not enough samples to analyze")
+        return
+    print("Rate: " + str(round(timing['samples_per_second'])) + " samples/s (" + str(round(timing['rows_per_second']))
+          + " scans/s over " + str(round(timing['seconds'], 2)) + " s)")
+    line = ("Interval: mean " + str(round(timing['interval_mean_us'], 1)) + " us, jitter (std) "
+            + str(round(timing['jitter_std_us'], 1)) + " us, min " + str(round(timing['interval_min_us'], 1))
+            + " us, max " + str(round(timing['interval_max_us'], 1)) + " us")
+    print(line)
+    if 'interval_p99_us' in timing:
+        print("          p50 " + str(round(timing['interval_p50_us'], 1)) + " us, p99 " + str(round(timing['interval_p99_us'], 1))
+              + " us, p99.9 " + str(round(timing['interval_p999_us'], 1)) + " us, " + str(timing['gaps']) + " gaps")
+
+    if 'channels' not in report:
+        print("NumPy not installed, spectrum and noise analysis skipped")
+        return
+    for channel, result in report['channels'].items():
+        print("")
+        print("Channel " + channel + ": mean " + str(round(result['mean_volts'], 4)) + " V (code "
+              + str(round(result['mean_code'], 1)) + "), range " + str(result['min_code']) + "-" + str(result['max_code'])
+              + ", " + str(result['spikes']) + " spikes")
+        print("  Noise " + str(round(result['noise_rms_lsb'], 2)) + " LSB rms (" + str(round(result['noise_rms_mv'], 2))
+              + " mV, ideal " + str(round(result['quantization_rms_lsb'], 2)) + " LSB), floor "
+              + str(round(result['noise_floor_uv_per_rthz'], 1)) + " uV/rtHz")
+        print("  FFT " + str(result['fft_size']) + " x " + str(result['fft_segments']) + ", "
+              + str(round(result['resolution_hz'], 2)) + " Hz bins")
+        for spur in result['spurs']:
+            print("  Spur " + str(round(spur['frequency_hz'], 1)).rjust(9) + " Hz  " + str(round(spur['rms_mv'], 2)).rjust(8)
+                  + " mV rms  " + str(round(spur['above_floor_db'], 1)).rjust(5) + " dB above floor")
+
+
+def monitor(channel, cs_name):
+    # original adc.py loop: OCV branch on, channel voltage every 0.5 s
+    from adafruit_mcp3xxx.analog_in import AnalogIn
+    config = load_config()
+    mcp = open_mcp(cs_name)
+    gpio_m = open_gpio(config)
+    try:
+        gpio_m.set(int(config['OCVBRANCH']), 1)
+        analog = AnalogIn(mcp, channel)
+        while True:
+            print('ADC Voltage: ' + str(analog.voltage) + 'V')
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        gpio_m.safe_state()
+
+
+def add_analysis_arguments(parser):
+    parser.add_argument('--fft-size', type=int, default=DEFAULT_FFT_SIZE, help="samples per FFT segment")
+    parser.add_argument('--spur-db', type=float, default=DEFAULT_SPUR_DB, help="dB above the noise floor to report a spur")
+    parser.add_argument('--spike-lsb', type=float, default=DEFAULT_SPIKE_LSB, help="LSB from the median to count a spike")
+    parser.add_argument('--json', help="write the report to this .json")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="MCP3008 monitor, high rate capture and noise analysis.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    monitor_parser = commands.add_parser('monitor', help="print one channel voltage every 0.5 s")
+    monitor_parser.add_argument('--channel', type=int, default=0)
+    monitor_parser.add_argument('--cs', default='D6', help="board pin name of the MCP3008 chip select (D6 as wired, CE0 for the hardware chip select)")
+    stream_parser = commands.add_parser('stream', help="capture channels as fast as SPI allows, then analyze")
+    stream_parser.add_argument('--channels', type=int, nargs='+', default=[0])
+    stream_parser.add_argument('--seconds', type=float, default=10, help="capture length (0 = until Ctrl-C)")
+    stream_parser.add_argument('--output', default='capture.adc')
+    stream_parser.add_argument('--cs', default='D6', help="board pin name of the MCP3008 chip select (D6 as wired, CE0 for the hardware chip select)")
+    stream_parser.add_argument('--baudrate', type=int, help="SPI clock (default: library default)")
+    stream_parser.add_argument('--buffer-rows', type=int, default=DEFAULT_BUFFER_ROWS)
+    stream_parser.add_argument('--hold', nargs='*', default=['OCVBRANCH=1'],
+                               help="pins held during the capture, config names or numbers, e.g. EDS1=1 25=1")
+    stream_parser.add_argument('--no-analyze', action='store_true')
+    add_analysis_arguments(stream_parser)
+    analyze_parser = commands.add_parser('analyze', help="analyze a capture file")
+    analyze_parser.add_argument('capture')
+    add_analysis_arguments(analyze_parser)
+    args = parser.parse_args()
+
+    if args.command == 'monitor':
+        monitor(args.channel, args.cs)
+        sys.exit(0)
+
+    if args.command == 'stream':
+        config = load_config()
+        holds = parse_holds(args.hold, config)
+        mcp = open_mcp(args.cs, args.baudrate)
+        gpio_m = open_gpio(config)
+        try:
+            gpio_m.apply(holds)
+            stream_master = StreamMaster(mcp, args.channels, args.output, args.buffer_rows)
+            summary = stream_master.run(args.seconds)
+        finally:
+            gpio_m.safe_state()
+        print("Captured " + str(summary['rows']) + " scans in " + str(round(summary['seconds'], 2)) + " s to "
+              + summary['path'] + " (" + str(summary['bytes']) + " bytes)")
+        if summary['extra_buffers']:
+            print("Writer fell behind: " + str(summary['extra_buffers']) + " extra buffers, up to "
+                  + str(summary['max_queued_buffers']) + " queued")
+        if args.no_analyze:
+            sys.exit(0)
+        capture = args.output
+    else:
+        capture = args.capture
+
+    report = analyze(capture, args.fft_size, args.spur_db, args.spike_lsb)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as jf:
+            json.dump(report, jf, indent=1)
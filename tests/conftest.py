@@ -0,0 +1,76 @@
+import os
+import sys
+import json
+import calendar
+
+import pytest
+
+# the modules live in the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import SimHardware as SH
+
+# simulated morning: scheduled tests at 9, 10 and 11, controls 1 and 3 (CTRL3 on the CTRL2 relay)
+SIM_START = calendar.timegm((2026, 6, 10, 6, 0, 0, 0, 0, 0))
+SIM_SECONDS = 6 * 3600
+SIM_CONFIG = {'CTRLIDS': [1, 3], 'CTRL3PV': 23}
+
+# calibration file with two bad channels, the unit has to keep running on their nominal tables
+SIM_CALIBRATION = {
+    'version': 'v2',
+    'channels': {
+        'PV_SCC': {'coeffs': []},
+        'BAT': 5,
+        },
+    }
+
+
+class SimRun:
+
+    def __init__(self, hw):
+        self.hw = hw
+        self.spool_path = hw.config['spoolPath']
+        self.records = []
+        self.logs = []
+        # last status snapshot the loop published
+        self.status = None
+
+    def get_log(self, phrase):
+        return [logged for logged in self.logs if phrase in logged]
+
+
+@pytest.fixture(scope='session')
+def sim_run(tmp_path_factory):
+    # one MasterManager run on simulated hardware, shared by the tests that only read its output
+    workdir = str(tmp_path_factory.mktemp('sim'))
+    hw = SH.SimHardware(workdir, SIM_START, config_overrides=SIM_CONFIG)
+    with open(os.path.join(hw.config_dir, 'calibration.json'), 'w') as cf:
+        json.dump(SIM_CALIBRATION, cf)
+    run = SimRun(hw)
+    hw.record_listeners.append(lambda name, row: run.records.append((name, list(row))))
+    hw.log_listeners.append(lambda dt, phrase: run.logs.append(phrase))
+    hw.status_listeners.append(lambda snapshot: setattr(run, 'status', snapshot))
+    hw.install()
+    try:
+        hw.run_master(SIM_SECONDS)
+    finally:
+        hw.uninstall()
+    return run
+
+
+@pytest.fixture
+def make_sim_hw(tmp_path):
+    # simulated hardware installed for a test that drives the managers directly, mid-morning
+    installed = []
+
+    def make(config_overrides=None, start_epoch=SIM_START + 4 * 3600):
+        hw = SH.SimHardware(str(tmp_path), start_epoch, config_overrides=config_overrides)
+        hw.install()
+        installed.append(hw)
+        return hw
+
+    yield make
+    for hw in installed:
+        hw.uninstall()
@@ -0,0 +1,92 @@
+import math
+
+import pytest
+
+import adc
+import StaticManager as SM
+
+
+class FakeMCP:
+    # channel n reads n * 100 plus a count of the reads
+    def __init__(self):
+        self.reads = 0
+
+    def read(self, channel):
+        self.reads += 1
+        return channel * 100 + self.reads % 4
+
+
+def write_capture(path, channels, rows):
+    # rows: [(ns, codes...)]
+    row_struct = adc.get_row_struct(len(channels))
+    with open(path, 'wb') as f:
+        adc.write_header(f, channels, 1781085600.0)
+        for row in rows:
+            f.write(row_struct.pack(*row))
+
+
+def test_stream_capture_reads_back(tmp_path):
+    path = str(tmp_path / 'capture.adc')
+    stream_master = adc.StreamMaster(FakeMCP(), [0, 3], path, buffer_rows=64)
+    summary = stream_master.run(0.05)
+    header = adc.read_header(path)
+    assert header['channels'] == [0, 3]
+    assert header['rows'] == summary['rows'] > 64
+    rows = [row for chunk in adc.iter_chunks(path, 50) for row in chunk]
+    assert len(rows) == summary['rows']
+    assert all(codes[0] < 4 and 300 <= codes[1] < 304 for t, codes in rows)
+    assert [t for t, codes in rows] == sorted(t for t, codes in rows)
+
+
+def test_cut_row_ignored_and_bad_file(tmp_path):
+    path = str(tmp_path / 'capture.adc')
+    write_capture(path, [1], [(i * 1000, 512) for i in range(10)])
+    with open(path, 'ab') as f:
+        f.write(b'\x00\x01\x02')
+    assert adc.read_header(path)['rows'] == 10
+    with open(str(tmp_path / 'other.adc'), 'wb') as f:
+        f.write(b'EDSIDX\x00\x02' + bytes(40))
+    with pytest.raises(ValueError):
+        adc.read_header(str(tmp_path / 'other.adc'))
+
+
+def test_timing_with_and_without_numpy(tmp_path, monkeypatch):
+    # 10 kHz scans with one 1 ms gap
+    times = [i * 100000 for i in range(1000)] + [1000 * 100000 + 1000000]
+    path = str(tmp_path / 'capture.adc')
+    write_capture(path, [0, 1], [(t, 1, 2) for t in times])
+    timing = adc.analyze_timing(path)
+    assert timing['gaps'] == 1
+    assert timing['interval_p50_us'] == pytest.approx(100)
+    assert timing['samples_per_second'] == pytest.approx(2 * 1000 / (times[-1] / 1e9))
+    monkeypatch.setattr(adc, 'np', None)
+    plain = adc.analyze_timing(path)
+    for key in ['interval_mean_us', 'jitter_std_us', 'interval_min_us', 'interval_max_us', 'rows_per_second']:
+        assert plain[key] == pytest.approx(timing[key])
+    assert 'channels' not in adc.analyze(path)
+
+
+def test_spur_found_at_its_frequency(tmp_path):
+    # 10 kHz scans, 50 LSB of 600 Hz on channel 0 (e.g. EDS supply coupling), channel 1 flat
+    rows = []
+    for i in range(16384):
+        code = 512 + round(50 * math.sin(2 * math.pi * 600 * i / 10000))
+        rows.append((i * 100000, code, 200))
+    path = str(tmp_path / 'capture.adc')
+    write_capture(path, [0, 1], rows)
+    channels = adc.analyze(path)['channels']
+    spurs = channels['0']['spurs']
+    assert spurs
+    assert spurs[0]['frequency_hz'] == pytest.approx(600, abs=channels['0']['resolution_hz'])
+    # 50 LSB peak is 35 LSB rms
+    assert spurs[0]['rms_mv'] == pytest.approx(50 / math.sqrt(2) * adc.VREF / adc.STEPS * 1000, rel=0.1)
+    assert channels['1']['spurs'] == []
+    assert channels['1']['peak_to_peak_lsb'] == 0
+    assert channels['1']['mean_volts'] == pytest.approx(200 * adc.VREF / adc.STEPS)
+
+
+def test_holds_use_unit_pins():
+    config = dict(SM.DEFAULT_CONFIG_PARAM)
+    assert adc.parse_holds(['EDS1=1', '25=0', 'OCVBRANCH=HIGH'], config) == {config['EDS1']: 1, 25: 0, config['OCVBRANCH']: 1}
+    with pytest.raises(ValueError):
+        adc.parse_holds(['NOPE=1'], config)
@@ -0,0 +1,50 @@
+import json
+
+import CalibrationManager as CM
+
+
+def write_calibration(path, calibration):
+    with open(str(path / CM.CALIBRATION_FILE_NAME), 'w') as cf:
+        json.dump(calibration, cf)
+
+
+def get_nominal_table(channel):
+    return CM.compile_table([0.0, CM.NOMINAL_FACTORS[channel] * CM.STEPS])
+
+
+def test_no_file_is_nominal(tmp_path):
+    cal_master = CM.CalibrationMaster(str(tmp_path))
+    assert cal_master.get_version() == CM.NOMINAL_VERSION
+    assert cal_master.tables['PV_OCV'] == get_nominal_table('PV_OCV')
+
+
+def test_bad_channel_keeps_nominal_table(tmp_path):
+    write_calibration(tmp_path, {'version': 'v2', 'channels': {
+        'PV_OCV': {'coeffs': [0.0, 34.0]},
+        'PV_SCC': {'points': 'garbage'},
+        'BAT': {'coeffs': []},
+        }})
+    cal_master = CM.CalibrationMaster(str(tmp_path))
+    # the good channel is applied, the bad ones are converted with the nominal factors
+    assert cal_master.convert('PV_OCV', 1023) == 34.0
+    assert cal_master.tables['PV_SCC'] == get_nominal_table('PV_SCC')
+    assert cal_master.tables['BAT'] == get_nominal_table('BAT')
+    # and the version says so
+    assert cal_master.get_version().startswith('v2-')
+    assert cal_master.get_version().endswith('-nominal:BAT,PV_SCC')
+
+
+def test_bad_file_is_nominal(tmp_path):
+    write_calibration(tmp_path, {'channels': ['PV_OCV']})
+    cal_master = CM.CalibrationMaster(str(tmp_path))
+    assert cal_master.get_version() == CM.NOMINAL_VERSION
+    assert cal_master.tables['PV_OCV'] == get_nominal_table('PV_OCV')
+
+
+def test_unit_runs_on_bad_calibration(sim_run):
+    # every scheduled test ran and recorded the nominal fallback
+    ended = sim_run.get_log("Ended automated scheduled test")
+    assert len(ended) == len([record for record in sim_run.records if record[0] == 'testing_data.csv'])
+    assert ended
+    for phrase in ended:
+        assert "-nominal:BAT,PV_SCC" in phrase
@@ -0,0 +1,31 @@
+import ExportManager as EM
+import RollupManager as RUM
+
+
+def get_job(spool_path, panel, metric):
+    return {'kind': 'data', 'path': spool_path, 'file': RUM.TESTING_FILE_NAME, 'panel': panel, 'metric': metric,
+            'start': None, 'end': None, 'ctrl_ids': [1, 3], 'ctrl_max_age': 300.0}
+
+
+def test_row_metrics_name_controls_by_ctrl_ids():
+    values = [20.0, 50.0, 700.0, 1, 21.0, 21.1, 0.40, 0.47, 21.0, 0.41, 21.2, 0.42, 8.2, 9.6, 8.2, 8.3, 0.97, 1.14, 0.97, -1]
+    rows = EM.get_row_metrics(RUM.TESTING_FILE_NAME, values, [1, 3])
+    assert sorted(rows) == ['CTRL1', 'CTRL3', 'EDS1']
+    assert rows['CTRL3'] == {'ocv': 21.2, 'scc': 0.42, 'power': 8.3}
+    assert rows['EDS1']['gain'] == 0.47 / 0.40
+
+
+def test_sim_export_has_each_control_reading_once(sim_run):
+    for panel in ['CTRL1', 'CTRL3']:
+        measured = [phrase for phrase in sim_run.get_log("SCC for " + panel) if not phrase.startswith("Solar Noon")]
+        cached = sim_run.get_log("Using cached values for " + panel)
+        points = list(EM.iter_points(get_job(sim_run.spool_path, panel, 'scc')))
+        assert len(points) == len(measured) - len(cached)
+    assert list(EM.iter_points(get_job(sim_run.spool_path, 'CTRL2', 'scc'))) == []
+
+
+def test_sim_export_keeps_every_eds_test(sim_run):
+    tests = [row for name, row in sim_run.records if name == RUM.TESTING_FILE_NAME and row[4] == 1]
+    job, points, count = EM.export_series((get_job(sim_run.spool_path, 'EDS1', 'scc_after'), 100, EM.LTTB))
+    assert count == len(tests)
+    assert [value for epoch, value in points] == [row[8] for row in tests]
@@ -0,0 +1,50 @@
+import pytest
+
+import FaultManager as FM
+
+from conftest import SIM_START
+
+# 06:00-11:30, tests at 9, 10 and 11
+RUN_SECONDS = 5.5 * 3600
+
+
+def at(hour, minute):
+    return (hour - 6) * 3600 + minute * 60
+
+
+def run_faults(tmp_path, schedule):
+    fault_master = FM.FaultMaster(str(tmp_path))
+    return fault_master.run(SIM_START, RUN_SECONDS, schedule)
+
+
+def test_small_schedule_passes(tmp_path):
+    report = run_faults(tmp_path, [
+        {'device': 'GPIO', 'mode': 'raise', 'at': at(7, 30), 'seconds': 120},
+        {'device': 'AM2315', 'mode': 'hang', 'at': at(8, 55), 'seconds': 300},
+        {'device': 'MCP3008', 'mode': 'raise', 'at': at(9, 55), 'seconds': 300},
+        ])
+    for fault in report['faults']:
+        assert fault['passed'], fault
+        assert fault['detected']
+        assert fault['crashes'] == 0
+    assert report['passed']
+    assert report['restarts'] == []
+    assert report['records'] > 0
+
+
+def test_unused_device_fails_the_report(tmp_path):
+    # no ADC read between tests
+    report = run_faults(tmp_path, [{'device': 'MCP3008', 'mode': 'raise', 'at': at(7, 0), 'seconds': 60}])
+    assert not report['passed']
+    assert report['faults'][0]['failures'] == ["never hit (device not used while the fault was active)"]
+
+
+def test_schedule_checked():
+    faults = FM.load_schedule([{'device': 'RTC', 'mode': 'garbage', 'at': "2026-06-10 07:00:00", 'seconds': 60},
+                               {'device': 'SP420', 'mode': 'hang', 'at': 30, 'seconds': 60, 'hang_seconds': 2}], SIM_START)
+    assert [(fault['start'], fault['end'], fault['hang_seconds']) for fault in faults] == [
+        (SIM_START + 3600, SIM_START + 3660, FM.DEFAULT_HANG_SECONDS), (SIM_START + 30, SIM_START + 90, 2.0)]
+    with pytest.raises(ValueError):
+        FM.load_schedule([{'device': 'LED', 'mode': 'raise', 'at': 0, 'seconds': 1}], SIM_START)
+    with pytest.raises(ValueError):
+        FM.load_schedule([{'device': 'RTC', 'mode': 'melt', 'at': 0, 'seconds': 1}], SIM_START)
@@ -0,0 +1,116 @@
+import atexit
+import signal
+
+import pytest
+
+import GpioManager as GM
+import SimHardware as SH
+import StaticManager as SM
+
+from conftest import SIM_START
+
+
+class FakeGPIO:
+    # records every call that reaches the hardware, fails on a chosen pin
+    BCM = 11
+    OUT = 0
+    IN = 1
+
+    def __init__(self):
+        self.calls = []
+        self.fail_pins = set()
+
+    def setmode(self, mode):
+        pass
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, pin, direction, initial=None):
+        self.check(pin)
+        self.calls.append(('setup', pin, initial))
+
+    def output(self, pin, level):
+        self.check(pin)
+        self.calls.append(('output', pin, level))
+
+    def cleanup(self, pin):
+        self.calls.append(('cleanup', pin))
+
+    def check(self, pin):
+        if pin in self.fail_pins:
+            raise RuntimeError("GPIO fault")
+
+
+def get_gpio_master(tmp_path=None):
+    gpio = FakeGPIO()
+    return gpio, GM.GpioMaster(gpio, dict(SM.DEFAULT_CONFIG_PARAM), None if tmp_path is None else str(tmp_path))
+
+
+def test_only_changes_reach_the_hardware():
+    gpio, gpio_m = get_gpio_master()
+    assert gpio_m.set(5, 1)
+    assert not gpio_m.set(5, True)
+    assert gpio_m.set(5, 0)
+    assert gpio_m.release(5)
+    assert not gpio_m.release(5)
+    assert gpio.calls == [('setup', 5, 1), ('output', 5, 0), ('cleanup', 5)]
+    # the first setup of a pin in an unknown state is not a transition
+    assert gpio_m.get_counts() == {'5': 2}
+
+
+def test_break_before_make():
+    gpio, gpio_m = get_gpio_master()
+    gpio_m.apply({5: 0, 6: 0})
+    gpio.calls = []
+    gpio_m.apply({5: GM.RELEASED, 6: 1, 7: 0, 8: GM.RELEASED})
+    # releases first, then LOW, then HIGH (8 was never driven)
+    assert gpio.calls == [('cleanup', 5), ('cleanup', 8), ('setup', 7, 0), ('output', 6, 1)]
+
+
+def test_failed_transition_rolled_back():
+    gpio, gpio_m = get_gpio_master()
+    gpio_m.apply({5: 0, 6: 0})
+    gpio.fail_pins = {7}
+    gpio.calls = []
+    with pytest.raises(RuntimeError):
+        gpio_m.apply({5: GM.RELEASED, 6: 1, 7: 1})
+    assert gpio.calls == [('cleanup', 5), ('output', 6, 1), ('output', 6, 0), ('setup', 5, 0)]
+    assert (gpio_m.get(5), gpio_m.get(6), gpio_m.get(7)) == (0, 0, GM.RELEASED)
+
+
+def test_failed_rollback_goes_to_safe_state():
+    gpio, gpio_m = get_gpio_master()
+    eds_pin = SM.DEFAULT_CONFIG_PARAM['EDS1']
+    gpio_m.apply({eds_pin: 1, 6: 0})
+    # 7 fails and so does the rollback of 6
+    gpio.fail_pins = {6, 7}
+    with pytest.raises(RuntimeError):
+        gpio_m.apply({6: GM.RELEASED, 7: 1})
+    # EDS switched off before it is released, nothing left driven
+    assert ('output', eds_pin, 0) in gpio.calls
+    assert gpio.calls.index(('output', eds_pin, 0)) < gpio.calls.index(('cleanup', eds_pin))
+    assert all(level is GM.RELEASED for level in gpio_m.levels.values())
+
+
+def test_counts_kept_between_restarts(tmp_path):
+    gpio, gpio_m = get_gpio_master(tmp_path)
+    gpio_m.set(5, 0)
+    gpio_m.set(5, 1)
+    gpio_m.save_counts()
+    assert get_gpio_master(tmp_path)[1].get_counts() == {'5': 1}
+
+
+def test_sim_run_registers_no_exit_handlers(tmp_path, monkeypatch):
+    # MasterManager runs many times in one harness process, only the unit process registers them
+    registered = []
+    monkeypatch.setattr(atexit, 'register', lambda *args: registered.append(args))
+    monkeypatch.setattr(signal, 'signal', lambda *args: registered.append(args))
+    hw = SH.SimHardware(str(tmp_path), SIM_START)
+    hw.install()
+    try:
+        hw.run_master(60)
+    finally:
+        hw.uninstall()
+    assert hw.log_count > 0
+    assert registered == []
@@ -0,0 +1,110 @@
+import os
+import calendar
+
+import IndexManager as IM
+import RollupManager as RUM
+import RotationManager as RM
+import StaticManager as SM
+
+# EDS1 with CTRL1 and CTRL3, EDS2 row written before CTRL3 was added
+TESTING_ROWS = [
+    "6/10/2026 9:0:27,20.0,50.0,700.0,1,21.0,21.1,0.40,0.47,21.0,0.41,21.2,0.42,8.2,9.6,8.2,8.3,0.97,1.14,0.97,-1\n",
+    "6/10/2026 9:5:0,20.0,50.0,700.0,2,21.0,21.1,0.40,0.47,21.0,0.41,8.2,9.6,8.2,0.97,1.14,0.97\n",
+    "6/10/2026 10:0:0,20.0,50.0,700.0,1,21.0,21.1,0.40,0.47,21.0,0.41,21.2,0.42,8.2,9.6,8.2,8.3,0.97,1.14,0.97,-1\n",
+    ]
+
+
+def get_config():
+    config = dict(SM.DEFAULT_CONFIG_PARAM)
+    config['CTRLIDS'] = [1, 3]
+    return config
+
+
+def write(directory, name, lines, mode='a'):
+    with open(os.path.join(str(directory), name), mode) as df:
+        df.write(''.join(lines))
+
+
+def epoch(hour, minute=0):
+    return calendar.timegm((2026, 6, 10, hour, minute, 0))
+
+
+def get_lines(directory, name, panel=None):
+    return [line.decode() for name, line in IM.query(str(directory), [name], epoch(0), epoch(23, 59), panel)]
+
+
+def test_testing_rows_indexed_by_controls(tmp_path):
+    write(tmp_path, RUM.TESTING_FILE_NAME, TESTING_ROWS)
+    index_master = IM.IndexMaster(get_config(), str(tmp_path))
+    index_master.check_index()
+    assert get_lines(tmp_path, RUM.TESTING_FILE_NAME, 2) == [TESTING_ROWS[1].rstrip('\n')]
+    assert len(get_lines(tmp_path, RUM.TESTING_FILE_NAME, -1)) == 3
+    # the short row has no CTRL3 columns
+    assert [line[:16] for line in get_lines(tmp_path, RUM.TESTING_FILE_NAME, -3)] == ["6/10/2026 9:0:27", "6/10/2026 10:0:0"]
+    assert get_lines(tmp_path, RUM.TESTING_FILE_NAME, -2) == []
+
+
+def test_rebuilt_live_index_keeps_last_hour(tmp_path):
+    write(tmp_path, RUM.TESTING_FILE_NAME, TESTING_ROWS[:2])
+    # an index of an older version (or a replaced file) is rebuilt on first look
+    with open(os.path.join(str(tmp_path), RUM.TESTING_FILE_NAME + RM.INDEX_EXT), 'wb') as f:
+        f.write(b'EDSIDX\x00\x01')
+        f.write(IM.RECORD_STRUCT.pack(IM.KIND_HOUR, 0, epoch(9), 10 ** 6))
+    index_master = IM.IndexMaster(get_config(), str(tmp_path))
+    index_master.check_index()
+    # same hour, then the next hour
+    write(tmp_path, RUM.TESTING_FILE_NAME, ["6/10/2026 9:30:0,20.0,50.0,700.0,3,21.0,21.1,0.40,0.47,21.0,0.41,21.2,0.42,8.2,9.6,8.2,8.3,0.97,1.14,0.97,-1\n"])
+    index_master.last_check = None
+    index_master.check_index()
+    write(tmp_path, RUM.TESTING_FILE_NAME, TESTING_ROWS[2:])
+    index_master.last_check = None
+    index_master.check_index()
+
+    records = IM.read_index(os.path.join(str(tmp_path), RUM.TESTING_FILE_NAME + RM.INDEX_EXT))
+    assert [record[2] for record in records if record[0] == IM.KIND_DAY] == [epoch(0)]
+    assert [record[2] for record in records if record[0] == IM.KIND_HOUR] == [epoch(9), epoch(10)]
+    assert [record[1] for record in records if record[0] == IM.KIND_PANEL and record[1] > 0] == [1, 2, 3, 1]
+    # the live index is the same as one built from scratch
+    os.remove(os.path.join(str(tmp_path), RUM.TESTING_FILE_NAME + RM.INDEX_EXT))
+    assert IM.rebuild(str(tmp_path), get_config()) == 1
+    assert IM.read_index(os.path.join(str(tmp_path), RUM.TESTING_FILE_NAME + RM.INDEX_EXT)) == records
+
+
+def test_partial_line_indexed_once_complete(tmp_path):
+    write(tmp_path, RUM.TESTING_FILE_NAME, [TESTING_ROWS[0], TESTING_ROWS[1][:20]])
+    write(tmp_path, RUM.TESTING_FILE_NAME + RM.INDEX_EXT, ["garbage"], 'w')
+    index_master = IM.IndexMaster(get_config(), str(tmp_path))
+    index_master.check_index()
+    write(tmp_path, RUM.TESTING_FILE_NAME, [TESTING_ROWS[1][20:]])
+    index_master.last_check = None
+    index_master.check_index()
+    assert get_lines(tmp_path, RUM.TESTING_FILE_NAME, 2) == [TESTING_ROWS[1].rstrip('\n')]
+
+
+def test_date_named_logs_indexed(tmp_path):
+    write(tmp_path, '06-10-2026.txt', ["6/10/2026 9:0:0 Ended automated scheduled test of EDS3\n"])
+    write(tmp_path, '06-11-2026.log', ["6/11/2026 9:0:0 Using cached values for CTRL1 (10 s old)\n"])
+    # a rotated log without its live file
+    write(tmp_path, 'events.20260609-000000.txt', ["6/9/2026 9:0:0 EDS3\n"])
+    config = get_config()
+    assert IM.find_names(str(tmp_path), config['INDEXFILES']) == ['06-10-2026.txt', 'events.txt', '06-11-2026.log']
+    index_master = IM.IndexMaster(config, str(tmp_path))
+    index_master.check_index()
+    assert sorted(index_master.tails) == ['06-10-2026.txt', '06-11-2026.log']
+    assert get_lines(tmp_path, '*.txt', 3) == ["6/10/2026 9:0:0 Ended automated scheduled test of EDS3"]
+
+    # the tail of a removed log is forgotten
+    os.remove(os.path.join(str(tmp_path), '06-10-2026.txt'))
+    index_master.last_check = None
+    index_master.check_index()
+    assert sorted(index_master.tails) == ['06-11-2026.log']
+    assert IM.rebuild(str(tmp_path), config) == 2
+
+
+def test_sim_control_readings_indexed(sim_run):
+    tests = [row for name, row in sim_run.records if name == RUM.TESTING_FILE_NAME]
+    start = calendar.timegm((2026, 6, 10, 0, 0, 0))
+    for panel in [-1, -3]:
+        lines = list(IM.query(sim_run.spool_path, [RUM.TESTING_FILE_NAME], start, start + 86399, panel))
+        assert len(lines) == len(tests)
+
@@ -0,0 +1,78 @@
+import os
+import csv
+
+import OptimizerManager as OM
+import ReplayManager as RPM
+import StaticManager as SM
+
+from conftest import SIM_CONFIG, SIM_START
+
+
+def get_config(overrides=None):
+    config = dict(SM.DEFAULT_CONFIG_PARAM)
+    config.update(SIM_CONFIG)
+    config.update(overrides or {})
+    return config
+
+
+def get_report(fired):
+    # fired: [(eds, time)] of one day
+    events = [{'time': epoch, 'eds': eds, 'outcome': RPM.FIRED, 'wait_seconds': 0,
+               'start_latency_seconds': 0, 'busy_seconds': 60} for eds, epoch in fired]
+    return RPM.build_report(events, 1, SIM_START, SIM_START + 86400)
+
+
+def test_candidates_start_with_current_config():
+    config = get_config()
+    candidates = OM.make_candidates(config, OM.DEFAULT_SPACE, 5, seed=1)
+    assert len(candidates) == 5
+    assert candidates[0]['SCHEDS1'] == config['SCHEDS1']
+    assert candidates == OM.make_candidates(config, OM.DEFAULT_SPACE, 5, seed=1)
+    assert candidates != OM.make_candidates(config, OM.DEFAULT_SPACE, 5, seed=2)
+
+
+def test_cleaning_lowers_average_soiling():
+    model = OM.DEFAULT_MODEL
+    uncleaned = OM.get_average_soiling([], 0, 86400 * 10, model)
+    assert OM.get_average_soiling([86400], 0, 86400 * 10, model) < uncleaned
+    assert OM.get_average_soiling([86400, 86400 * 5], 0, 86400 * 10, model) < OM.get_average_soiling([86400], 0, 86400 * 10, model)
+
+
+def test_energy_uses_eds_power_from_config():
+    report = get_report([(1, SIM_START + 3600), (2, SIM_START + 3660)])
+    duration = SM.DEFAULT_CONFIG_PARAM['testDurationSeconds']
+    result = OM.score_report(report, get_config(), OM.DEFAULT_MODEL)
+    assert result['energy_wh'] == 2 * SM.DEFAULT_CONFIG_PARAM['edsPowerWatts'] * duration / 3600
+    result = OM.score_report(report, get_config({'edsPowerWatts': 5, 'EDSPOWERWATTS': {'EDS2': 20}}), OM.DEFAULT_MODEL)
+    assert result['energy_wh'] == (5 + 20) * duration / 3600
+
+
+def write_trace(path):
+    # one dry, sunny day
+    with open(path, 'w', newline='') as tf:
+        writer = csv.writer(tf)
+        writer.writerow(['time', 'temperature', 'humidity', 'irradiance'])
+        day = SIM_START - SIM_START % 86400
+        for epoch in range(day, day + 86400, 600):
+            writer.writerow([epoch, 25.0, 40.0, 800.0])
+
+
+def test_cache_key_covers_config_and_code(tmp_path, monkeypatch, capsys):
+    trace_path = str(tmp_path / 'trace.csv')
+    write_trace(trace_path)
+    cache_path = str(tmp_path / OM.CACHE_FILE_NAME)
+
+    def search(config):
+        ranking = OM.OptimizerMaster(config, trace_path, cache_path).search(2, processes=1)
+        return ranking, capsys.readouterr().out.splitlines()[0]
+
+    ranking, counts = search(get_config())
+    assert counts == "0 cached, 2 to evaluate"
+    assert len(ranking) == 2
+    assert search(get_config())[1] == "2 cached, 0 to evaluate"
+    # the EDS power changes the score
+    assert search(get_config({'edsPowerWatts': 12}))[1] == "0 cached, 2 to evaluate"
+    # so does any change of the replayed code
+    monkeypatch.setattr(OM, 'get_code_hash', lambda: 'changed')
+    assert search(get_config())[1] == "0 cached, 2 to evaluate"
+    assert os.path.isfile(cache_path)
@@ -0,0 +1,69 @@
+from collections import deque
+
+import QueueManager as QM
+import StaticManager as SM
+
+
+def get_queue_master(budget, power_map=None, relays=None):
+    config = dict(SM.DEFAULT_CONFIG_PARAM)
+    config['edsSupplyBudgetWatts'] = budget
+    config['EDSPOWERWATTS'] = power_map or {}
+    config.update(relays or {})
+    return QM.QueueMaster(config, 60)
+
+
+def check_groups(queue_master, groups):
+    for group in groups:
+        assert sum(queue_master.get_power(eds) for eds in group) <= queue_master.budget
+        pins = [pin for eds in group for pin in queue_master.get_relays(eds)]
+        assert len(pins) == len(set(pins))
+
+
+def test_default_budget_runs_one_eds_at_a_time():
+    queue_master = get_queue_master(10)
+    assert queue_master.plan_groups([1, 2, 3]) == [[1], [2], [3]]
+
+
+def test_groups_within_budget_in_queue_order():
+    queue_master = get_queue_master(25, {'EDS2': 15})
+    groups = queue_master.plan_groups([1, 2, 3, 4, 5])
+    # first fit: EDS2 only fits with one 10 W EDS
+    assert groups == [[1, 2], [3, 4], [5]]
+    check_groups(queue_master, groups)
+
+
+def test_shared_relay_never_in_one_group():
+    # EDS3 shares its PV relay with EDS1
+    queue_master = get_queue_master(100, relays={'EDS3PV': 14})
+    groups = queue_master.plan_groups([1, 3, 2])
+    assert groups == [[1, 2], [3]]
+    check_groups(queue_master, groups)
+
+
+def test_queued_once_per_window():
+    queue_master = get_queue_master(10)
+    assert queue_master.check_queue(1)
+    assert not queue_master.check_queue(1)
+    assert queue_master.check_queue(2)
+    queue_master.queued_at[1] -= 61
+    assert queue_master.check_queue(1)
+
+
+def test_history_keeps_latest_records():
+    queue_master = get_queue_master(10)
+    queue_master.history = deque(maxlen=2)
+    for eds in [1, 2, 3]:
+        queue_master.check_queue(eds)
+        record = queue_master.record_test(eds, 12.3456, QM.FIRED)
+    assert record['wait_seconds'] == 12.346
+    assert record['start_latency_seconds'] >= 0
+    assert [record['eds'] for record in queue_master.get_history()] == [2, 3]
+
+
+def test_sim_tests_fired_in_queue_order(sim_run):
+    # one EDS at a time with the default budget, every fired test is recorded
+    fired = sim_run.get_log("start latency")
+    ended = sim_run.get_log("Ended automated scheduled test")
+    assert fired
+    assert len(fired) == len(ended)
+    assert [phrase.split()[0] for phrase in fired] == [phrase.split()[5] for phrase in ended]
@@ -0,0 +1,111 @@
+import os
+import gzip
+import time
+import calendar
+
+import ExportManager as EM
+import RecordManager as RCM
+import RollupManager as RUM
+import SimHardware as SH
+
+
+def get_record():
+    before = RCM.PanelReading('EDS1', 21.0, 0.40, 650, 124, stamp=100.0)
+    after = RCM.PanelReading('EDS1', 21.1, 0.47, 653, 146, stamp=160.0)
+    controls = [RCM.PanelReading('CTRL1', 21.0, 0.41, stamp=90.0, cached=True, age=10.0),
+                RCM.PanelReading('CTRL3', 21.2, 0.42, stamp=100.0)]
+    for reading, power, pr in zip([before, after] + controls, [8.2, 9.6, 8.2, 8.3], [0.97, 1.14, 0.97, -1]):
+        reading.power = power
+        reading.pr = pr
+    dt = time.gmtime(calendar.timegm((2026, 6, 10, 9, 0, 27)))
+    return RCM.TestRecord(dt, 20.0, 50.0, 700.0, 1, before, after, controls, 35.0, 'v2-a807a864')
+
+
+def test_reading_unpacks_like_pair():
+    reading = RCM.PanelReading('CTRL3', 21.2, 0.42)
+    ocv, scc = reading
+    assert (ocv, scc) == (21.2, 0.42)
+    assert reading.flags == 0
+
+
+def test_reading_flags():
+    assert RCM.get_flag_names(RCM.PanelReading('EDS1', 40.0, 0.4).flags) == ['ocv-range']
+    assert RCM.get_flag_names(RCM.PanelReading('EDS1', 21.0, -0.1, cached=True).flags) == ['cached', 'scc-range']
+
+
+def test_record_lists():
+    record = get_record()
+    assert record.get_ocv_scc() == [21.0, 21.1, 0.40, 0.47, 21.0, 0.41, 21.2, 0.42]
+    assert record.get_power_data() == [8.2, 9.6, 8.2, 8.3]
+    assert record.get_ctrl_stamps() == [90.0, 100.0]
+    assert record.get_ctrl_source() == 'mixed'
+    assert record.get_flags() == RCM.FLAG_CACHED
+
+
+def test_record_round_trip_through_testing_row():
+    # TestRecord -> CSVMaster row -> rollup/export parsing gives the same values back
+    record = get_record()
+    dt, temp, humid, g_poa, eds, data_ocv_scc, power_data, pr_data = record.get_testing_data()
+    row = [SH.time_string(dt), temp, humid, g_poa, eds] + data_ocv_scc + power_data + pr_data
+    line = ','.join(str(value) for value in row).encode()
+    assert RUM.split_testing_values(RUM.parse_values(line)) == (temp, humid, g_poa, eds, data_ocv_scc, power_data, pr_data)
+    assert record.get_row() == row
+
+    rows = EM.get_row_metrics(RUM.TESTING_FILE_NAME, RUM.parse_values(line), [1, 3])
+    for reading in record.controls:
+        assert rows[reading.panel]['ocv'] == reading.ocv
+        assert rows[reading.panel]['scc'] == reading.scc
+        assert rows[reading.panel]['power'] == reading.power
+
+
+def test_sim_records_match_log(sim_run):
+    # every testing row holds EDS before/after plus CTRL1 and CTRL3 in CTRLIDS order
+    tests = [row for name, row in sim_run.records if name == RUM.TESTING_FILE_NAME]
+    assert tests
+    for row in tests:
+        test = RUM.split_testing_values([float(value) for value in row[1:]])
+        assert test is not None
+        assert len(test[4]) == 8
+    ended = sim_run.get_log("Ended automated scheduled test")
+    assert [int(phrase.split()[5][3:]) for phrase in ended] == [row[4] for row in tests]
+
+
+def check_same(record, unpacked):
+    assert unpacked.get_row() == record.get_row()
+    assert unpacked.get_flags() == record.get_flags()
+    assert (unpacked.pan_temp, unpacked.cal_version) == (record.pan_temp, record.cal_version)
+    for reading, other in zip(record.get_readings(), unpacked.get_readings()):
+        assert (other.panel, other.ocv_code, other.scc_code, other.stamp, other.age, other.flags) == (reading.panel, reading.ocv_code, reading.scc_code, reading.stamp, reading.age, reading.flags)
+
+
+def test_record_pack_round_trip():
+    record = get_record()
+    # missing values (no weather, no codes) come back as None
+    record.humid = None
+    data = record.pack()
+    unpacked, offset = RCM.unpack_record(data + data, len(data))
+    assert offset == 2 * len(data)
+    check_same(record, unpacked)
+    assert unpacked.humid is None
+    assert unpacked.controls[0].ocv_code is None
+
+
+def test_store_skips_cut_record(tmp_path):
+    record_master = RCM.RecordMaster(str(tmp_path))
+    for i in range(2):
+        record_master.append(get_record())
+    with open(record_master.path, 'ab') as rf:
+        rf.write(get_record().pack()[:50])
+    assert len(RCM.read_records(record_master.path)) == 2
+    # a rotated segment reads the same
+    with open(record_master.path, 'rb') as rf, gzip.open(record_master.path + '.gz', 'wb') as gf:
+        gf.write(rf.read())
+    assert len(RCM.read_records(record_master.path + '.gz')) == 2
+
+
+def test_sim_store_matches_testing_rows(sim_run):
+    # the binary store dumps to the same rows as testing_data.csv
+    tests = [row for name, row in sim_run.records if name == RUM.TESTING_FILE_NAME]
+    records = RCM.read_records(os.path.join(sim_run.spool_path, RCM.RECORDS_FILE_NAME))
+    assert [record.get_row() for record in records] == tests
+    assert all(record.cal_version for record in records)
@@ -0,0 +1,61 @@
+import re
+
+import ReplayManager as RPM
+import SimHardware as SH
+import StaticManager as SM
+
+from conftest import SIM_CONFIG, SIM_SECONDS, SIM_START
+
+
+def get_trace(humidity=None, max_gap=120):
+    # samples of the simulated environment every minute of the simulated day
+    environment = SH.SimEnvironment()
+    day = SIM_START - SIM_START % 86400
+    samples = []
+    for epoch in range(day, day + 86400, 60):
+        humid = environment.humidity(epoch) if humidity is None else humidity(epoch)
+        samples.append((epoch, environment.temperature(epoch), humid, environment.irradiance(epoch)))
+    return RPM.WeatherTrace(samples, max_gap)
+
+
+def replay(trace, tmp_path):
+    config = dict(SM.DEFAULT_CONFIG_PARAM)
+    config.update(SIM_CONFIG)
+    replay_master = RPM.ReplayMaster(config, trace, str(tmp_path))
+    try:
+        report = replay_master.run(SIM_START, SIM_START + SIM_SECONDS)
+    finally:
+        replay_master.close()
+    return [event for event in report['events'] if event['time'] < SIM_START + SIM_SECONDS], report
+
+
+def test_trace_sample_and_gaps():
+    trace = RPM.WeatherTrace([(100, 20.0, 50.0, 800.0), (400, 21.0, None, 810.0)], max_gap=200)
+    assert trace.sample(99) is None
+    assert trace.sample(250) == (100, 20.0, 50.0, 800.0)
+    # held sample older than the max gap is missing data
+    assert trace.sample(301) is None
+    assert trace.changes(0, 1000) == [100, 300, 400, 600]
+
+
+def test_replay_matches_sim_day(sim_run, tmp_path):
+    # the replay fires the same tests with the same start latency as MasterManager on the same weather
+    events, report = replay(get_trace(), tmp_path)
+    fired = [(event['eds'], event['start_latency_seconds']) for event in events if event['outcome'] == RPM.FIRED]
+    logged = []
+    for phrase in sim_run.get_log("start latency"):
+        match = re.match(r'EDS(\d+) weather wait: 0 s, start latency: ([\d.]+) s', phrase)
+        logged.append((int(match.group(1)), float(match.group(2))))
+    assert fired == logged
+
+
+def test_weather_window_wait_and_skip(tmp_path):
+    # too humid until 10:01, the 10:00 queue waits for the window, the 9:00 queue is skipped
+    opens = SIM_START + 4 * 3600 + 60
+    events, report = replay(get_trace(lambda epoch: 95.0 if epoch < opens else 40.0), tmp_path)
+    skipped = [event for event in events if event['outcome'] == RPM.SKIPPED_WEATHER]
+    assert [event['eds'] for event in skipped] == [1, 2]
+    assert [event['wait_seconds'] for event in skipped] == [SM.DEFAULT_CONFIG_PARAM['testWindowSeconds']] * 2
+    waited = [event for event in events if event['outcome'] == RPM.FIRED and event['time'] < opens]
+    assert [event['eds'] for event in waited] == [1, 2, 3]
+    assert waited[0]['wait_seconds'] == opens - waited[0]['time']
@@ -0,0 +1,95 @@
+import os
+import glob
+import json
+import time
+import shutil
+import calendar
+
+import RollupManager as RUM
+import StaticManager as SM
+
+CONFIG = {'CTRLIDS': [1, 3], 'ctrlCacheMaxSeconds': 300}
+
+
+def get_dt(hour, minute=0):
+    return time.gmtime(calendar.timegm((2026, 6, 10, hour, minute, 0)))
+
+
+def get_testing_data(ctrl_scc):
+    # EDS1 before/after plus CTRL1 and CTRL3
+    data_ocv_scc = [21.0, 21.1, 0.40, 0.47, 21.0, ctrl_scc[0], 21.0, ctrl_scc[1]]
+    return 20.0, 50.0, 700.0, 1, data_ocv_scc, [8.2, 9.6, 8.2, 8.3], [0.97, 1.14, 0.97, 0.98]
+
+
+def update_tests(rollup_master, tests, stamps=None):
+    for i, (dt, ctrl_scc) in enumerate(tests):
+        ctrl_stamps = None if stamps is None else stamps[i]
+        rollup_master.update_test(dt, *get_testing_data(ctrl_scc), ctrl_stamps=ctrl_stamps)
+
+
+def test_controls_named_by_ctrl_ids(tmp_path):
+    rollup_master = RUM.RollupMaster(str(tmp_path), CONFIG)
+    update_tests(rollup_master, [(get_dt(9), [0.41, 0.42])])
+    day = rollup_master.get_day(get_dt(9))
+    assert sorted(day) == ['CTRL1', 'CTRL3', 'EDS1']
+    assert day['CTRL3']['scc'][3] == 0.42
+    assert day['CTRL3']['pr'][3] == 0.98
+
+
+def test_cached_reading_counted_once_by_read_time(tmp_path):
+    rollup_master = RUM.RollupMaster(str(tmp_path), CONFIG)
+    # second group reuses both cached readings, third group measures CTRL3 again
+    tests = [(get_dt(9), [0.41, 0.42]), (get_dt(9, 1), [0.41, 0.42]), (get_dt(9, 2), [0.41, 0.42])]
+    update_tests(rollup_master, tests, [[100.0, 100.5], [100.0, 100.5], [100.0, 160.0]])
+    day = rollup_master.get_day(get_dt(9))
+    assert day['EDS1']['tests'] == 3
+    assert day['CTRL1']['tests'] == 1
+    # a fresh reading is counted even when its values are the same
+    assert day['CTRL3']['tests'] == 2
+
+
+def test_cached_reading_counted_once_from_values(tmp_path):
+    # no read times in the data files, a cached reading repeats the exact values within the cache age
+    rollup_master = RUM.RollupMaster(str(tmp_path), CONFIG)
+    tests = [(get_dt(9), [0.41, 0.42]), (get_dt(9, 1), [0.41, 0.42]), (get_dt(9, 2), [0.41, 0.43]), (get_dt(10), [0.41, 0.43])]
+    update_tests(rollup_master, tests)
+    day = rollup_master.get_day(get_dt(9))
+    assert day['CTRL1']['tests'] == 2
+    assert day['CTRL3']['tests'] == 3
+
+
+def get_month(spool_path):
+    paths = glob.glob(os.path.join(spool_path, RUM.ROLLUP_FILE_PREFIX + '*' + RUM.ROLLUP_FILE_EXT))
+    assert len(paths) == 1
+    with open(paths[0], 'r') as rf:
+        return json.load(rf)
+
+
+def test_sim_rollup_counts_fresh_control_readings(sim_run):
+    day = get_month(sim_run.spool_path)['days']['2026-06-10']
+    assert 'CTRL2' not in day
+    for panel in ['CTRL1', 'CTRL3']:
+        measured = [phrase for phrase in sim_run.get_log("OCV for " + panel) if not phrase.startswith("Solar Noon")]
+        cached = sim_run.get_log("Using cached values for " + panel)
+        assert cached
+        assert day[panel]['tests'] == len(measured) - len(cached)
+
+
+def test_sim_rebuild_matches_live_rollup(sim_run, tmp_path):
+    directory = str(tmp_path / 'unit')
+    shutil.copytree(sim_run.spool_path, directory)
+    for path in glob.glob(os.path.join(directory, RUM.ROLLUP_FILE_PREFIX + '*')):
+        os.remove(path)
+    config = dict(SM.DEFAULT_CONFIG_PARAM)
+    config.update(sim_run.hw.config)
+    assert RUM.rebuild(directory, config) == ['202606']
+    assert get_month(directory) == get_month(sim_run.spool_path)
+
+
+def test_failed_save_keeps_month(tmp_path):
+    # the month stays in memory and is saved with the next update
+    rollup_master = RUM.RollupMaster(str(tmp_path / 'missing'), CONFIG)
+    update_tests(rollup_master, [(get_dt(9), [0.41, 0.42])])
+    os.makedirs(str(tmp_path / 'missing'))
+    update_tests(rollup_master, [(get_dt(10), [0.41, 0.43])])
+    assert get_month(str(tmp_path / 'missing'))['days']['2026-06-10']['EDS1']['tests'] == 2
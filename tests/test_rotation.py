@@ -0,0 +1,106 @@
+import os
+import time
+import calendar
+
+import pytest
+
+import RotationManager as RM
+import StaticManager as SM
+
+
+def get_dt(day, hour=0):
+    return time.gmtime(calendar.timegm((2026, 6, day, hour, 0, 0)))
+
+
+@pytest.fixture
+def rotation_master(tmp_path):
+    config = dict(SM.DEFAULT_CONFIG_PARAM)
+    config['rotationMaxBytes'] = 100
+    return RM.RotationMaster(config, str(tmp_path))
+
+
+def append(rotation_master, name, text):
+    with open(os.path.join(rotation_master.directory, name), 'a') as df:
+        df.write(text)
+
+
+def check(rotation_master, dt):
+    rotation_master.last_check = None
+    rotation_master.check_rotation(dt)
+
+
+def wait_compressed(rotation_master, count):
+    # compression runs in the background thread
+    for i in range(500):
+        with rotation_master.manifest_lock:
+            compressed = [name for name in rotation_master.manifest['segments'] if name.endswith('.gz')]
+        if len(compressed) == count:
+            return sorted(compressed)
+        time.sleep(0.01)
+    raise AssertionError("segments not compressed")
+
+
+def test_rotate_by_size_and_day(rotation_master):
+    append(rotation_master, 'testing_data.csv', "x" * 10 + "\n")
+    check(rotation_master, get_dt(10, 9))
+    assert rotation_master.manifest['live'] == {'testing_data.csv': {'opened': '20260610-090000'}}
+    append(rotation_master, 'testing_data.csv', "x" * 100 + "\n")
+    check(rotation_master, get_dt(10, 10))
+    append(rotation_master, 'testing_data.csv', "y\n")
+    check(rotation_master, get_dt(10, 11))
+    # same day, under the size limit
+    assert not os.path.exists(os.path.join(rotation_master.directory, 'testing_data.20260610-110000.csv'))
+    check(rotation_master, get_dt(11))
+    assert wait_compressed(rotation_master, 2) == ['testing_data.20260610-100000.csv.gz', 'testing_data.20260611-000000.csv.gz']
+    assert rotation_master.find_segments('testing_data.csv', '20260610-100000', '20260610-235959') == ['testing_data.20260610-100000.csv.gz', 'testing_data.20260611-000000.csv.gz']
+    assert rotation_master.find_segments('testing_data.csv', '20260611-000001', '20260612-000000') == []
+
+
+def test_after_rotate_hook_sees_new_live_file(rotation_master):
+    rotated = []
+    rotation_master.after_rotate = lambda name: rotated.append((name, os.path.exists(os.path.join(rotation_master.directory, name))))
+    append(rotation_master, 'log.txt', "x" * 200)
+    check(rotation_master, get_dt(10))
+    # the live name is free for the writer to reopen
+    assert rotated == [('log.txt', False)]
+    # a failing hook never blocks rotation
+    rotation_master.after_rotate = None
+    rotation_master.before_rotate = lambda name: 1 / 0
+    append(rotation_master, 'log.txt', "x" * 200)
+    check(rotation_master, get_dt(10, 1))
+    assert wait_compressed(rotation_master, 2)
+
+
+def test_stale_live_entries_pruned(rotation_master):
+    append(rotation_master, '06-10-2026.txt', "x\n")
+    append(rotation_master, '06-11-2026.txt', "x\n")
+    check(rotation_master, get_dt(11))
+    assert sorted(rotation_master.manifest['live']) == ['06-10-2026.txt', '06-11-2026.txt']
+    os.remove(os.path.join(rotation_master.directory, '06-10-2026.txt'))
+    check(rotation_master, get_dt(11, 1))
+    assert sorted(rotation_master.manifest['live']) == ['06-11-2026.txt']
+    # and the saved manifest agrees
+    assert sorted(RM.RotationMaster(dict(SM.DEFAULT_CONFIG_PARAM), rotation_master.directory).manifest['live']) == ['06-11-2026.txt']
+
+
+def test_cap_drops_oldest_compressed_segments(rotation_master):
+    for day in [12, 10, 11]:
+        append(rotation_master, 'log.txt', os.urandom(1000).hex())
+        rotation_master.rotate('log.txt', '202606' + str(day) + '-000000')
+    segments = wait_compressed(rotation_master, 3)
+    sizes = [os.path.getsize(os.path.join(rotation_master.directory, name)) for name in segments]
+    rotation_master.max_disk_bytes = sizes[2] + os.path.getsize(rotation_master.manifest_path) + 100
+    rotation_master.enforce_cap()
+    assert sorted(name for name in os.listdir(rotation_master.directory) if name.endswith('.gz')) == [segments[2]]
+    assert sorted(rotation_master.manifest['segments']) == [segments[2]]
+
+
+def test_interrupted_compression_recovered(tmp_path):
+    directory = str(tmp_path)
+    with open(os.path.join(directory, 'log.20260610-000000.txt'), 'w') as df:
+        df.write("x\n")
+    with open(os.path.join(directory, 'log.20260609-000000.txt.gz.part'), 'w') as df:
+        df.write("half")
+    rotation_master = RM.RotationMaster(dict(SM.DEFAULT_CONFIG_PARAM), directory)
+    assert wait_compressed(rotation_master, 1) == ['log.20260610-000000.txt.gz']
+    assert sorted(os.listdir(directory)) == ['log.20260610-000000.txt.gz', RM.MANIFEST_NAME]
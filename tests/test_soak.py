@@ -0,0 +1,67 @@
+import csv
+
+import pytest
+
+import SoakManager as SKM
+
+from conftest import SIM_START
+
+
+def get_windows(metric, values):
+    return [{'start': day * 86400, metric: value} for day, value in enumerate(values)]
+
+
+def test_slope():
+    assert SKM.get_slope([5]) == 0.0
+    assert SKM.get_slope([1, 3, 5, 7]) == 2.0
+    assert SKM.get_slope([4, 4, 4]) == 0.0
+
+
+def test_steady_leak_fails():
+    # 1 MB a day is 30 MB over the projection, the limit is 4 MB
+    check = SKM.check_growth(get_windows('traced_bytes', [10e6 + day * 1e6 for day in range(6)]), 'traced_bytes', 4e6)
+    assert check['slope_per_day'] == pytest.approx(1e6)
+    assert check['projected_growth'] == pytest.approx(30e6)
+    assert not check['passed']
+
+
+def test_plateau_and_short_runs_pass():
+    # early growth that levels off, the last day is no new peak
+    check = SKM.check_growth(get_windows('traced_bytes', [1e6, 5e6, 9e6, 9e6, 9e6, 9e6]), 'traced_bytes', 4e6)
+    assert check['passed']
+    assert check['peak'] == 9e6
+    # two days can't tell growth from noise
+    assert SKM.check_growth(get_windows('open_fds', [10, 20]), 'open_fds', 2)['passed']
+    # days without values
+    assert SKM.check_growth(get_windows('open_fds', [None, None]), 'open_fds', 2)['first'] is None
+
+
+def test_relative_metric_growth():
+    # loop period growing 1 % a day is 30 % a month against a 5 % limit
+    check = SKM.check_growth(get_windows('loop_period_s', [1.0 + day * 0.01 for day in range(5)]), 'loop_period_s', 0.05)
+    assert check['projected_growth'] == pytest.approx(0.3)
+    assert not check['passed']
+
+
+def test_daily_windows(tmp_path):
+    soak_master = SKM.SoakMaster(str(tmp_path))
+    soak_master.window_start = 0
+    sample = dict((metric, 1) for metric in SKM.METRICS)
+    for now, value in [(100, 3), (200, 5), (86400 * 2 + 10, 7)]:
+        soak_master.add_to_window(now, dict(sample, open_fds=value, loop_period_s=value))
+    soak_master.close_window()
+    # max and mean per day, the empty day in between is skipped
+    assert [(window['start'], window['open_fds'], window['loop_period_s']) for window in soak_master.windows] == [(0, 5, 4.0), (86400 * 2, 7, 7.0)]
+
+
+def test_short_soak_run(tmp_path):
+    soak_master = SKM.SoakMaster(str(tmp_path), use_tracemalloc=False)
+    report = soak_master.run(SIM_START, 0.25, 1800)
+    assert report['api_errors'] == 0
+    assert report['iterations'] > 0
+    assert report['records'] > 0
+    with open(soak_master.samples_path, 'r') as sf:
+        samples = list(csv.DictReader(sf))
+    assert len(samples) == 12
+    # the loop period is known from the second sample on
+    assert all(float(sample['loop_period_s']) > 0 for sample in samples[1:])
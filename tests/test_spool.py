@@ -0,0 +1,121 @@
+import os
+import time
+import calendar
+
+import pytest
+
+import RotationManager as RM
+import SpoolManager as SPM
+import StaticManager as SM
+
+
+class USBMaster:
+
+    def __init__(self, path):
+        self.path = path
+
+    def get_USB_path(self):
+        return self.path
+
+
+@pytest.fixture
+def unit(tmp_path):
+    config = dict(SM.DEFAULT_CONFIG_PARAM)
+    config['spoolPath'] = str(tmp_path / 'spool') + os.sep
+    # the test USB is a directory on the same device
+    config['spoolUSBMountCheck'] = False
+    usb_path = str(tmp_path / 'usb')
+    os.makedirs(usb_path)
+    spool_master = SPM.SpoolMaster(config, USBMaster(usb_path))
+    rotation_master = RM.RotationMaster(config, spool_master.get_spool_path())
+    rotation_master.can_remove = spool_master.is_synced
+    return spool_master, rotation_master, usb_path
+
+
+def append(spool_master, name, text):
+    with open(os.path.join(spool_master.get_spool_path(), name), 'a') as df:
+        df.write(text)
+
+
+def read(path):
+    with open(path, 'r') as df:
+        return df.read()
+
+
+def wait_compressed(rotation_master, count):
+    # compression runs in the background thread
+    for i in range(500):
+        with rotation_master.manifest_lock:
+            compressed = [name for name in rotation_master.manifest['segments'] if name.endswith('.gz')]
+        if len(compressed) == count:
+            return sorted(compressed)
+        time.sleep(0.01)
+    raise AssertionError("segments not compressed")
+
+
+def test_mount_point_without_stick_is_not_usb(tmp_path):
+    # a pulled stick leaves a writable directory on the spool's device
+    config = dict(SM.DEFAULT_CONFIG_PARAM)
+    config['spoolPath'] = str(tmp_path / 'spool') + os.sep
+    usb_path = str(tmp_path / 'usb')
+    os.makedirs(usb_path)
+    spool_master = SPM.SpoolMaster(config, USBMaster(usb_path))
+    append(spool_master, 'testing_data.csv', "6/10/2026 9:0:0,1\n")
+    assert spool_master.check_usb() is None
+    assert not spool_master.sync_once()
+    assert os.listdir(usb_path) == []
+    assert spool_master.get_status()['connected'] is False
+
+    # a cached path is checked again on every sync
+    spool_master.mount_check = False
+    spool_master.last_recheck = None
+    assert spool_master.sync_once()
+    spool_master.mount_check = True
+    assert spool_master.check_usb() is None
+
+
+def test_live_file_synced_by_appends(unit):
+    spool_master, rotation_master, usb_path = unit
+    append(spool_master, 'testing_data.csv', "6/10/2026 9:0:0,1\n")
+    assert spool_master.sync_once()
+    append(spool_master, 'testing_data.csv', "6/10/2026 10:0:0,2\n")
+    assert spool_master.sync_once()
+    assert read(os.path.join(usb_path, 'testing_data.csv')) == "6/10/2026 9:0:0,1\n6/10/2026 10:0:0,2\n"
+    assert spool_master.get_pending_bytes() == 0
+
+
+def test_rotated_segment_synced_once_compressed(unit):
+    spool_master, rotation_master, usb_path = unit
+    append(spool_master, 'testing_data.csv', "6/10/2026 9:0:0,1\n")
+    rotation_master.check_rotation(time.gmtime(calendar.timegm((2026, 6, 10, 9, 0, 0))))
+    assert spool_master.sync_once()
+    # the live file is rotated on the next day
+    rotation_master.last_check = None
+    rotation_master.check_rotation(time.gmtime(calendar.timegm((2026, 6, 11, 0, 1, 0))))
+    segment = wait_compressed(rotation_master, 1)[0]
+    assert segment == 'testing_data.20260611-000100.csv.gz'
+    assert not spool_master.is_synced(segment)
+    assert spool_master.sync_once()
+    assert spool_master.is_synced(segment)
+    assert os.path.isfile(os.path.join(usb_path, segment))
+
+
+def test_disk_cap_keeps_usb_copies(unit):
+    spool_master, rotation_master, usb_path = unit
+    for i in range(3):
+        append(spool_master, 'log.txt', str(i) * 1000 + "\n")
+        rotation_master.rotate('log.txt', '2026061' + str(i) + '-000000')
+    segments = wait_compressed(rotation_master, 3)
+    # only synced segments may go
+    rotation_master.max_disk_bytes = 0
+    rotation_master.enforce_cap()
+    assert sorted(name for name in os.listdir(spool_master.get_spool_path()) if name.endswith('.gz')) == segments
+
+    assert spool_master.sync_once()
+    rotation_master.enforce_cap()
+    assert not [name for name in os.listdir(spool_master.get_spool_path()) if name.endswith('.gz')]
+    # the USB keeps the history, the spool state forgets the removed segments
+    assert spool_master.sync_once()
+    for segment in segments:
+        assert os.path.isfile(os.path.join(usb_path, segment))
+        assert segment not in spool_master.state
@@ -0,0 +1,89 @@
+import os
+
+import pytest
+
+import StatsManager as STM
+
+CONFIG = {'statsWindowSize': 3, 'statsEWMAAlpha': 0.5}
+
+
+def test_rolling_mean_over_window():
+    stat = STM.RollingStat(3, 0.5)
+    assert stat.get_mean() is None
+    for value in [1.0, 2.0, 3.0, 4.0]:
+        stat.update(value)
+    # the oldest value left the running sum
+    assert list(stat.window) == [2.0, 3.0, 4.0]
+    assert stat.get_mean() == 3.0
+    assert stat.last == 4.0
+    assert stat.count == 4
+
+
+def test_rolling_sum_resummed_once_per_window():
+    stat = STM.RollingStat(3, 0.5)
+    for value in [0.1, 0.2, 0.3]:
+        stat.update(value)
+    # a drifted running sum is replaced by the exact sum of the window
+    stat.total += 1e-3
+    stat.update(0.4)
+    stat.update(0.5)
+    assert stat.total != sum(stat.window)
+    stat.update(0.6)
+    assert stat.count % 3 == 0
+    assert stat.total == sum(stat.window)
+
+
+def test_ewma():
+    stat = STM.RollingStat(3, 0.5)
+    stat.update(4.0)
+    assert stat.ewma == 4.0
+    stat.update(2.0)
+    assert stat.ewma == 3.0
+    stat.update(1.0)
+    assert stat.ewma == 2.0
+
+
+def test_update_test_skips_invalid_controls_and_pr(tmp_path):
+    stats_master = STM.StatsMaster(CONFIG, str(tmp_path))
+    # one control without a reading, no irradiance reading for the PR
+    stats_master.update_test(1, 0.40, 0.48, [0.50, -1, 0.0], -1, 0.9)
+    summary = stats_master.get_summary(1)
+    assert summary['SR_BEFORE']['last'] == 0.40 / 0.50
+    assert summary['SR_AFTER']['last'] == 0.48 / 0.50
+    assert summary['GAIN']['last'] == 0.48 / 0.40
+    assert summary['PR_DELTA']['count'] == 0
+
+    # no valid control or before reading, only the PR delta is counted
+    stats_master.update_test(1, 0.0, 0.48, [-1], 0.8, 0.9)
+    summary = stats_master.get_summary(1)
+    assert summary['SR_BEFORE']['count'] == 1
+    assert summary['GAIN']['count'] == 1
+    assert summary['PR_DELTA']['count'] == 1
+    assert "PR_DELTA mean=0.1" in stats_master.get_phrase(1)
+
+
+def test_state_round_trip(tmp_path):
+    stats_master = STM.StatsMaster(CONFIG, str(tmp_path))
+    for scc_after in [0.44, 0.46, 0.48, 0.50]:
+        stats_master.update_test(2, 0.40, scc_after, [0.50], 0.8, 0.9)
+    loaded = STM.StatsMaster(CONFIG, str(tmp_path))
+    for key in STM.STAT_KEYS:
+        assert loaded.stats[2][key].to_dict() == stats_master.stats[2][key].to_dict()
+        # the running sum starts from the exact sum of the window
+        assert loaded.stats[2][key].get_mean() == pytest.approx(stats_master.stats[2][key].get_mean())
+    assert not os.path.exists(os.path.join(str(tmp_path), STM.STATS_FILE_NAME + ".tmp"))
+
+
+def test_bad_state_file_starts_over(tmp_path):
+    with open(os.path.join(str(tmp_path), STM.STATS_FILE_NAME), 'w') as sf:
+        sf.write("{garbage")
+    stats_master = STM.StatsMaster(CONFIG, str(tmp_path))
+    assert stats_master.stats == {}
+
+
+def test_failed_save_keeps_statistics(tmp_path):
+    # the unit logs the error and keeps testing, the values are saved with the next update
+    stats_master = STM.StatsMaster(CONFIG, str(tmp_path / 'missing'))
+    with pytest.raises(IOError):
+        stats_master.update_test(1, 0.40, 0.48, [0.50], 0.8, 0.9)
+    assert stats_master.get_summary(1)['GAIN']['count'] == 1
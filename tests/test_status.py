@@ -0,0 +1,62 @@
+import json
+import urllib.request
+import urllib.error
+
+import pytest
+
+import StaticManager as SM
+import StatusManager as STSM
+
+
+def get_status_master(enabled=False):
+    config = dict(SM.DEFAULT_CONFIG_PARAM)
+    config['statusEnabled'] = enabled
+    # any free port
+    config['statusPort'] = 0
+    return STSM.StatusMaster(config)
+
+
+def test_snapshot_encoded_once_per_publish():
+    status_master = get_status_master()
+    snapshot = {'errors': ['Weather'], 'loop': {'period': 1.0}}
+    status_master.publish(snapshot)
+    body = status_master.get_encoded(None)
+    assert json.loads(body) == snapshot
+    assert status_master.get_encoded(None) is body
+    assert json.loads(status_master.get_encoded('errors')) == ['Weather']
+    assert status_master.get_encoded('missing') is None
+    # a new snapshot is encoded again
+    status_master.publish({'errors': []})
+    assert json.loads(status_master.get_encoded('errors')) == []
+    assert status_master.get_encoded('loop') is None
+
+
+def get(port, path):
+    with urllib.request.urlopen('http://127.0.0.1:' + str(port) + path, timeout=5) as response:
+        return response.status, response.headers['Content-Type'], json.loads(response.read())
+
+
+def test_http_sections_and_404():
+    status_master = get_status_master(enabled=True)
+    status_master.start()
+    try:
+        port = status_master.server.server_address[1]
+        status_master.publish({'errors': ['RTC'], 'triggers': {'EDS1': 12.5}})
+        assert get(port, '/status') == (200, 'application/json', {'errors': ['RTC'], 'triggers': {'EDS1': 12.5}})
+        assert get(port, '/status/triggers?x=1') == (200, 'application/json', {'EDS1': 12.5})
+        for path in ['/status/sensors', '/other', '/status/errors/0']:
+            with pytest.raises(urllib.error.HTTPError) as error:
+                get(port, path)
+            assert error.value.code == 404
+    finally:
+        status_master.stop()
+
+
+def test_sim_snapshot_sections(sim_run):
+    status = sim_run.status
+    for section in ['errors', 'measurements', 'triggers', 'sensors', 'loop']:
+        assert section in status
+    assert sorted(status['triggers']) == ['EDS' + str(eds) for eds in SM.DEFAULT_CONFIG_PARAM['EDSIDS']]
+    assert status['sensors']
+    # the snapshot is plain JSON
+    json.dumps(status, default=str)
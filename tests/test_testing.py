@@ -0,0 +1,99 @@
+import SimHardware as SH
+import StaticManager as SM
+
+# EDS1 and CTRL1 wired to their own channels, EDS2 through the relay multiplexer
+SCAN_CONFIG = {'ADCCHANNELMAP': {'PV': 0, 'EDS1': 1, 'CTRL1': 5}}
+
+
+def get_testing_master(make_sim_hw, config_overrides=None):
+    hw = make_sim_hw(config_overrides)
+    # imported against the simulated hardware
+    import TestingManager as TM
+    pin_changes = []
+    set_level = hw.gpio.set_level
+    hw.gpio.set_level = lambda pin, level: (pin_changes.append((pin, level, hw.clock.now)), set_level(pin, level))
+    return hw, TM.TestingMaster(hw.config), pin_changes
+
+
+def get_ocv(hw, panel):
+    return hw.environment.panel_voc(panel, hw.clock.now)
+
+
+def test_scan_panels_read_together(make_sim_hw):
+    hw, test_master, pin_changes = get_testing_master(make_sim_hw, SCAN_CONFIG)
+    assert test_master.get_scan_panels(['CTRL1', 'EDS1', 'EDS2']) == ['CTRL1', 'EDS1']
+    readings, scan_info = test_master.run_measure_panels(['CTRL1', 'EDS1', 'EDS2'])
+    assert list(readings) == ['CTRL1', 'EDS1', 'EDS2']
+    # one burst per branch, both panels carry its time
+    assert readings['CTRL1'].stamp == readings['EDS1'].stamp == scan_info['OCV'][0]
+    assert scan_info['SCC'][0] > scan_info['OCV'][0]
+    assert readings['EDS2'].stamp > scan_info['SCC'][0]
+    # one code step of the x11 divider
+    step = 11 * SH.VREF / SH.STEPS
+    for panel, reading in readings.items():
+        assert abs(reading.ocv - get_ocv(hw, panel)) < step
+        assert reading.ocv_code is not None and reading.scc_code is not None
+    # the relays of the scanned panels closed in the same step
+    closed = [(pin, now) for pin, level, now in pin_changes if pin in (hw.config['CTRL1PV'], hw.config['EDS1PV']) and level == 0]
+    assert len(closed) == 2 and closed[0][1] == closed[1][1]
+
+
+def test_multiplexed_panels_without_channel_map(make_sim_hw):
+    hw, test_master, pin_changes = get_testing_master(make_sim_hw)
+    readings, scan_info = test_master.run_measure_panels(['CTRL1', 'EDS1'])
+    assert scan_info is None
+    assert readings['EDS1'].stamp > readings['CTRL1'].stamp
+    assert abs(readings['EDS1'].ocv - get_ocv(hw, 'EDS1')) < 11 * SH.VREF / SH.STEPS
+
+
+def test_control_cache_age_and_irradiance(make_sim_hw):
+    hw = make_sim_hw()
+    import TestingManager as TM
+    ctrl_cache = TM.ControlCacheMaster(hw.config)
+    ctrl_cache.put('CTRL1', 800.0, [21.0, 0.4])
+    assert ctrl_cache.get('CTRL1', 800.0) == ([21.0, 0.4], 0.0, hw.clock.now)
+    # within 5 % of the irradiance of the reading
+    assert ctrl_cache.get('CTRL1', 839.0) is not None
+    assert ctrl_cache.get('CTRL1', 841.0) is None
+    assert ctrl_cache.get('CTRL1', None) is None
+    assert ctrl_cache.get('CTRL2', 800.0) is None
+    hw.clock.advance(hw.config['ctrlCacheMaxSeconds'])
+    assert ctrl_cache.get('CTRL1', 800.0)[1] == hw.config['ctrlCacheMaxSeconds']
+    hw.clock.advance(1)
+    assert ctrl_cache.get('CTRL1', 800.0) is None
+    # the age counts from the read time
+    ctrl_cache.put('CTRL1', 800.0, [21.0, 0.4], hw.clock.now - 30)
+    assert ctrl_cache.get('CTRL1', 800.0)[1] == 30
+
+
+def test_control_cache_floor_at_dawn(make_sim_hw):
+    hw = make_sim_hw()
+    import TestingManager as TM
+    ctrl_cache = TM.ControlCacheMaster(hw.config)
+    # 5 % of the 50 W/m^2 floor, not of the 10 W/m^2 reading
+    ctrl_cache.put('CTRL1', 10.0, [18.0, 0.01])
+    assert ctrl_cache.get('CTRL1', 12.0) is not None
+    assert ctrl_cache.get('CTRL1', 13.0) is None
+
+
+def test_group_reuses_cached_controls(make_sim_hw):
+    hw, test_master, pin_changes = get_testing_master(make_sim_hw, {'CTRLIDS': [1]})
+    import TestingManager as TM
+    ctrl_cache = TM.ControlCacheMaster(hw.config)
+    g_poa = hw.read_irradiance()
+    ctrl_cached, first, scan_info = test_master.run_measure_group([1], [1], ctrl_cache, g_poa)
+    assert ctrl_cached == {}
+    assert sorted(first) == ['CTRL1', 'EDS1']
+    # the next test a minute later only measures its EDS, the control keeps its first read time
+    hw.clock.advance(60)
+    asked = hw.clock.now
+    ctrl_cached, readings, scan_info = test_master.run_measure_group([2], [1], ctrl_cache, g_poa)
+    assert sorted(readings) == ['EDS2']
+    [values, age, read_time] = ctrl_cached['CTRL1']
+    assert read_time == first['CTRL1'].stamp
+    assert age == asked - read_time > 60
+    # too old, measured again
+    hw.clock.advance(hw.config['ctrlCacheMaxSeconds'])
+    ctrl_cached, readings, scan_info = test_master.run_measure_group([3], [1], ctrl_cache, g_poa)
+    assert ctrl_cached == {}
+    assert sorted(readings) == ['CTRL1', 'EDS3']
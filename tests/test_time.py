@@ -0,0 +1,131 @@
+import time
+
+import pytest
+
+import StaticManager as SM
+import TimeManager as TIM
+
+from conftest import SIM_START
+
+
+class FakeRTC:
+
+    def __init__(self, clock):
+        self.clock = clock
+        # RTC minus true time, None for a failing read
+        self.offset = 0.0
+        self.lost_power = False
+        self.reads = 0
+
+    @property
+    def datetime(self):
+        self.reads += 1
+        if self.offset is None:
+            raise OSError("I2C read failed")
+        return TIM.to_struct(int(self.clock.now + self.offset))
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = float(SIM_START)
+        self.mono = 1000.0
+
+    def advance(self, seconds):
+        self.now += seconds
+        self.mono += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(time, 'monotonic', lambda: clock.mono)
+    monkeypatch.setattr(time, 'time', lambda: clock.now)
+    return clock
+
+
+def get_time_master(rtc):
+    return TIM.TimeMaster(dict(SM.DEFAULT_CONFIG_PARAM), rtc)
+
+
+def test_time_from_monotonic_between_syncs(clock):
+    rtc = FakeRTC(clock)
+    time_master = get_time_master(rtc)
+    assert time_master.source == 'rtc'
+    for i in range(100):
+        clock.advance(1.5)
+        assert time_master.get_epoch() == clock.now
+    assert rtc.reads == 1
+    # slow drift is measured at the resync and followed
+    rtc.offset = 2.0
+    clock.advance(SM.DEFAULT_CONFIG_PARAM['timeResyncSeconds'])
+    assert time_master.get_epoch() == clock.now + 2
+    assert rtc.reads == 2
+    assert time_master.drift_seconds == 2.0
+    assert time_master.get_fault() is None
+
+
+def test_jump_adopted_once_confirmed(clock):
+    rtc = FakeRTC(clock)
+    time_master = get_time_master(rtc)
+    # a single jumped read is not believed
+    rtc.offset = 3600.0
+    clock.advance(SM.DEFAULT_CONFIG_PARAM['timeResyncSeconds'])
+    assert time_master.get_epoch() == clock.now
+    assert time_master.get_fault() == TIM.FAULT_JUMP
+    # the next read (sooner, while faulty) agrees with it
+    clock.advance(SM.DEFAULT_CONFIG_PARAM['timeRetrySeconds'])
+    assert time_master.get_epoch() == clock.now + 3600
+    assert time_master.get_fault() is None
+
+
+def test_glitch_not_adopted(clock):
+    rtc = FakeRTC(clock)
+    time_master = get_time_master(rtc)
+    rtc.offset = 3600.0
+    clock.advance(SM.DEFAULT_CONFIG_PARAM['timeResyncSeconds'])
+    time_master.get_epoch()
+    rtc.offset = 0.0
+    clock.advance(SM.DEFAULT_CONFIG_PARAM['timeRetrySeconds'])
+    assert time_master.get_epoch() == clock.now
+    assert time_master.get_fault() is None
+    assert time_master.pending_jump is None
+
+
+def test_faults_keep_time(clock):
+    rtc = FakeRTC(clock)
+    time_master = get_time_master(rtc)
+    rtc.offset = None
+    clock.advance(SM.DEFAULT_CONFIG_PARAM['timeResyncSeconds'])
+    assert time_master.get_epoch() == clock.now
+    assert time_master.get_fault() == TIM.FAULT_READ
+    # retried sooner than the resync interval
+    reads = rtc.reads
+    clock.advance(SM.DEFAULT_CONFIG_PARAM['timeRetrySeconds'])
+    time_master.get_epoch()
+    assert rtc.reads == reads + 1
+    rtc.offset = 0.0
+    rtc.lost_power = True
+    clock.advance(SM.DEFAULT_CONFIG_PARAM['timeRetrySeconds'])
+    assert time_master.get_epoch() == clock.now
+    assert time_master.get_fault() == TIM.FAULT_LOST_POWER
+    rtc.lost_power = False
+    clock.advance(SM.DEFAULT_CONFIG_PARAM['timeRetrySeconds'])
+    time_master.get_epoch()
+    assert time_master.get_fault() is None
+    assert time_master.get_status()['fault_count'] == 2
+
+
+def test_reset_rtc_falls_back_to_system_time(clock):
+    rtc = FakeRTC(clock)
+    # PCF8523 reset to 2000
+    rtc.offset = TIM.to_epoch((2000, 1, 1, 0, 0, 0)) - clock.now
+    time_master = get_time_master(rtc)
+    assert time_master.source == 'system'
+    assert time_master.get_fault() == TIM.FAULT_INVALID
+    assert time_master.get_epoch() == clock.now
+    # and takes the RTC once it is set
+    rtc.offset = 0.0
+    clock.advance(SM.DEFAULT_CONFIG_PARAM['timeRetrySeconds'])
+    time_master.get_epoch()
+    assert time_master.source == 'rtc'